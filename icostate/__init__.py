@@ -7,5 +7,30 @@ from icotronic.can.error import CANInitError, UnsupportedFeatureException
 from icotronic.can.sensor import SensorConfiguration
 from icotronic.measurement import Conversion, MeasurementData
 
+from icostate.buffer import channel_sample_rate, MeasurementWindow
+from icostate.capture import Capture, CaptureWriter
+from icostate.conversion import LinearConversion, SensorCalibration
+from icostate.counters import MeasurementCounters
+from icostate.envelope import Envelope
+from icostate.history import History
+from icostate.pyramid import Pyramid, PyramidLevel
+from icostate.recording import Recorder
+from icostate.sensor import (
+    AttributeCache,
+    ProfileResult,
+    SensorNodeAttributes,
+    SensorNodeProfile,
+)
+from icostate.simulation import SimulatedConnection, SimulatedSensorNode
+from icostate.spectrum import Spectrum, SpectrumAnalyzer
+from icostate.statistics import RunningStatistics, Statistics
 from icostate.system import ICOsystem
 from icostate.state import State
+from icostate.subscription import OverflowPolicy, WindowQueue
+from icostate.timing import GapFill, GapIndex, RegularGrid, SampleClock
+from icostate.trigger import (
+    TriggerCondition,
+    TriggeredCapture,
+    TriggeredData,
+    TriggerKind,
+)
@@ -0,0 +1,431 @@
+"""Benchmark for the measurement pipeline
+
+The benchmark uses the simulated ICOtronic system (see
+:mod:`icostate.simulation`) to stream data with the real sample rate of a
+sensor node through :class:`icostate.ICOsystem`. It stores the results in a
+JSON file, which you can use as baseline for later benchmark runs:
+
+.. code-block:: sh
+
+   python -m icostate.benchmark --output baseline.json
+   python -m icostate.benchmark --baseline baseline.json
+
+**Note:** The simulated sensor node runs in the same process as the
+measurement pipeline. The CPU time therefore also contains the time of the
+simulation, which only makes it useful to compare runs using the same
+simulation.
+
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import sys
+import tracemalloc
+
+from argparse import ArgumentParser, Namespace
+from asyncio import run, sleep
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from platform import platform, python_version
+from time import perf_counter, process_time, time
+from typing import Any
+
+import numpy as np
+
+from icotronic.can import StreamingConfiguration
+
+from icostate.buffer import channel_sample_rate, MeasurementWindow
+from icostate.simulation import SimulatedConnection, SimulatedSensorNode
+from icostate.state import State
+from icostate.system import ICOsystem
+
+# -- Attributes ---------------------------------------------------------------
+
+SCENARIOS = {
+    "1-channel": StreamingConfiguration(first=True),
+    "2-channels": StreamingConfiguration(first=True, second=True),
+    "3-channels": StreamingConfiguration(first=True, second=True, third=True),
+}
+"""Streaming configurations used by the benchmark"""
+
+METRICS = {
+    "messages_per_second": 1,
+    "cpu_per_data_second": -1,
+    "latency_p99": -1,
+    "allocated_bytes_per_message": -1,
+}
+"""Regression metrics (1: higher is better, -1: lower is better)"""
+
+# -- Functions ----------------------------------------------------------------
+
+
+def peak_resident_memory() -> int | None:
+    """Get the peak resident set size of the current process
+
+    Returns:
+
+        The maximum resident set size in bytes or ``None``, if the platform
+        does not support the measurement
+
+    Examples:
+
+        >>> rss = peak_resident_memory()
+        >>> rss is None or rss > 0
+        True
+
+    """
+
+    try:
+        # pylint: disable=import-outside-toplevel
+        from resource import getrusage, RUSAGE_SELF
+
+        # pylint: enable=import-outside-toplevel
+    except ImportError:  # Windows
+        return None
+
+    peak = getrusage(RUSAGE_SELF).ru_maxrss
+    # Linux reports the value in kilobytes, macOS in bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def allocated_bytes(
+    before: tracemalloc.Snapshot, after: tracemalloc.Snapshot
+) -> int:
+    """Get the memory allocated between two snapshots
+
+    Args:
+
+        before:
+
+            The snapshot taken before the measurement
+
+        after:
+
+            The snapshot taken after the measurement
+
+    Returns:
+
+        The number of bytes allocated (and not freed) between the snapshots,
+        summed up per source file, which ignores files that freed memory
+
+    Examples:
+
+        >>> tracemalloc.start()
+        >>> before = tracemalloc.take_snapshot()
+        >>> data = [bytearray(1000) for _ in range(100)]
+        >>> after = tracemalloc.take_snapshot()
+        >>> tracemalloc.stop()
+        >>> allocated_bytes(before, after) >= 100 * 1000
+        True
+
+    """
+
+    ignore = [
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ]
+    statistics = after.filter_traces(ignore).compare_to(
+        before.filter_traces(ignore), "filename"
+    )
+    return sum(max(statistic.size_diff, 0) for statistic in statistics)
+
+
+# pylint: disable=too-many-locals
+
+
+async def measure(
+    configuration: StreamingConfiguration,
+    duration: float,
+    update_rate: float,
+    zero_copy: bool = False,
+    trace: bool = False,
+) -> dict[str, Any]:
+    """Measure the performance of a single measurement
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        duration:
+
+            The runtime of the measurement in seconds
+
+        update_rate:
+
+            The measurement update rate in Hz
+
+        zero_copy:
+
+            Specifies if the measurement should emit views instead of copies
+
+        trace:
+
+            Specifies if the benchmark should trace memory allocations, which
+            slows down the measurement considerably
+
+    Returns:
+
+        The benchmark results of the measurement
+
+    """
+
+    sensor_node = SimulatedSensorNode()
+    icosystem = ICOsystem(connection=SimulatedConnection([sensor_node]))
+    transitions: dict[str, float] = {}
+
+    start = perf_counter()
+    await icosystem.connect_stu()
+    transitions["connect_stu"] = perf_counter() - start
+    start = perf_counter()
+    await icosystem.connect_sensor_node_mac(str(sensor_node.mac_address))
+    transitions["connect_sensor_node"] = perf_counter() - start
+
+    latencies: list[float] = []
+    messages = 0
+    samples = 0
+
+    @icosystem.on("sensor_node_measurement_data")
+    def measurement_data(window: MeasurementWindow):
+        nonlocal messages, samples
+        latencies.append(time() - window.timestamps[-1])
+        messages += len(window)
+        samples += window.samples()
+
+    before: tracemalloc.Snapshot | None = None
+    if trace:
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+    cpu_start = process_time()
+    start = perf_counter()
+    await icosystem.start_measurement(
+        configuration, update_rate, runtime=duration, zero_copy=zero_copy
+    )
+    transitions["start_measurement"] = perf_counter() - start
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.01)
+    elapsed = perf_counter() - start
+    cpu = process_time() - cpu_start
+    allocated: int | None = None
+    if before is not None:
+        allocated = allocated_bytes(before, tracemalloc.take_snapshot())
+        tracemalloc.stop()
+
+    start = perf_counter()
+    await icosystem.disconnect_sensor_node()
+    transitions["disconnect_sensor_node"] = perf_counter() - start
+    start = perf_counter()
+    await icosystem.disconnect_stu()
+    transitions["disconnect_stu"] = perf_counter() - start
+
+    data_seconds = samples / channel_sample_rate(
+        sensor_node.adc_configuration, configuration
+    )
+    latency = np.asarray(latencies) if latencies else np.full(1, np.nan)
+
+    return {
+        "messages": messages,
+        "samples": samples,
+        "windows": len(latencies),
+        "messages_per_second": messages / elapsed,
+        "cpu_per_data_second": cpu / data_seconds if data_seconds else None,
+        "latency_p50": float(np.percentile(latency, 50)),
+        "latency_p90": float(np.percentile(latency, 90)),
+        "latency_p99": float(np.percentile(latency, 99)),
+        "latency_max": float(latency.max()),
+        "allocated_bytes_per_message": (
+            allocated / messages
+            if allocated is not None and messages
+            else None
+        ),
+        "transitions": transitions,
+    }
+
+
+# pylint: enable=too-many-locals
+
+
+def compare(
+    results: dict[str, Any], baseline: dict[str, Any], tolerance: float
+) -> list[str]:
+    """Compare benchmark results with a baseline
+
+    Args:
+
+        results:
+
+            The results of the current benchmark run
+
+        baseline:
+
+            The results of an earlier benchmark run
+
+        tolerance:
+
+            The relative change (e.g. ``0.1`` for 10 %) of a metric that still
+            does not count as regression
+
+    Returns:
+
+        A description of every regression
+
+    Examples:
+
+        >>> baseline = {"scenarios": {"1-channel": {
+        ...     "messages_per_second": 3000, "cpu_per_data_second": 0.1}}}
+        >>> results = {"scenarios": {"1-channel": {
+        ...     "messages_per_second": 2990, "cpu_per_data_second": 0.2}}}
+        >>> compare(results, baseline, tolerance=0.1)
+        ['1-channel: cpu_per_data_second changed from 0.1 to 0.2 (+100.0 %)']
+
+    """
+
+    regressions = []
+    for name, scenario in results["scenarios"].items():
+        reference = baseline["scenarios"].get(name, {})
+        for metric, direction in METRICS.items():
+            old = reference.get(metric)
+            new = scenario.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            if -direction * change > tolerance:
+                regressions.append(
+                    f"{name}: {metric} changed from {old:.4g} to {new:.4g} "
+                    f"({change:+.1%})".replace("%", " %")
+                )
+
+    return regressions
+
+
+def parse_arguments() -> Namespace:
+    """Parse the command line arguments of the benchmark
+
+    Returns:
+
+        The parsed command line arguments
+
+    """
+
+    parser = ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-d",
+        "--duration",
+        type=float,
+        default=5,
+        help="runtime of each measurement in seconds (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-u",
+        "--update-rate",
+        type=float,
+        default=60,
+        help="measurement update rate in Hz (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-z",
+        "--zero-copy",
+        action="store_true",
+        help="emit views into the measurement buffer instead of copies",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        type=Path,
+        default=Path("benchmark.json"),
+        help="file that stores the results (default: %(default)s)",
+    )
+    parser.add_argument(
+        "-b",
+        "--baseline",
+        type=Path,
+        help="results of an earlier run used to detect regressions",
+    )
+    parser.add_argument(
+        "-t",
+        "--tolerance",
+        type=float,
+        default=0.1,
+        help="allowed relative change of metrics (default: %(default)s)",
+    )
+
+    return parser.parse_args()
+
+
+def main() -> None:
+    """Run the benchmark"""
+
+    arguments = parse_arguments()
+
+    try:
+        icostate_version = version("icostate")
+    except PackageNotFoundError:
+        icostate_version = None
+
+    results: dict[str, Any] = {
+        "icostate": icostate_version,
+        "python": python_version(),
+        "platform": platform(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "duration": arguments.duration,
+        "update_rate": arguments.update_rate,
+        "zero_copy": arguments.zero_copy,
+        "scenarios": {},
+    }
+    for name, configuration in SCENARIOS.items():
+        scenario = run(
+            measure(
+                configuration,
+                arguments.duration,
+                arguments.update_rate,
+                arguments.zero_copy,
+            )
+        )
+        # Tracing allocations distorts all other metrics, hence we use a
+        # separate measurement for it
+        traced = run(
+            measure(
+                configuration,
+                arguments.duration,
+                arguments.update_rate,
+                arguments.zero_copy,
+                trace=True,
+            )
+        )
+        scenario["allocated_bytes_per_message"] = traced[
+            "allocated_bytes_per_message"
+        ]
+        results["scenarios"][name] = scenario
+        cpu = scenario["cpu_per_data_second"]
+        print(
+            f"{name}: {scenario['messages_per_second']:.0f} messages/s, "
+            + ("no data" if cpu is None else f"{cpu:.3f} s CPU per s data")
+            + f", p99 latency {scenario['latency_p99'] * 1000:.1f} ms"
+        )
+    results["peak_resident_memory"] = peak_resident_memory()
+
+    arguments.output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if arguments.baseline is None:
+        return
+
+    regressions = compare(
+        results,
+        json.loads(arguments.baseline.read_text()),
+        arguments.tolerance,
+    )
+    for regression in regressions:
+        print(f"Regression: {regression}")
+    if regressions:
+        sys.exit(1)
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1096 @@
+"""Columnar storage for streaming data"""
+
+# pylint: disable=too-many-lines
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections.abc import Sequence
+from logging import getLogger
+from math import inf
+
+import numpy as np
+
+from icotronic.can.adc import ADCConfiguration
+from icotronic.can.dataloss import MessageStats
+from icotronic.can.streaming import StreamingConfiguration, StreamingData
+from icotronic.measurement import Conversion, MeasurementData
+
+# -- Attributes ---------------------------------------------------------------
+
+CHANNELS = ("first", "second", "third")
+"""Names of the measurement channels (in column order)"""
+
+# -- Functions ----------------------------------------------------------------
+
+
+def enabled_channels(configuration: StreamingConfiguration) -> list[int]:
+    """Get the column indices of the enabled channels
+
+    Args:
+
+        configuration:
+
+            The streaming configuration
+
+    Returns:
+
+        A list containing the indices of the enabled channels
+
+    Examples:
+
+        Get the indices of the enabled channels
+
+        >>> enabled_channels(StreamingConfiguration(first=True))
+        [0]
+        >>> enabled_channels(StreamingConfiguration(first=False, second=True,
+        ...                                         third=True))
+        [1, 2]
+
+    """
+
+    return [
+        index
+        for index, name in enumerate(CHANNELS)
+        if getattr(configuration, name)
+    ]
+
+
+def samples_per_message(configuration: StreamingConfiguration) -> int:
+    """Get the number of samples (per channel) of a single streaming message
+
+    Args:
+
+        configuration:
+
+            The streaming configuration
+
+    Returns:
+
+        The number of values each streaming message contains for every
+        enabled channel
+
+    Examples:
+
+        Messages contain three samples, if only one channel is enabled
+
+        >>> samples_per_message(StreamingConfiguration(first=True))
+        3
+
+        Otherwise messages contain one sample per enabled channel
+
+        >>> samples_per_message(StreamingConfiguration(first=True,
+        ...                                            third=True))
+        1
+
+    """
+
+    return 3 if configuration.enabled_channels() == 1 else 1
+
+
+def channel_sample_rate(
+    adc_configuration: ADCConfiguration,
+    configuration: StreamingConfiguration,
+) -> float:
+    """Get the sample rate of a single measurement channel
+
+    The ADC of the sensor node samples the enabled channels one after
+    another. The sample rate of a single channel therefore depends on the
+    number of enabled channels.
+
+    Args:
+
+        adc_configuration:
+
+            The ADC configuration of the sensor node
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+    Returns:
+
+        The number of samples per second of every enabled channel
+
+    Examples:
+
+        Get the sample rate for one and for three enabled channels
+
+        >>> adc_configuration = ADCConfiguration(prescaler=2,
+        ...                                      acquisition_time=8,
+        ...                                      oversampling_rate=64)
+        >>> round(channel_sample_rate(adc_configuration,
+        ...                           StreamingConfiguration(first=True)))
+        9524
+        >>> round(channel_sample_rate(adc_configuration,
+        ...                           StreamingConfiguration(first=True,
+        ...                                                  second=True,
+        ...                                                  third=True)))
+        3175
+
+    """
+
+    return adc_configuration.sample_rate() / configuration.enabled_channels()
+
+
+def combine(
+    configuration: StreamingConfiguration, windows: Sequence[MeasurementWindow]
+) -> MeasurementWindow:
+    """Combine consecutive measurement data into a single window
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        windows:
+
+            The measurement data in chronological order
+
+    Returns:
+
+        A window that contains the data of all windows
+
+    """
+
+    return MeasurementWindow(
+        configuration,
+        np.concatenate(
+            [window.data for window in windows]
+            or [np.empty((0, len(CHANNELS)))]
+        ),
+        np.concatenate(
+            [window.sample_indices for window in windows]
+            or [np.empty(0, dtype=np.int64)]
+        ),
+        np.concatenate(
+            [window.timestamps for window in windows] or [np.empty(0)]
+        ),
+        np.concatenate(
+            [window.counters for window in windows]
+            or [np.empty(0, dtype=np.uint8)]
+        ),
+    )
+
+
+def slice_window(
+    window: MeasurementWindow, start: int, stop: int
+) -> MeasurementWindow:
+    """Get part of the data of a window
+
+    Args:
+
+        window:
+
+            The measurement data
+
+        start:
+
+            The index of the first row of the part
+
+        stop:
+
+            The index after the last row of the part
+
+    Returns:
+
+        A window containing views of the requested rows
+
+    """
+
+    return MeasurementWindow(
+        window.configuration,
+        window.data[start:stop],
+        window.sample_indices[start:stop],
+        window.timestamps[start:stop],
+        window.counters[start:stop],
+    )
+
+
+def numbers(values: np.ndarray) -> list[float]:
+    """Convert an array into a list of Python numbers
+
+    Args:
+
+        values:
+
+            A one dimensional array of values
+
+    Returns:
+
+        A list that contains integers for all integral values (e.g. raw ADC
+        values) and floats for all other values
+
+    Examples:
+
+        >>> numbers(np.array([1.0, 2.5, np.nan]))
+        [1, 2.5, nan]
+
+    """
+
+    return [
+        int(value) if value.is_integer() else value
+        for value in values.tolist()
+    ]
+
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class MeasurementWindow(MeasurementData):
+    """Measurement data stored in NumPy arrays
+
+    The arrays of a window are usually slices of a
+    :class:`MeasurementBuffer`. Since the window is also a
+    :class:`MeasurementData` object, the list of streaming data objects is
+    still available. This list will only be created, if code accesses it.
+
+    Args:
+
+        configuration:
+
+            The streaming configuration that was used to collect the
+            measurement data
+
+        data:
+
+            Two dimensional array containing the values of the measurement
+            (one column for each measurement channel: first, second, third)
+
+        sample_indices:
+
+            The index of every sample since the start of the measurement
+            (including lost samples)
+
+        timestamps:
+
+            The timestamp of every sample
+
+        counters:
+
+            The message counter of every sample
+
+        position:
+
+            The position of the first sample of the window in the buffer
+
+        buffer:
+
+            The buffer that stores the data of the window, if the arrays of
+            the window are views into the buffer
+
+    Examples:
+
+        Create a window from some example data
+
+        >>> config = StreamingConfiguration(first=True, third=True)
+        >>> buffer = MeasurementBuffer(config, capacity=10)
+        >>> buffer.append(StreamingData(values=[1, 2], counter=1,
+        ...                             timestamp=1756125747.5))
+        >>> buffer.append(StreamingData(values=[3, 4], counter=2,
+        ...                             timestamp=1756125747.6))
+        >>> window = buffer.window(0, buffer.position)
+        >>> window.channel("third")
+        array([2., 4.])
+        >>> window
+        Channel 1 enabled, Channel 2 disabled, Channel 3 enabled
+        [1, 2]@1756125747.5 #1
+        [3, 4]@1756125747.6 #2
+
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # The window stores its data in arrays instead of the list of streaming
+    # data objects the constructor of the base class creates
+    # pylint: disable=super-init-not-called
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        data: np.ndarray,
+        sample_indices: np.ndarray,
+        timestamps: np.ndarray,
+        counters: np.ndarray,
+        position: int = 0,
+        buffer: MeasurementBuffer | None = None,
+    ) -> None:
+
+        self.configuration = configuration
+        self._streaming_data_list: list[StreamingData] | None = None
+        self.data = data
+        self.sample_indices = sample_indices
+        self.timestamps = timestamps
+        self.counters = counters
+        self.position = position
+        """Position of the first sample of the window in the buffer"""
+        self.sequence = 0
+        """Sequence number of the window in the current measurement"""
+        self.buffer = buffer
+        self._wraps = 0 if buffer is None else buffer.wraps
+        self._row = 0 if buffer is None else position - buffer.start
+
+    # pylint: enable=super-init-not-called
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    @property
+    def streaming_data_list(self) -> list[StreamingData]:
+        """Get the streaming data of the window
+
+        Returns:
+
+            A list containing one streaming data object per message
+
+        """
+
+        if self._streaming_data_list is None:
+            self._streaming_data_list = self._streaming_data()
+
+        return self._streaming_data_list
+
+    @streaming_data_list.setter
+    def streaming_data_list(self, data: list[StreamingData]) -> None:
+        """Replace the data of the window
+
+        Args:
+
+            data:
+
+                The new list of streaming data objects
+
+        """
+
+        self._assign(self._window(data, 0))
+
+    def _window(
+        self, data: Sequence[StreamingData], sample_index: int
+    ) -> MeasurementWindow:
+        """Convert streaming data into a window
+
+        Args:
+
+            data:
+
+                The streaming data
+
+            sample_index:
+
+                The index of the first sample of ``data``
+
+        Returns:
+
+            A window with the same streaming configuration as this window
+
+        """
+
+        configuration = self.configuration
+        if samples_per_message(configuration) > 1:
+            rows = sum(len(message.values) for message in data)
+        else:
+            rows = len(data)
+        buffer = MeasurementBuffer(configuration, max(rows, 1), rows)
+        buffer.sample_index = sample_index
+        for message in data:
+            buffer.append(message)
+
+        return buffer.window(0, buffer.position).copy()
+
+    def _assign(self, window: MeasurementWindow) -> None:
+        """Replace the arrays of the window
+
+        Args:
+
+            window:
+
+                The window that contains the new data
+
+        """
+
+        self.data = window.data
+        self.sample_indices = window.sample_indices
+        self.timestamps = window.timestamps
+        self.counters = window.counters
+        # The window does not share memory with a buffer anymore
+        self.buffer = None
+        self._streaming_data_list = None
+
+    def _streaming_data(self) -> list[StreamingData]:
+        """Convert the columns of the window into streaming data objects
+
+        Returns:
+
+            A list containing one streaming data object per message
+
+        """
+
+        rows = samples_per_message(self.configuration)
+        channels = enabled_channels(self.configuration)
+        counters = self.counters[::rows].tolist()
+        timestamps = self.timestamps[::rows].tolist()
+        if rows > 1:
+            values = numbers(self.data[:, channels[0]])
+            message_values = [
+                values[start : start + rows]
+                for start in range(0, len(values), rows)
+            ]
+        else:
+            message_values = [numbers(row) for row in self.data[:, channels]]
+
+        streaming_data = []
+        for counter, timestamp, data in zip(
+            counters, timestamps, message_values
+        ):
+            if len(data) < 2:
+                # The last message of a measurement with a fixed number of
+                # samples might only contain a single value, which the
+                # constructor of `StreamingData` does not accept
+                message = StreamingData(
+                    counter=counter, timestamp=timestamp, values=2 * data
+                )
+                message.values = data
+            else:
+                message = StreamingData(
+                    counter=counter, timestamp=timestamp, values=data
+                )
+            streaming_data.append(message)
+
+        return streaming_data
+
+    def __len__(self) -> int:
+        """Get the number of messages stored in the window
+
+        Returns:
+
+            The number of streaming messages contained in the window
+
+        Examples:
+
+            Get the length of a window
+
+            >>> config = StreamingConfiguration(first=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> len(buffer.window(0, 0))
+            0
+            >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+            ...                             timestamp=1))
+            >>> len(buffer.window(0, buffer.position))
+            1
+
+        """
+
+        rows = samples_per_message(self.configuration)
+        return -(-len(self.timestamps) // rows)
+
+    def channel(self, name: str) -> np.ndarray:
+        """Get the values of a single measurement channel
+
+        Args:
+
+            name:
+
+                The name of the channel (``first``, ``second`` or ``third``)
+
+        Returns:
+
+            A one dimensional array containing the values of the channel
+
+        """
+
+        return self.data[:, CHANNELS.index(name)]
+
+    def samples(self) -> int:
+        """Get the number of samples (per channel) stored in the window
+
+        Returns:
+
+            The number of rows of the window
+
+        """
+
+        return len(self.timestamps)
+
+    def values(self) -> list[float]:
+        """Get all values of the window
+
+        Returns:
+
+            A list containing the values in the order of the underlying
+            streaming data
+
+        Examples:
+
+            >>> config = StreamingConfiguration(first=True, third=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> buffer.append(StreamingData(values=[1, 2], counter=1,
+            ...                             timestamp=1))
+            >>> buffer.append(StreamingData(values=[3, 4], counter=2,
+            ...                             timestamp=2))
+            >>> buffer.window(0, buffer.position).values()
+            [1, 2, 3, 4]
+
+        """
+
+        channels = enabled_channels(self.configuration)
+        if samples_per_message(self.configuration) > 1:
+            return numbers(self.data[:, channels[0]])
+
+        return numbers(self.data[:, channels].ravel())
+
+    def append(self, data: StreamingData) -> None:
+        """Append the data of a streaming message to the window
+
+        The sample index of the new data follows the last sample of the
+        window. The window does not share memory with a buffer afterwards.
+
+        Args:
+
+            data:
+
+                The streaming data that should be added to the window
+
+        Examples:
+
+            >>> config = StreamingConfiguration(first=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+            ...                             timestamp=1))
+            >>> window = buffer.window(0, buffer.position)
+            >>> window.append(StreamingData(values=[4, 5, 6], counter=2,
+            ...                             timestamp=2))
+            >>> len(window), window.samples()
+            (2, 6)
+            >>> window.sample_indices
+            array([0, 1, 2, 3, 4, 5])
+
+        """
+
+        self.extend([data])
+
+    def extend(self, data: MeasurementData | Sequence[StreamingData]) -> None:
+        """Extend the window with other measurement data
+
+        Args:
+
+            data:
+
+                The measurement data that should be added to the window
+
+        Raises:
+
+            ValueError:
+
+                If the streaming configuration of the data differs from the
+                configuration of the window
+
+        Examples:
+
+            >>> config = StreamingConfiguration(first=True, second=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> buffer.append(StreamingData(values=[1, 2], counter=1,
+            ...                             timestamp=1))
+            >>> window = buffer.window(0, buffer.position)
+            >>> other = MeasurementData(config)
+            >>> other.append(StreamingData(values=[3, 4], counter=2,
+            ...                            timestamp=2))
+            >>> window.extend(other)
+            >>> window
+            Channel 1 enabled, Channel 2 enabled, Channel 3 disabled
+            [1, 2]@1.0 #1
+            [3, 4]@2.0 #2
+
+        """
+
+        if isinstance(data, MeasurementData):
+            if self.configuration != data.configuration:
+                raise ValueError(
+                    f"Trying to merge measurement data {self.configuration} "
+                    "with different streaming configuration: "
+                    f"{data.configuration}"
+                )
+            if isinstance(data, MeasurementWindow):
+                self._assign(self.merge(data))
+                return
+            data = data.streaming_data_list
+
+        sample_index = (
+            int(self.sample_indices[-1]) + 1 if self.samples() > 0 else 0
+        )
+        self._assign(self.merge(self._window(data, sample_index)))
+
+    def apply(self, conversion: Conversion) -> MeasurementWindow:
+        """Apply functions to the values of the window
+
+        The window does not share memory with a buffer afterwards.
+
+        Args:
+
+            conversion:
+
+                The conversion functions for the measurement channels
+
+        Returns:
+
+            The window itself, after the conversion was applied
+
+        Examples:
+
+            >>> config = StreamingConfiguration(first=True, third=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> buffer.append(StreamingData(values=[1, 2], counter=1,
+            ...                             timestamp=1))
+            >>> window = buffer.window(0, buffer.position)
+            >>> window.apply(Conversion(first=lambda value: value * 2,
+            ...                         third=lambda value: value + 0.5))
+            Channel 1 enabled, Channel 2 disabled, Channel 3 enabled
+            [2, 2.5]@1.0 #1
+            >>> window.channel("first")
+            array([2.])
+
+        """
+
+        data = self.data.copy()
+        for channel in enabled_channels(self.configuration):
+            function = getattr(conversion, CHANNELS[channel])
+            if function is not None:
+                data[:, channel] = [
+                    function(value) for value in data[:, channel].tolist()
+                ]
+
+        window = self.copy()
+        window.data = data
+        self._assign(window)
+
+        return self
+
+    def dataloss(self) -> float:
+        """Get measurement dataloss based on message counters
+
+        Returns:
+
+            The overall amount of dataloss as number between 0 (no data loss)
+            and 1 (all data lost).
+
+        Examples:
+
+            Calculate the data loss of a window with one lost message
+
+            >>> config = StreamingConfiguration(first=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> buffer.append(StreamingData(values=[1, 2, 3], counter=255,
+            ...                             timestamp=1))
+            >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+            ...                             timestamp=2), lost=1)
+            >>> buffer.window(0, buffer.position).dataloss()
+            0.3333333333333333
+
+        """
+
+        rows = samples_per_message(self.configuration)
+        counters = self.counters[::rows].astype(np.int64)
+        if len(counters) <= 0:
+            return MessageStats().dataloss()
+
+        differences = np.diff(counters) % 256
+        differences = differences[differences != 0]
+        return MessageStats(
+            retrieved=1 + len(differences),
+            lost=int((differences - 1).sum()),
+        ).dataloss()
+
+    def valid(self) -> bool:
+        """Check if the data of the window is still available
+
+        Windows that are views into a buffer stay valid until the buffer
+        reuses the rows of the window. This happens at the earliest after the
+        buffer stored ``capacity`` further rows, minus the rows that were not
+        emitted yet. Use :meth:`copy` to keep the data of a window for a longer
+        time.
+
+        Returns:
+
+            - ``True``, if the arrays of the window still contain the
+              original data
+            - ``False``, otherwise
+
+        Examples:
+
+            A window stays valid until the buffer overwrites its rows
+
+            >>> config = StreamingConfiguration(first=True)
+            >>> buffer = MeasurementBuffer(config, capacity=6)
+            >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+            ...                             timestamp=1))
+            >>> window = buffer.window(0, buffer.position)
+            >>> buffer.retained = buffer.position
+            >>> buffer.append(StreamingData(values=[4, 5, 6], counter=2,
+            ...                             timestamp=2))
+            >>> window.valid()
+            True
+            >>> buffer.retained = buffer.position
+            >>> buffer.append(StreamingData(values=[7, 8, 9], counter=3,
+            ...                             timestamp=3))
+            >>> window.valid()
+            False
+
+            Copies of windows are always valid
+
+            >>> window.copy().valid()
+            True
+
+        """
+
+        buffer = self.buffer
+        if buffer is None or buffer.wraps == self._wraps:
+            return True
+
+        return buffer.wraps == self._wraps + 1 and buffer.length <= self._row
+
+    def copy(self) -> MeasurementWindow:
+        """Copy the data of the window
+
+        Returns:
+
+            A (writable) window that does not share any memory with the buffer
+
+        """
+
+        window = MeasurementWindow(
+            self.configuration,
+            self.data.copy(),
+            self.sample_indices.copy(),
+            self.timestamps.copy(),
+            self.counters.copy(),
+            self.position,
+        )
+        window.sequence = self.sequence
+        return window
+
+    def merge(self, window: MeasurementWindow) -> MeasurementWindow:
+        """Combine the window with the following window
+
+        Args:
+
+            window:
+
+                The window that contains the data directly after the data of
+                this window
+
+        Returns:
+
+            A new window that contains the data of both windows and the
+            sequence number of the later window
+
+        Examples:
+
+            Merge two consecutive windows
+
+            >>> config = StreamingConfiguration(first=True)
+            >>> buffer = MeasurementBuffer(config, capacity=10)
+            >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+            ...                             timestamp=1))
+            >>> first = buffer.window(0, buffer.position)
+            >>> buffer.append(StreamingData(values=[4, 5, 6], counter=2,
+            ...                             timestamp=2))
+            >>> second = buffer.window(first.samples(), buffer.position)
+            >>> second.sequence = 2
+            >>> merged = first.merge(second)
+            >>> merged.channel("first")
+            array([1., 2., 3., 4., 5., 6.])
+            >>> merged.sequence
+            2
+
+        """
+
+        merged = MeasurementWindow(
+            self.configuration,
+            np.concatenate((self.data, window.data)),
+            np.concatenate((self.sample_indices, window.sample_indices)),
+            np.concatenate((self.timestamps, window.timestamps)),
+            np.concatenate((self.counters, window.counters)),
+            self.position,
+        )
+        merged.sequence = window.sequence
+        return merged
+
+
+class MeasurementBuffer:
+    """Preallocated column storage for streaming data
+
+    The buffer stores one row per sample. Each row contains the values of the
+    three measurement channels, the sample index, the timestamp and the
+    message counter of the sample. If the buffer is full, then it moves the
+    rows that are still required (see :attr:`retained`) to the start of the
+    storage and overwrites the rest of the data.
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        capacity:
+
+            The number of rows the buffer can store
+
+        limit:
+
+            The maximum number of rows the buffer accepts. The buffer ignores
+            all data after this limit, even if this means that it only stores
+            part of a streaming message.
+
+    Examples:
+
+        Store some streaming data
+
+        >>> config = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(config, capacity=6)
+        >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+        ...                             timestamp=1))
+        >>> buffer.append(StreamingData(values=[4, 5, 6], counter=2,
+        ...                             timestamp=2))
+        >>> buffer.window(0, buffer.position).channel("first")
+        array([1., 2., 3., 4., 5., 6.])
+
+        Data that is not retained will be overwritten, if the buffer is full
+
+        >>> buffer.retained = 3
+        >>> buffer.append(StreamingData(values=[7, 8, 9], counter=3,
+        ...                             timestamp=3))
+        >>> buffer.window(3, buffer.position).channel("first")
+        array([4., 5., 6., 7., 8., 9.])
+        >>> buffer.window(0, 3)
+        Traceback (most recent call last):
+           ...
+        ValueError: Data at position 0 is not available anymore
+
+        Store a fixed number of samples
+
+        >>> buffer = MeasurementBuffer(config, capacity=6, limit=4)
+        >>> buffer.append(StreamingData(values=[1, 2, 3], counter=1,
+        ...                             timestamp=1))
+        >>> buffer.append(StreamingData(values=[4, 5, 6], counter=2,
+        ...                             timestamp=2))
+        >>> buffer.full()
+        True
+        >>> window = buffer.window(0, buffer.position)
+        >>> window.channel("first")
+        array([1., 2., 3., 4.])
+        >>> window.first()
+        1@1.0 #1
+        2@1.0 #1
+        3@1.0 #1
+        4@2.0 #2
+
+    """
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        capacity: int,
+        limit: float = inf,
+    ) -> None:
+
+        if capacity <= 0:
+            raise ValueError(f"Invalid buffer capacity: {capacity}")
+
+        self.configuration = configuration
+        self.channels = enabled_channels(configuration)
+        self.rows = samples_per_message(configuration)
+        self.logger = getLogger(__name__)
+
+        self.data = np.full((capacity, len(CHANNELS)), np.nan)
+        self.sample_indices = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity)
+        self.counters = np.zeros(capacity, dtype=np.uint8)
+        self._offsets = np.arange(self.rows, dtype=np.int64)
+
+        self.start = 0
+        """Position of the first row of the storage"""
+        self.length = 0
+        """Number of used rows of the storage"""
+        self.retained = 0
+        """Position of the oldest row that must not be overwritten"""
+        self.sample_index = 0
+        """Index of the next sample (including lost samples)"""
+        self.wraps = 0
+        """Number of times the buffer reused its storage"""
+        self.limit = limit
+        """Maximum number of rows the buffer accepts"""
+
+    @property
+    def capacity(self) -> int:
+        """Get the number of rows the buffer can store
+
+        Returns:
+
+            The capacity of the buffer
+
+        """
+
+        return len(self.timestamps)
+
+    @property
+    def position(self) -> int:
+        """Get the position of the next row
+
+        Returns:
+
+            The number of rows written into the buffer since its creation
+
+        """
+
+        return self.start + self.length
+
+    def full(self) -> bool:
+        """Check if the buffer reached its row limit
+
+        Returns:
+
+            - ``True``, if the buffer does not accept any more data
+            - ``False``, otherwise
+
+        """
+
+        return self.position >= self.limit
+
+    def _make_room(self, rows: int) -> None:
+        """Make sure there is enough space to store additional rows
+
+        Args:
+
+            rows:
+
+                The number of rows that should fit into the buffer
+
+        """
+
+        keep = max(self.retained - self.start, 0)
+        kept = self.length - keep
+        if kept + rows > self.capacity:
+            capacity = max(2 * self.capacity, kept + rows)
+            self.logger.warning(
+                "Increasing measurement buffer capacity to %s rows", capacity
+            )
+            for name in ("data", "sample_indices", "timestamps", "counters"):
+                old = getattr(self, name)
+                new = np.empty((capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:kept] = old[keep : self.length]
+                setattr(self, name, new)
+            self.data[kept:] = np.nan
+        else:
+            for column in (
+                self.data,
+                self.sample_indices,
+                self.timestamps,
+                self.counters,
+            ):
+                column[:kept] = column[keep : self.length]
+
+        self.start += keep
+        self.length = kept
+        self.wraps += 1
+
+    def append(self, data: StreamingData, lost: int = 0) -> None:
+        """Store the data of a streaming message
+
+        Args:
+
+            data:
+
+                The streaming data that should be stored
+
+            lost:
+
+                The number of messages lost right before ``data``
+
+        """
+
+        rows = self.rows
+        values = data.values
+        if self.position + rows > self.limit:
+            rows = max(int(self.limit) - self.position, 0)
+            values = values[:rows]
+            if rows <= 0:
+                return
+
+        if self.length + rows > self.capacity:
+            self._make_room(rows)
+
+        row = self.length
+        end = row + rows
+        self.sample_index += lost * self.rows
+        if self.rows > 1:
+            self.data[row:end, self.channels[0]] = values
+        else:
+            self.data[row, self.channels] = values
+        self.sample_indices[row:end] = self._offsets[:rows] + self.sample_index
+        self.timestamps[row:end] = data.timestamp
+        self.counters[row:end] = data.counter
+
+        self.sample_index += rows
+        self.length = end
+
+    def window(self, start: int, stop: int) -> MeasurementWindow:
+        """Get the data between two positions
+
+        Args:
+
+            start:
+
+                The position of the first row of the window
+
+            stop:
+
+                The position after the last row of the window
+
+        Returns:
+
+            A window whose arrays are read only views into the buffer
+
+        Raises:
+
+            ValueError:
+
+                If the data is not available (anymore)
+
+        """
+
+        if start < self.start:
+            raise ValueError(
+                f"Data at position {start} is not available anymore"
+            )
+        if stop > self.position or stop < start:
+            raise ValueError(f"Invalid window: {start} – {stop}")
+
+        first = start - self.start
+        last = stop - self.start
+
+        values = self.data[first:last]
+        sample_indices = self.sample_indices[first:last]
+        timestamps = self.timestamps[first:last]
+        counters = self.counters[first:last]
+        for view in (values, sample_indices, timestamps, counters):
+            view.flags.writeable = False
+
+        return MeasurementWindow(
+            self.configuration,
+            values,
+            sample_indices,
+            timestamps,
+            counters,
+            start,
+            self,
+        )
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,716 @@
+"""Indexed columnar storage format for measurement data
+
+A capture is a directory (suffix ``.icocap``) that contains one binary file
+per column (enabled measurement channels, sample indices, timestamps and
+message counters), a time index and a metadata file:
+
+.. code-block:: text
+
+   measurement.icocap/
+   ├── metadata.json
+   ├── first.f4
+   ├── sample_indices.i8
+   ├── timestamps.f8
+   ├── counters.u1
+   └── index.f8
+
+The writer appends rows to the column files, which is why every column is a
+contiguous array on disk. The time index contains the timestamp of the first
+row of every block of ``block_size`` rows. To find the data of a certain time
+range the reader only needs to search the (small) index and a single block of
+timestamps. Since the reader maps the column files into memory
+(:class:`numpy.memmap`), slices of a column do not copy any data and only the
+accessed parts of a file need to be read from disk.
+
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+import os
+
+from datetime import datetime
+from pathlib import Path
+from types import TracebackType
+from typing import BinaryIO
+
+import numpy as np
+
+from netaddr import EUI
+
+from icotronic.can.adc import ADCConfiguration
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import (
+    channel_sample_rate,
+    CHANNELS,
+    enabled_channels,
+    MeasurementWindow,
+)
+from icostate.sensor import SensorNodeAttributes
+
+# -- Attributes ---------------------------------------------------------------
+
+CAPTURE_SUFFIX = ".icocap"
+"""File name suffix of capture directories"""
+
+CAPTURE_VERSION = 1
+"""Version of the capture format"""
+
+METADATA = "metadata.json"
+"""Name of the metadata file of a capture"""
+
+INDEX = "index.f8"
+"""Name of the time index file of a capture"""
+
+COLUMNS: dict[str, np.dtype] = {
+    "sample_indices": np.dtype("<i8"),
+    "timestamps": np.dtype("<f8"),
+    "counters": np.dtype("u1"),
+}
+"""Data types of the columns stored in addition to the channel values"""
+
+VALUES = np.dtype("<f4")
+"""Data type of the channel values (same as ICOtronic HDF5 files)"""
+
+# -- Functions ----------------------------------------------------------------
+
+
+def column_filename(name: str, dtype: np.dtype) -> str:
+    """Get the name of the file that stores a column
+
+    Args:
+
+        name:
+
+            The name of the column
+
+        dtype:
+
+            The data type of the column
+
+    Returns:
+
+        The file name of the column
+
+    Examples:
+
+        >>> column_filename("first", VALUES)
+        'first.f4'
+        >>> column_filename("counters", COLUMNS["counters"])
+        'counters.u1'
+
+    """
+
+    return f"{name}.{dtype.kind}{dtype.itemsize}"
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+class CaptureWriter:
+    """Write measurement data into a capture
+
+    Args:
+
+        path:
+
+            The path of the capture directory, which must not exist yet (or
+            be empty)
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        attributes:
+
+            Information about the sensor node, which the capture stores as
+            metadata
+
+        block_size:
+
+            The number of rows per block of the time index
+
+    Raises:
+
+        ValueError:
+
+            If the capture already exists
+
+    Examples:
+
+        Import necessary code
+
+        >>> from tempfile import TemporaryDirectory
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Write and read back a capture
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=30)
+        >>> for counter in range(10):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+        >>> with TemporaryDirectory() as directory:
+        ...     path = Path(directory) / "measurement.icocap"
+        ...     with CaptureWriter(path, configuration,
+        ...                        block_size=4) as writer:
+        ...         rows = writer.append([buffer.window(0, 30)])
+        ...     with Capture(path) as capture:
+        ...         print(len(capture))
+        ...         print(capture.channel("first", start=8.0))
+        30
+        [1. 2. 3. 1. 2. 3.]
+
+    """
+
+    def __init__(
+        self,
+        path: Path | str,
+        configuration: StreamingConfiguration,
+        attributes: SensorNodeAttributes | None = None,
+        block_size: int = 2**14,
+    ) -> None:
+
+        self.path = Path(path).expanduser().resolve()
+        if self.path.exists() and (
+            not self.path.is_dir() or any(self.path.iterdir())
+        ):
+            raise ValueError(f"Capture “{self.path}” already exists")
+        if block_size < 1:
+            raise ValueError(
+                f"Block size must be at least 1, not {block_size}"
+            )
+
+        self.configuration = configuration
+        self.attributes = attributes
+        self.block_size = block_size
+        self.channels = enabled_channels(configuration)
+        self.rows = 0
+        """Number of rows written to the capture"""
+        self.files: dict[str, BinaryIO] = {}
+
+    def __enter__(self) -> CaptureWriter:
+        """Create the capture
+
+        Returns:
+
+            The opened capture writer
+
+        """
+
+        self.open()
+        return self
+
+    def __exit__(
+        self,
+        exception_type: type[BaseException] | None,
+        exception_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the capture
+
+        Args:
+
+            exception_type:
+
+                The type of the exception in case of an exception
+
+            exception_value:
+
+                The value of the exception in case of an exception
+
+            traceback:
+
+                The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def open(self) -> None:
+        """Create the directory, metadata and column files of the capture"""
+
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        metadata = {
+            "version": CAPTURE_VERSION,
+            "created": datetime.now().isoformat(),
+            "block_size": self.block_size,
+            "channels": [CHANNELS[channel] for channel in self.channels],
+            "sensor_node": (
+                None
+                if self.attributes is None
+                else {
+                    "name": self.attributes.name,
+                    "mac_address": str(self.attributes.mac_address),
+                    "adc_configuration": {
+                        "prescaler": (
+                            self.attributes.adc_configuration.prescaler
+                        ),
+                        "acquisition_time": (
+                            self.attributes.adc_configuration.acquisition_time
+                        ),
+                        "oversampling_rate": (
+                            self.attributes.adc_configuration.oversampling_rate
+                        ),
+                        "reference_voltage": (
+                            self.attributes.adc_configuration.reference_voltage
+                        ),
+                    },
+                }
+            ),
+        }
+        (self.path / METADATA).write_text(
+            json.dumps(metadata, indent=2) + "\n", encoding="utf-8"
+        )
+
+        filenames = {
+            CHANNELS[channel]: column_filename(CHANNELS[channel], VALUES)
+            for channel in self.channels
+        }
+        filenames.update({
+            name: column_filename(name, dtype)
+            for name, dtype in COLUMNS.items()
+        })
+        filenames[INDEX] = INDEX
+        self.files = {
+            name: open(  # pylint: disable=consider-using-with
+                self.path / filename, "xb"
+            )
+            for name, filename in filenames.items()
+        }
+
+    def append(self, windows: list[MeasurementWindow]) -> int:
+        """Append measurement data to the capture
+
+        Args:
+
+            windows:
+
+                The measurement windows that should be added to the capture
+
+        Returns:
+
+            The number of rows added to the capture
+
+        """
+
+        windows = [window for window in windows if window.samples()]
+        if not windows:
+            return 0
+
+        values = np.concatenate([window.data for window in windows])
+        timestamps = np.concatenate([window.timestamps for window in windows])
+        for channel in self.channels:
+            values[:, channel].astype(VALUES).tofile(
+                self.files[CHANNELS[channel]]
+            )
+        timestamps.astype(COLUMNS["timestamps"]).tofile(
+            self.files["timestamps"]
+        )
+        for name in ("sample_indices", "counters"):
+            np.concatenate(
+                [getattr(window, name) for window in windows]
+            ).astype(COLUMNS[name]).tofile(self.files[name])
+
+        # Timestamps of the first rows of all blocks that start in the new data
+        first = -(-self.rows // self.block_size) * self.block_size
+        timestamps[first - self.rows :: self.block_size].astype(
+            COLUMNS["timestamps"]
+        ).tofile(self.files[INDEX])
+
+        self.rows += len(timestamps)
+        return len(timestamps)
+
+    def flush(self) -> None:
+        """Hand over all buffered data of the capture to the operating system
+
+        Afterwards readers (:class:`Capture`) can access all rows written
+        before.
+
+        """
+
+        for file in self.files.values():
+            file.flush()
+
+    def synchronize(self) -> None:
+        """Write all buffered data of the capture to the disk"""
+
+        self.flush()
+        for file in self.files.values():
+            os.fsync(file.fileno())
+
+    def close(self) -> None:
+        """Write the remaining data and close the files of the capture"""
+
+        for file in self.files.values():
+            file.close()
+        self.files = {}
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class Capture:
+    """Read measurement data of a capture
+
+    The class provides the data as read only memory mapped arrays, which is
+    why slicing a column does neither read the whole file nor copy data.
+
+    Args:
+
+        path:
+
+            The path of the capture directory
+
+    Raises:
+
+        ValueError:
+
+            If the directory does not contain a supported capture
+
+    """
+
+    def __init__(self, path: Path | str) -> None:
+
+        self.path = Path(path).expanduser().resolve()
+        try:
+            metadata = json.loads(
+                (self.path / METADATA).read_text(encoding="utf-8")
+            )
+        except (OSError, json.JSONDecodeError) as error:
+            raise ValueError(
+                f"Unable to read capture “{self.path}”: {error}"
+            ) from error
+        if metadata.get("version") != CAPTURE_VERSION:
+            raise ValueError(
+                f"Unsupported capture version: {metadata.get('version')}"
+            )
+
+        self.created = datetime.fromisoformat(metadata["created"])
+        """Creation time of the capture"""
+        self.block_size: int = metadata["block_size"]
+        """Number of rows per block of the time index"""
+        self.configuration = StreamingConfiguration(
+            **{name: name in metadata["channels"] for name in CHANNELS}
+        )
+        """Streaming configuration of the measurement"""
+        sensor_node = metadata["sensor_node"]
+        self.attributes = (
+            None
+            if sensor_node is None
+            else SensorNodeAttributes(
+                name=sensor_node["name"],
+                mac_address=EUI(sensor_node["mac_address"]),
+                adc_configuration=ADCConfiguration(
+                    **sensor_node["adc_configuration"]
+                ),
+            )
+        )
+        """Information about the sensor node"""
+
+        dtypes: dict[str, np.dtype] = {
+            name: VALUES for name in metadata["channels"]
+        }
+        dtypes.update(COLUMNS)
+        # The files might contain a partially written row, if the writer did
+        # not finish properly
+        self.rows = min(
+            (self.path / column_filename(name, dtype)).stat().st_size
+            // dtype.itemsize
+            for name, dtype in dtypes.items()
+        )
+        """Number of rows (samples per channel) of the capture"""
+        self.columns = {
+            name: self._map(column_filename(name, dtype), dtype, self.rows)
+            for name, dtype in dtypes.items()
+        }
+        """Memory mapped columns of the capture"""
+        self.index = self._map(
+            INDEX, COLUMNS["timestamps"], -(-self.rows // self.block_size)
+        )
+        """Timestamps of the first row of every block"""
+
+    def __enter__(self) -> Capture:
+        """Use the capture as context manager
+
+        Returns:
+
+            The capture itself
+
+        """
+
+        return self
+
+    def __exit__(
+        self,
+        exception_type: type[BaseException] | None,
+        exception_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Release the memory maps of the capture
+
+        Args:
+
+            exception_type:
+
+                The type of the exception in case of an exception
+
+            exception_value:
+
+                The value of the exception in case of an exception
+
+            traceback:
+
+                The traceback in case of an exception
+
+        """
+
+        self.close()
+
+    def __len__(self) -> int:
+        """Get the number of rows of the capture
+
+        Returns:
+
+            The number of samples (per channel) stored in the capture
+
+        """
+
+        return self.rows
+
+    def _map(self, filename: str, dtype: np.dtype, rows: int) -> np.ndarray:
+        """Map a column file into memory
+
+        Args:
+
+            filename:
+
+                The name of the column file
+
+            dtype:
+
+                The data type of the column
+
+            rows:
+
+                The number of rows that should be mapped
+
+        Returns:
+
+            A read only array containing the data of the column
+
+        """
+
+        if rows == 0:  # Memory mapping does not support empty files
+            return np.empty(0, dtype=dtype)
+        return np.memmap(
+            self.path / filename, dtype=dtype, mode="r", shape=(rows,)
+        )
+
+    def close(self) -> None:
+        """Release the memory maps of the capture
+
+        Arrays returned by the capture before stay valid.
+
+        """
+
+        self.columns = {}
+        self.index = np.empty(0, dtype=COLUMNS["timestamps"])
+
+    def sample_rate(self) -> float | None:
+        """Get the sample rate of a single channel
+
+        Returns:
+
+            The number of samples per second of every channel or ``None``, if
+            the capture does not contain the ADC configuration
+
+        """
+
+        if self.attributes is None:
+            return None
+        return channel_sample_rate(
+            self.attributes.adc_configuration, self.configuration
+        )
+
+    def duration(self) -> float:
+        """Get the time between the first and last row of the capture
+
+        Returns:
+
+            The duration of the capture in seconds
+
+        """
+
+        timestamps = self.columns["timestamps"]
+        return float(timestamps[-1] - timestamps[0]) if self.rows else 0.0
+
+    def offset(self, time: float) -> int:
+        """Get the row of the first sample at or after a certain time
+
+        Args:
+
+            time:
+
+                The time in seconds since the first sample of the capture
+
+        Returns:
+
+            The index of the row
+
+        Examples:
+
+            Import necessary code
+
+            >>> from tempfile import TemporaryDirectory
+            >>> from icotronic.can.streaming import StreamingData
+            >>> from icostate.buffer import MeasurementBuffer
+
+            Find the first row of a timestamp that starts in one block and
+            ends in the next one
+
+            >>> configuration = StreamingConfiguration(first=True)
+            >>> buffer = MeasurementBuffer(configuration, capacity=12)
+            >>> for counter in range(4):
+            ...     buffer.append(StreamingData(values=[1, 2, 3],
+            ...                                 counter=counter,
+            ...                                 timestamp=counter))
+            >>> with TemporaryDirectory() as directory:
+            ...     path = Path(directory) / "measurement.icocap"
+            ...     with CaptureWriter(path, configuration,
+            ...                        block_size=4) as writer:
+            ...         rows = writer.append([buffer.window(0, 12)])
+            ...     with Capture(path) as capture:
+            ...         [capture.offset(time) for time in (0, 0.5, 1, 2, 9)]
+            [0, 3, 3, 6, 12]
+
+        """
+
+        if self.rows == 0:
+            return 0
+
+        timestamps = self.columns["timestamps"]
+        target = timestamps[0] + time
+        # The rows of a timestamp might start in the block before the first
+        # block that starts with the timestamp
+        block = max(int(np.searchsorted(self.index, target, "left")) - 1, 0)
+        start = block * self.block_size
+        stop = min(start + self.block_size, self.rows)
+        return start + int(np.searchsorted(timestamps[start:stop], target))
+
+    def rows_between(
+        self, start: float | None = None, stop: float | None = None
+    ) -> slice:
+        """Get the rows of a time range
+
+        Args:
+
+            start:
+
+                The start time in seconds since the first sample of the
+                capture or ``None`` for the beginning of the capture
+
+            stop:
+
+                The (exclusive) end time in seconds since the first sample of
+                the capture or ``None`` for the end of the capture
+
+        Returns:
+
+            The rows of the time range
+
+        """
+
+        return slice(
+            0 if start is None else self.offset(start),
+            self.rows if stop is None else self.offset(stop),
+        )
+
+    def column(
+        self, name: str, start: float | None = None, stop: float | None = None
+    ) -> np.ndarray:
+        """Get the data of a column for a time range
+
+        Args:
+
+            name:
+
+                The name of the column: a channel name (``first``,
+                ``second`` or ``third``), ``sample_indices``, ``timestamps``
+                or ``counters``
+
+            start:
+
+                The start time in seconds since the first sample of the
+                capture or ``None`` for the beginning of the capture
+
+            stop:
+
+                The (exclusive) end time in seconds since the first sample of
+                the capture or ``None`` for the end of the capture
+
+        Returns:
+
+            A read only view into the memory mapped column
+
+        Raises:
+
+            ValueError:
+
+                If the capture does not contain the column
+
+        """
+
+        if name not in self.columns:
+            raise ValueError(f"Capture does not contain column “{name}”")
+
+        return self.columns[name][self.rows_between(start, stop)]
+
+    def channel(
+        self, name: str, start: float | None = None, stop: float | None = None
+    ) -> np.ndarray:
+        """Get the values of a measurement channel for a time range
+
+        Args:
+
+            name:
+
+                The name of the channel (``first``, ``second`` or ``third``)
+
+            start:
+
+                The start time in seconds since the first sample of the
+                capture or ``None`` for the beginning of the capture
+
+            stop:
+
+                The (exclusive) end time in seconds since the first sample of
+                the capture or ``None`` for the end of the capture
+
+        Returns:
+
+            A read only view into the memory mapped channel values
+
+        """
+
+        if name not in CHANNELS:
+            raise ValueError(f"Unknown channel: “{name}”")
+
+        return self.column(name, start, stop)
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
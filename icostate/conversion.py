@@ -0,0 +1,358 @@
+"""Convert raw ADC values into physical units"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections.abc import Mapping, Sequence
+from functools import partial
+
+import numpy as np
+
+from icotronic.can.adc import ADCConfiguration
+from icotronic.can.sensor import SensorConfiguration
+from icotronic.measurement import Conversion
+from icotronic.measurement.constants import ADC_MAX_VALUE
+
+from icostate.buffer import CHANNELS
+
+# -- Functions ----------------------------------------------------------------
+
+
+def convert(value: float, scale: float, offset: float) -> float:
+    """Convert a single raw value
+
+    Args:
+
+        value:
+
+            The raw value
+
+        scale:
+
+            The factor of the conversion
+
+        offset:
+
+            The offset of the conversion
+
+    Returns:
+
+        The converted value
+
+    """
+
+    return value * scale + offset
+
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-few-public-methods
+
+
+class SensorCalibration:
+    """Store how a sensor maps its output voltage to a physical quantity
+
+    Args:
+
+        unit:
+
+            The unit of the physical quantity (e.g. ``°C``)
+
+        sensitivity:
+
+            The change of the physical quantity per volt
+
+        offset:
+
+            The value of the physical quantity at an output voltage of 0 V
+
+    Examples:
+
+        Describe a temperature sensor with 10 mV/°C and an offset of 500 mV
+
+        >>> SensorCalibration("°C", sensitivity=100, offset=-50)
+        °C = 100 · V + -50
+
+    """
+
+    def __init__(
+        self, unit: str, sensitivity: float = 1, offset: float = 0
+    ) -> None:
+
+        self.unit = unit
+        self.sensitivity = sensitivity
+        self.offset = offset
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the calibration
+
+        Returns:
+
+            A string containing the linear equation of the calibration
+
+        """
+
+        return f"{self.unit} = {self.sensitivity} · V + {self.offset}"
+
+
+# pylint: enable=too-few-public-methods
+
+
+class LinearConversion:
+    """Convert raw ADC values of all channels at once
+
+    Every conversion of the ICOtronic system is linear. The class therefore
+    stores a factor and an offset for each of the three measurement
+    channels and converts a whole array of values with two NumPy operations.
+
+    Args:
+
+        scale:
+
+            The factor of every channel (first, second, third)
+
+        offset:
+
+            The offset of every channel (first, second, third)
+
+        units:
+
+            The unit of every channel (first, second, third)
+
+    Examples:
+
+        Convert raw values into multiples of g₀ (first channel) and volts
+        (third channel)
+
+        >>> conversion = LinearConversion(scale=[200 / 0xFFFF, 1,
+        ...                                      3.3 / 0xFFFF],
+        ...                               offset=[-100, 0, 0],
+        ...                               units=["g", "", "V"])
+        >>> values = np.array([[0, np.nan, 0xFFFF], [0xFFFF, np.nan, 0]])
+        >>> conversion.apply(values)
+        array([[-100. ,    nan,    3.3],
+               [ 100. ,    nan,    0. ]])
+
+    """
+
+    def __init__(
+        self,
+        scale: Sequence[float],
+        offset: Sequence[float],
+        units: Sequence[str],
+    ) -> None:
+
+        if not len(scale) == len(offset) == len(units) == len(CHANNELS):
+            raise ValueError(
+                f"Conversion requires values for {len(CHANNELS)} channels"
+            )
+
+        self.scale = np.array(scale, dtype=np.float64)
+        self.offset = np.array(offset, dtype=np.float64)
+        self.units = list(units)
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the conversion
+
+        Returns:
+
+            A string containing the conversion of every channel
+
+        Examples:
+
+            >>> LinearConversion.acceleration(200)
+            First: g, Second: g, Third: g
+
+        """
+
+        return ", ".join(
+            f"{name.capitalize()}: {unit}"
+            for name, unit in zip(CHANNELS, self.units)
+        )
+
+    @classmethod
+    def acceleration(cls, sensor_range: float) -> LinearConversion:
+        """Get the conversion of acceleration sensors
+
+        Args:
+
+            sensor_range:
+
+                The maximum acceleration minus the minimum acceleration of
+                the sensor in multiples of g₀ (e.g. 200 for a ±100 g₀
+                sensor)
+
+        Returns:
+
+            A conversion into multiples of the standard gravity g₀
+
+        Examples:
+
+            >>> conversion = LinearConversion.acceleration(100)
+            >>> conversion.apply(np.array([[0, 2**15, 0xFFFF]])).round(2)
+            array([[-50.,   0.,  50.]])
+
+        """
+
+        # The sensor maps the maximum negative acceleration to 0 and the
+        # maximum positive acceleration to the maximum ADC value
+        return cls(
+            scale=[sensor_range / ADC_MAX_VALUE] * len(CHANNELS),
+            offset=[-sensor_range / 2] * len(CHANNELS),
+            units=["g"] * len(CHANNELS),
+        )
+
+    @classmethod
+    def create(
+        cls,
+        adc_configuration: ADCConfiguration,
+        sensor_configuration: SensorConfiguration | None = None,
+        sensors: Mapping[int, SensorCalibration] | None = None,
+        acceleration_range: float | None = None,
+    ) -> LinearConversion:
+        """Get the conversion for the configuration of a sensor node
+
+        Args:
+
+            adc_configuration:
+
+                The ADC configuration of the sensor node, which contains the
+                reference voltage
+
+            sensor_configuration:
+
+                The sensor numbers of the measurement channels or ``None``,
+                if the sensor node does not support a sensor configuration
+                (e.g. STH). In the latter case all channels measure
+                acceleration (see :meth:`acceleration`).
+
+            sensors:
+
+                The calibration of the sensor numbers. The conversion
+                returns the voltage for channels that use other sensors.
+
+            acceleration_range:
+
+                The maximum acceleration minus the minimum acceleration of
+                the acceleration sensor in multiples of g₀, which is only
+                required for sensor nodes without sensor configuration
+
+        Returns:
+
+            The conversion for the measurement channels
+
+        Raises:
+
+            ValueError:
+
+                If the sensor node does not support a sensor configuration
+                and you did not specify the acceleration range
+
+        Examples:
+
+            Convert values of a temperature sensor (sensor 2) and a
+            sensor without calibration (sensor 1)
+
+            >>> adc_configuration = ADCConfiguration(reference_voltage=3.3,
+            ...                                      prescaler=2,
+            ...                                      acquisition_time=8,
+            ...                                      oversampling_rate=64)
+            >>> sensors = {2: SensorCalibration("°C", 100, -50)}
+            >>> conversion = LinearConversion.create(
+            ...     adc_configuration,
+            ...     SensorConfiguration(first=2, second=1, third=2),
+            ...     sensors)
+            >>> conversion
+            First: °C, Second: V, Third: °C
+            >>> conversion.apply(np.array([[0xFFFF / 3.3] * 3])).round(2)
+            array([[50.,  1., 50.]])
+
+            Convert values of a ±50 g₀ sensor node without sensor
+            configuration
+
+            >>> LinearConversion.create(adc_configuration,
+            ...                         acceleration_range=100).offset
+            array([-50., -50., -50.])
+            >>> LinearConversion.create(adc_configuration)
+            Traceback (most recent call last):
+               ...
+            ValueError: Conversion of acceleration requires the sensor range
+
+        """
+
+        if sensor_configuration is None:
+            if acceleration_range is None:
+                raise ValueError(
+                    "Conversion of acceleration requires the sensor range"
+                )
+            return cls.acceleration(acceleration_range)
+
+        sensors = {} if sensors is None else sensors
+        volts = adc_configuration.reference_voltage / ADC_MAX_VALUE
+        calibrations = [
+            sensors.get(sensor_configuration[name], SensorCalibration("V"))
+            for name in CHANNELS
+        ]
+
+        return cls(
+            scale=[volts * sensor.sensitivity for sensor in calibrations],
+            offset=[sensor.offset for sensor in calibrations],
+            units=[sensor.unit for sensor in calibrations],
+        )
+
+    def apply(
+        self, values: np.ndarray, out: np.ndarray | None = None
+    ) -> np.ndarray:
+        """Convert raw values
+
+        Args:
+
+            values:
+
+                The raw values (one row per sample, one column for each
+                of the three channels)
+
+            out:
+
+                The array that should store the result (e.g. ``values`` for
+                an in place conversion) or ``None`` for a new array
+
+        Returns:
+
+            The values in physical units
+
+        """
+
+        result = np.multiply(values, self.scale, out=out)
+        return np.add(result, self.offset, out=result)
+
+    def conversion(self) -> Conversion:
+        """Get the conversion functions for single values
+
+        Returns:
+
+            Conversion functions for the ICOtronic library (e.g.
+            :meth:`icotronic.measurement.MeasurementData.apply`)
+
+        Examples:
+
+            >>> conversion = LinearConversion.acceleration(200).conversion()
+            >>> conversion.first(0)
+            -100.0
+
+        """
+
+        functions = [
+            partial(convert, scale=float(scale), offset=float(offset))
+            for scale, offset in zip(self.scale, self.offset)
+        ]
+        return Conversion(*functions)
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,206 @@
+"""Running counters for measurements"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from copy import copy
+from time import monotonic
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class MeasurementCounters:
+    """Store running counters of a single measurement
+
+    Updating the counters only requires a few arithmetic operations, which is
+    why the measurement updates them for every streaming message.
+
+    Examples:
+
+        Count two messages with a lost message in between
+
+        >>> counters = MeasurementCounters()
+        >>> counters.add_message(samples=3, lost=0, timestamp=10.0)
+        >>> counters.add_message(samples=3, lost=1, timestamp=10.5)
+        >>> counters.messages
+        2
+        >>> counters.samples
+        6
+        >>> counters.max_gap
+        0.5
+        >>> round(counters.dataloss(), 2)
+        0.33
+
+    """
+
+    def __init__(self) -> None:
+
+        self.start = monotonic()
+        """Time (monotonic clock) the measurement started"""
+        self.messages = 0
+        """Number of received streaming messages"""
+        self.samples = 0
+        """Number of received samples (per channel)"""
+        self.lost_messages = 0
+        """Number of lost streaming messages"""
+        self.windows = 0
+        """Number of emitted measurement windows"""
+        self.emit_time = 0.0
+        """Time in seconds spent emitting the event
+        ``sensor_node_measurement_data``. This includes synchronous
+        listeners, but not coroutine listeners, which run later."""
+        self.sample_rate = 0.0
+        """Sample rate (per channel) achieved since the last rate update"""
+        self.max_gap = 0.0
+        """Maximum time in seconds between two received streaming messages"""
+        self.recorded_samples = 0
+        """Number of samples (per channel) written to the recording"""
+        self.recording_lag = 0.0
+        """Time in seconds it took the recorder to write the newest data"""
+        self._timestamp: float | None = None
+        self._rate_time = self.start
+        self._rate_samples = 0
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the counters
+
+        Returns:
+
+            A string containing the values of the counters
+
+        Examples:
+
+            >>> MeasurementCounters() # doctest:+NORMALIZE_WHITESPACE
+            Messages: 0, Samples: 0, Lost Messages: 0, Windows: 0,
+            Emit Time: 0.000 s, Sample Rate: 0.0 Hz, Maximum Gap: 0.000 s
+
+        """
+
+        return ", ".join([
+            f"Messages: {self.messages}",
+            f"Samples: {self.samples}",
+            f"Lost Messages: {self.lost_messages}",
+            f"Windows: {self.windows}",
+            f"Emit Time: {self.emit_time:.3f} s",
+            f"Sample Rate: {self.sample_rate:.1f} Hz",
+            f"Maximum Gap: {self.max_gap:.3f} s",
+        ])
+
+    def add_message(self, samples: int, lost: int, timestamp: float) -> None:
+        """Count a received streaming message
+
+        Args:
+
+            samples:
+
+                The number of samples (per channel) of the message
+
+            lost:
+
+                The number of messages lost right before the message
+
+            timestamp:
+
+                The receive time of the message in seconds
+
+        """
+
+        self.messages += 1
+        self.samples += samples
+        self.lost_messages += lost
+        if self._timestamp is not None:
+            self.max_gap = max(self.max_gap, timestamp - self._timestamp)
+        self._timestamp = timestamp
+
+    def add_window(self, emit_time: float = 0) -> None:
+        """Count an emitted measurement window
+
+        Args:
+
+            emit_time:
+
+                The time in seconds it took to emit the window as event
+
+        """
+
+        self.windows += 1
+        self.emit_time += emit_time
+
+    def update_sample_rate(self) -> float:
+        """Calculate the sample rate achieved since the last call
+
+        Returns:
+
+            The sample rate (per channel) in Hz
+
+        """
+
+        now = monotonic()
+        if now > self._rate_time:
+            self.sample_rate = (self.samples - self._rate_samples) / (
+                now - self._rate_time
+            )
+        self._rate_time = now
+        self._rate_samples = self.samples
+
+        return self.sample_rate
+
+    def dataloss(self) -> float:
+        """Get the ratio of lost streaming messages
+
+        Returns:
+
+            A value between 0 (no data loss) and 1 (all data lost)
+
+        Examples:
+
+            >>> MeasurementCounters().dataloss()
+            0.0
+
+        """
+
+        total = self.messages + self.lost_messages
+        return self.lost_messages / total if total else 0.0
+
+    def elapsed(self) -> float:
+        """Get the time since the start of the measurement
+
+        Returns:
+
+            The runtime of the measurement in seconds
+
+        """
+
+        return monotonic() - self.start
+
+    def copy(self) -> MeasurementCounters:
+        """Get a snapshot of the counters
+
+        Returns:
+
+            A copy of the counters that the measurement does not update
+
+        Examples:
+
+            >>> counters = MeasurementCounters()
+            >>> snapshot = counters.copy()
+            >>> counters.add_window(emit_time=0.1)
+            >>> snapshot.windows, counters.windows
+            (0, 1)
+
+        """
+
+        return copy(self)
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,207 @@
+"""Reduced measurement data for live plots"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import CHANNELS, enabled_channels, MeasurementWindow
+from icostate.pyramid import Buckets
+
+# -- Classes ------------------------------------------------------------------
+
+
+class Envelope:
+    """Minimum and maximum of consecutive groups of measurement data
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        timestamps:
+
+            The timestamps of the first sample of every group
+
+        minimum:
+
+            The minimum of every group (one column per enabled channel)
+
+        maximum:
+
+            The maximum of every group (one column per enabled channel)
+
+    """
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        timestamps: np.ndarray,
+        minimum: np.ndarray,
+        maximum: np.ndarray,
+    ) -> None:
+
+        self.configuration = configuration
+        self.timestamps = timestamps
+        self.minimum = minimum
+        self.maximum = maximum
+        self.sequence = 0
+        """Sequence number of the envelope in the current measurement"""
+
+    def __len__(self) -> int:
+        """Get the number of groups of the envelope
+
+        Returns:
+
+            The number of minimum/maximum pairs of every channel
+
+        """
+
+        return len(self.timestamps)
+
+    def channel(self, name: str) -> np.ndarray:
+        """Get the minimum/maximum pairs of a single channel
+
+        Args:
+
+            name:
+
+                The name of the channel (``first``, ``second`` or ``third``)
+
+        Returns:
+
+            An array with one row (minimum, maximum) per group
+
+        Raises:
+
+            ValueError:
+
+                If the channel is not enabled
+
+        """
+
+        channels = [
+            CHANNELS[index] for index in enabled_channels(self.configuration)
+        ]
+        if name not in channels:
+            raise ValueError(f"Channel “{name}” is not enabled")
+
+        column = channels.index(name)
+        return np.column_stack(
+            (self.minimum[:, column], self.maximum[:, column])
+        )
+
+    def to_dict(self) -> dict[str, list[float]]:
+        """Get the envelope as JSON serializable dictionary
+
+        Returns:
+
+            A dictionary containing the timestamps and the interleaved
+            minimum/maximum values of every enabled channel
+
+        Examples:
+
+            >>> Envelope(StreamingConfiguration(first=True),
+            ...          timestamps=np.array([1.0, 2.0]),
+            ...          minimum=np.array([[1.0], [3.0]]),
+            ...          maximum=np.array([[2.0], [4.0]])).to_dict()
+            {'timestamps': [1.0, 2.0], 'first': [1.0, 2.0, 3.0, 4.0]}
+
+        """
+
+        data = {"timestamps": self.timestamps.tolist()}
+        for index in enabled_channels(self.configuration):
+            name = CHANNELS[index]
+            data[name] = self.channel(name).ravel().tolist()
+
+        return data
+
+
+# pylint: disable=too-few-public-methods
+
+
+class EnvelopeDecimator:
+    """Reduce measurement data to the minimum and maximum of groups
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        size:
+
+            The number of samples (per channel) of a single group
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Reduce 6 samples of two channels to groups of 4 samples
+
+        >>> configuration = StreamingConfiguration(first=True, second=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=8)
+        >>> for counter in range(8):
+        ...     buffer.append(StreamingData(values=[counter, -counter],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+        >>> decimator = EnvelopeDecimator(configuration, size=4)
+        >>> len(decimator.add(buffer.window(0, 3)))
+        0
+        >>> envelope = decimator.add(buffer.window(3, 8))
+        >>> envelope.channel("first")
+        array([[0., 3.],
+               [4., 7.]])
+        >>> envelope.channel("second")
+        array([[-3.,  0.],
+               [-7., -4.]])
+
+    """
+
+    def __init__(
+        self, configuration: StreamingConfiguration, size: int
+    ) -> None:
+
+        self.configuration = configuration
+        self.buckets = Buckets(configuration, size)
+
+    def add(self, window: MeasurementWindow) -> Envelope:
+        """Reduce measurement data
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        Returns:
+
+            The envelope of all groups completed by the new data
+
+        """
+
+        timestamps, values = self.buckets.add(window)
+        return Envelope(
+            self.configuration,
+            timestamps,
+            values.min(axis=1),
+            values.max(axis=1),
+        )
+
+
+# pylint: enable=too-few-public-methods
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,414 @@
+"""Keep the history of long measurements with bounded memory"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections import deque
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from threading import Lock
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import CHANNELS, combine, MeasurementWindow, slice_window
+from icostate.capture import Capture, CAPTURE_SUFFIX, CaptureWriter
+from icostate.sensor import SensorNodeAttributes
+from icostate.worker import BackgroundWorker
+
+# -- Functions ----------------------------------------------------------------
+
+
+def nbytes(window: MeasurementWindow) -> int:
+    """Get the memory used by the arrays of a window
+
+    Args:
+
+        window:
+
+            The measurement data
+
+    Returns:
+
+        The number of bytes of all columns of the window
+
+    """
+
+    return (
+        window.data.nbytes
+        + window.sample_indices.nbytes
+        + window.timestamps.nbytes
+        + window.counters.nbytes
+    )
+
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class History(BackgroundWorker):
+    """Store all data of a measurement using a fixed amount of memory
+
+    The history keeps the newest data in memory. As soon as the data in
+    memory exceeds the memory budget, the history appends the oldest data
+    in blocks to a capture on the disk (see :class:`icostate.capture.
+    Capture`), which stores the values as 32 bit floating point numbers.
+    A background thread adds the data and writes it to the disk, which is
+    why the history never delays the measurement updates. Queries combine
+    the data of both parts. Since the capture maps its files into memory,
+    a query only reads the requested part of the capture from the disk.
+
+    Args:
+
+        path:
+
+            The path of the capture that stores the older data or ``None``
+            for a temporary capture, which the history removes when you
+            close it. Since the history keeps a capture stored at a path you
+            specified, every measurement requires a new history (or a
+            temporary capture).
+
+        memory:
+
+            The maximum number of bytes of the data kept in memory
+
+        block_size:
+
+            The number of rows (samples per channel) the history moves to
+            the disk at once
+
+        maxsize:
+
+            The maximum number of windows waiting for the background thread
+
+    Raises:
+
+        ValueError:
+
+            If the memory budget is smaller than a single block
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Keep at most 300 rows of a single channel in memory
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=1200)
+        >>> for counter in range(400):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter % 256,
+        ...                                 timestamp=counter / 100))
+        >>> history = History(memory=300 * 41, block_size=100)
+        >>> history.start(configuration)
+        >>> for start in range(0, 1200, 60):
+        ...     history.put(buffer.window(start, start + 60).copy())
+        >>> run(history.stop())
+        >>> len(history), history.spilled
+        (1200, 960)
+        >>> history.used <= 300 * 41
+        True
+
+        Query data from the disk and from memory
+
+        >>> window = history.window(start=2.5, stop=3.5)
+        >>> window.samples(), int(window.sample_indices[0])
+        (300, 750)
+        >>> window.channel("first")[:6]
+        array([1., 2., 3., 1., 2., 3.])
+        >>> history.close()
+
+    """
+
+    def __init__(
+        self,
+        path: Path | str | None = None,
+        memory: int = 2**26,
+        block_size: int = 2**14,
+        maxsize: int = 256,
+    ) -> None:
+
+        # Size of a row containing all channels
+        if memory < block_size * (len(CHANNELS) * 8 + 8 + 8 + 1):
+            raise ValueError(
+                f"Memory budget of {memory} bytes is smaller than a block"
+            )
+
+        super().__init__("icostate-history", maxsize)
+        self.lock = Lock()
+        """Lock that protects the data against concurrent access of the
+        background thread and queries"""
+        self.path = None if path is None else Path(path)
+        self.memory = memory
+        self.block_size = block_size
+        self.configuration = StreamingConfiguration()
+        """Streaming configuration of the measurement"""
+        self.attributes: SensorNodeAttributes | None = None
+        """Information about the sensor node"""
+        self.windows: deque[MeasurementWindow] = deque()
+        """Newest data (in memory)"""
+        self.used = 0
+        """Number of bytes used by the data in memory"""
+        self.spilled = 0
+        """Number of rows stored on the disk"""
+        self.start_time: float | None = None
+        """Timestamp of the first sample"""
+        self.writer: CaptureWriter | None = None
+        self.capture: Capture | None = None
+        self.directory: TemporaryDirectory | None = None
+
+    def __len__(self) -> int:
+        """Get the number of rows of the history
+
+        Returns:
+
+            The number of samples (per channel) stored on the disk and in
+            memory
+
+        """
+
+        with self.lock:
+            return self.spilled + sum(
+                window.samples() for window in self.windows
+            )
+
+    def start(
+        self,
+        configuration: StreamingConfiguration,
+        attributes: SensorNodeAttributes | None = None,
+    ) -> None:
+        """Prepare the history for a new measurement and start the
+        background thread
+
+        Args:
+
+            configuration:
+
+                The streaming configuration of the measurement
+
+            attributes:
+
+                Information about the sensor node, which the capture stores
+                as metadata
+
+        Raises:
+
+            ValueError:
+
+                If the capture at the path of the history already exists
+
+        """
+
+        self.close()
+        self.configuration = configuration
+        self.attributes = attributes
+        if self.path is not None:
+            # Create the capture here, since the background thread can not
+            # report an existing capture to the caller
+            self._open(self.path)
+        self._start()
+
+    def _work(self) -> None:
+        """Add the data of the queue to the history (background thread)"""
+
+        while (item := self.queue.get()) is not None:
+            _, window = item
+            if window.samples() == 0:
+                continue
+
+            with self.lock:
+                if self.start_time is None:
+                    self.start_time = float(window.timestamps[0])
+                self.windows.append(window)
+                self.used += nbytes(window)
+
+                while self.used > self.memory:
+                    self._spill()
+
+    def window(
+        self, start: float | None = None, stop: float | None = None
+    ) -> MeasurementWindow:
+        """Get the data of a time range
+
+        Args:
+
+            start:
+
+                The start time in seconds since the first sample of the
+                measurement or ``None`` for the beginning of the measurement
+
+            stop:
+
+                The (exclusive) end time in seconds since the first sample
+                of the measurement or ``None`` for the end of the
+                measurement
+
+        Returns:
+
+            A window containing a copy of the data
+
+        """
+
+        with self.lock:
+            return self._window(start, stop)
+
+    def _window(
+        self, start: float | None = None, stop: float | None = None
+    ) -> MeasurementWindow:
+        """Get the data of a time range (without locking)
+
+        Args:
+
+            start:
+
+                The start time in seconds since the first sample of the
+                measurement or ``None`` for the beginning of the measurement
+
+            stop:
+
+                The (exclusive) end time in seconds since the first sample
+                of the measurement or ``None`` for the end of the
+                measurement
+
+        Returns:
+
+            A window containing a copy of the data
+
+        """
+
+        parts = []
+        capture = self._capture()
+        if capture is not None:
+            selected = capture.rows_between(start, stop)
+            values = np.full(
+                (selected.stop - selected.start, len(CHANNELS)), np.nan
+            )
+            for channel, name in enumerate(CHANNELS):
+                if name in capture.columns:
+                    values[:, channel] = capture.columns[name][selected]
+            parts.append(
+                MeasurementWindow(
+                    self.configuration,
+                    values,
+                    np.array(capture.columns["sample_indices"][selected]),
+                    np.array(capture.columns["timestamps"][selected]),
+                    np.array(capture.columns["counters"][selected]),
+                )
+            )
+
+        first = 0.0 if self.start_time is None else self.start_time
+        begin = -np.inf if start is None else first + start
+        end = np.inf if stop is None else first + stop
+        for window in self.windows:
+            timestamps = window.timestamps
+            if timestamps[-1] < begin or timestamps[0] >= end:
+                continue
+            parts.append(
+                slice_window(
+                    window,
+                    int(np.searchsorted(timestamps, begin)),
+                    int(np.searchsorted(timestamps, end)),
+                )
+            )
+
+        return combine(self.configuration, parts)
+
+    def close(self) -> None:
+        """Remove all data of the history
+
+        The history removes a temporary capture, but keeps a capture stored
+        at a path you specified. Only close the history after the
+        measurement ended.
+
+        """
+
+        with self.lock:
+            if self.capture is not None:
+                self.capture.close()
+                self.capture = None
+            if self.writer is not None:
+                self.writer.close()
+                self.writer = None
+            if self.directory is not None:
+                self.directory.cleanup()
+                self.directory = None
+            self.windows.clear()
+            self.used = 0
+            self.spilled = 0
+            self.start_time = None
+
+    def _spill(self) -> None:
+        """Move the oldest block of data from memory to the disk (background
+        thread)"""
+
+        if self.writer is None:
+            # The method `close` removes the directory
+            # pylint: disable=consider-using-with
+            self.directory = TemporaryDirectory(prefix="icostate-")
+            # pylint: enable=consider-using-with
+            self._open(Path(self.directory.name) / f"history{CAPTURE_SUFFIX}")
+        assert isinstance(self.writer, CaptureWriter)
+
+        windows = []
+        samples = 0
+        while self.windows and samples < self.block_size:
+            window = self.windows.popleft()
+            self.used -= nbytes(window)
+            windows.append(window)
+            samples += window.samples()
+
+        self.spilled += self.writer.append(windows)
+
+    def _open(self, path: Path) -> None:
+        """Create the capture that stores the older data
+
+        Args:
+
+            path:
+
+                The path of the capture
+
+        """
+
+        self.writer = CaptureWriter(
+            path, self.configuration, self.attributes, self.block_size
+        )
+        self.writer.open()
+
+    def _capture(self) -> Capture | None:
+        """Get the capture containing the data on the disk
+
+        Returns:
+
+            The capture or ``None``, if the history did not store any data
+            on the disk yet
+
+        """
+
+        if self.writer is None:
+            return None
+
+        if self.capture is None or len(self.capture) != self.spilled:
+            self.writer.flush()
+            if self.capture is not None:
+                self.capture.close()
+            self.capture = Capture(self.writer.path)
+
+        return self.capture
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
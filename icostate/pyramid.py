@@ -0,0 +1,587 @@
+"""Multi-resolution summaries of measurement data
+
+A pyramid stores the minimum, maximum and mean of consecutive groups of
+samples (buckets) for several downsampling factors. Plots of long
+measurements can use the level that contains about one bucket per pixel
+instead of reducing the raw data for every update.
+
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+import json
+
+from collections.abc import Sequence
+from pathlib import Path
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import CHANNELS, enabled_channels, MeasurementWindow
+from icostate.capture import CAPTURE_SUFFIX, column_filename
+
+# -- Attributes ---------------------------------------------------------------
+
+FACTORS = (16, 256, 4096)
+"""Default downsampling factors of a pyramid"""
+
+STATISTICS = ("minimum", "maximum", "mean")
+"""Summary values stored for every bucket"""
+
+SUMMARY = np.dtype("<f4")
+"""Data type of the summary values"""
+
+TIMESTAMPS = np.dtype("<f8")
+"""Data type of the bucket timestamps"""
+
+# -- Functions ----------------------------------------------------------------
+
+
+def pyramid_path(filepath: Path | str) -> Path:
+    """Get the location of the pyramid that belongs to a recording
+
+    Args:
+
+        filepath:
+
+            The path of the recording (HDF5 file or capture)
+
+    Returns:
+
+        The path of the pyramid directory
+
+    Examples:
+
+        >>> pyramid_path("measurement.hdf5").name
+        'measurement.pyramid'
+        >>> pyramid_path("measurement.icocap").parts[-2:]
+        ('measurement.icocap', 'pyramid')
+
+    """
+
+    filepath = Path(filepath)
+    if filepath.suffix == CAPTURE_SUFFIX:
+        return filepath / "pyramid"
+    return filepath.with_suffix(".pyramid")
+
+
+# -- Classes ------------------------------------------------------------------
+
+
+# pylint: disable=too-few-public-methods
+
+
+class Buckets:
+    """Split measurement data into groups of consecutive samples
+
+    The class keeps the samples of the last incomplete group until the next
+    data arrives.
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        size:
+
+            The number of samples (per channel) of a single group
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Split 2 windows of 3 samples into groups of 2 samples
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=6)
+        >>> for counter in range(2):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+        >>> buckets = Buckets(configuration, size=2)
+        >>> timestamps, values = buckets.add(buffer.window(0, 3))
+        >>> timestamps, values.shape
+        (array([0.]), (1, 2, 1))
+        >>> timestamps, values = buckets.add(buffer.window(3, 6))
+        >>> timestamps, values[:, :, 0]
+        (array([0., 1.]), array([[3., 1.],
+               [2., 3.]]))
+
+    """
+
+    def __init__(self, configuration: StreamingConfiguration, size: int):
+
+        if size < 1:
+            raise ValueError(f"Group size must be at least 1, not {size}")
+
+        self.size = size
+        self.channels = enabled_channels(configuration)
+        self._timestamps = np.empty(0, dtype=TIMESTAMPS)
+        self._values = np.empty((0, len(self.channels)))
+
+    def add(self, window: MeasurementWindow) -> tuple[np.ndarray, np.ndarray]:
+        """Add measurement data and retrieve the completed groups
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        Returns:
+
+            The timestamps of the first sample of every completed group and
+            the values of the groups (shape: groups × size × channels)
+
+        """
+
+        timestamps = np.concatenate((self._timestamps, window.timestamps))
+        values = np.concatenate((self._values, window.data[:, self.channels]))
+        complete = len(timestamps) // self.size * self.size
+        self._timestamps = timestamps[complete:]
+        self._values = values[complete:]
+
+        return (
+            timestamps[: complete : self.size],
+            values[:complete].reshape(-1, self.size, len(self.channels)),
+        )
+
+
+# pylint: enable=too-few-public-methods
+
+
+class PyramidLevel:
+    """Summaries of measurement data for a single downsampling factor
+
+    Args:
+
+        factor:
+
+            The number of samples (per channel) of a single bucket
+
+        channels:
+
+            The number of measurement channels
+
+    """
+
+    def __init__(self, factor: int, channels: int) -> None:
+
+        self.factor = factor
+        self.length = 0
+        """Number of buckets stored in the level"""
+        self._timestamps = np.empty(0, dtype=TIMESTAMPS)
+        self._summaries = {
+            name: np.empty((0, channels), dtype=SUMMARY) for name in STATISTICS
+        }
+
+    def __len__(self) -> int:
+        """Get the number of buckets of the level
+
+        Returns:
+
+            The number of buckets stored in the level
+
+        """
+
+        return self.length
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Timestamps of the first sample of every bucket"""
+
+        return self._timestamps[: self.length]
+
+    @property
+    def minimum(self) -> np.ndarray:
+        """Minimum of every bucket (one column per channel)"""
+
+        return self._summaries["minimum"][: self.length]
+
+    @property
+    def maximum(self) -> np.ndarray:
+        """Maximum of every bucket (one column per channel)"""
+
+        return self._summaries["maximum"][: self.length]
+
+    @property
+    def mean(self) -> np.ndarray:
+        """Mean of every bucket (one column per channel)"""
+
+        return self._summaries["mean"][: self.length]
+
+    def extend(
+        self,
+        timestamps: np.ndarray,
+        minimum: np.ndarray,
+        maximum: np.ndarray,
+        mean: np.ndarray,
+    ) -> None:
+        """Add buckets to the level
+
+        Args:
+
+            timestamps:
+
+                The timestamps of the first sample of the buckets
+
+            minimum:
+
+                The minimum values of the buckets
+
+            maximum:
+
+                The maximum values of the buckets
+
+            mean:
+
+                The mean values of the buckets
+
+        """
+
+        end = self.length + len(timestamps)
+        if end > len(self._timestamps):
+            capacity = max(end, 2 * len(self._timestamps), 64)
+            self._timestamps = np.resize(self._timestamps, capacity)
+            for name, summary in self._summaries.items():
+                self._summaries[name] = np.resize(
+                    summary, (capacity, summary.shape[1])
+                )
+
+        self._timestamps[self.length : end] = timestamps
+        for name, values in zip(STATISTICS, (minimum, maximum, mean)):
+            self._summaries[name][self.length : end] = values
+        self.length = end
+
+    def between(self, start: float, stop: float) -> slice:
+        """Get the buckets of a time range
+
+        Args:
+
+            start:
+
+                The (absolute) start time in seconds
+
+            stop:
+
+                The (absolute, exclusive) end time in seconds
+
+        Returns:
+
+            The buckets that start in the time range
+
+        """
+
+        timestamps = self.timestamps
+        return slice(
+            int(np.searchsorted(timestamps, start)),
+            int(np.searchsorted(timestamps, stop)),
+        )
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class Pyramid:
+    """Incrementally built minimum, maximum and mean of measurement data
+
+    Every level only contains complete buckets. Higher levels summarize the
+    buckets of the level below, which is why adding data only requires a
+    few vectorized operations.
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        factors:
+
+            The downsampling factors of the levels in increasing order. Every
+            factor has to be a multiple of the factor before.
+
+    Raises:
+
+        ValueError:
+
+            If the downsampling factors are invalid
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Summarize 48 samples using buckets of 4 and 16 samples
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=48)
+        >>> for counter in range(16):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+        >>> pyramid = Pyramid(configuration, factors=(4, 16))
+        >>> pyramid.add(buffer.window(0, 30))
+        >>> pyramid.add(buffer.window(30, 48))
+        >>> len(pyramid.levels[0]), len(pyramid.levels[1])
+        (12, 3)
+        >>> pyramid.levels[0].minimum[:4, 0]
+        array([1., 1., 1., 1.], dtype=float32)
+        >>> pyramid.levels[0].maximum[:4, 0]
+        array([3., 3., 3., 3.], dtype=float32)
+        >>> pyramid.levels[1].mean[:, 0]
+        array([1.9375, 2.    , 2.0625], dtype=float32)
+
+        Select the level for a plot of 15 seconds with 2 and 8 pixels
+
+        >>> pyramid.select(duration=15, pixels=2).factor
+        16
+        >>> pyramid.select(duration=15, pixels=8).factor
+        4
+
+    """
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        factors: Sequence[int] = FACTORS,
+    ) -> None:
+
+        if not factors or any(
+            factor <= previous or factor % previous != 0
+            for previous, factor in zip((1, *factors), factors)
+        ):
+            raise ValueError(f"Invalid downsampling factors: {factors}")
+
+        self.configuration = configuration
+        self.channels = enabled_channels(configuration)
+        self.levels = [
+            PyramidLevel(factor, len(self.channels)) for factor in factors
+        ]
+        """Levels of the pyramid in increasing order of their factor"""
+        self.samples = 0
+        """Number of samples (per channel) added to the pyramid"""
+        self.start: float | None = None
+        """Timestamp of the first sample"""
+        self.end: float | None = None
+        """Timestamp of the last sample"""
+        self._buckets = Buckets(configuration, self.levels[0].factor)
+        self._consumed = [0] * len(self.levels)
+
+    def add(self, window: MeasurementWindow) -> None:
+        """Add measurement data to the pyramid
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        """
+
+        if window.samples() == 0:
+            return
+
+        if self.start is None:
+            self.start = float(window.timestamps[0])
+        self.end = float(window.timestamps[-1])
+        self.samples += window.samples()
+
+        timestamps, buckets = self._buckets.add(window)
+        if len(timestamps) == 0:
+            return
+
+        self.levels[0].extend(
+            timestamps,
+            buckets.min(axis=1),
+            buckets.max(axis=1),
+            buckets.mean(axis=1),
+        )
+
+        for index, level in enumerate(self.levels[1:], start=1):
+            lower = self.levels[index - 1]
+            ratio = level.factor // lower.factor
+            start = self._consumed[index]
+            stop = start + (lower.length - start) // ratio * ratio
+            if stop == start:
+                break
+            self._consumed[index] = stop
+            shape = (-1, ratio, len(self.channels))
+            level.extend(
+                lower.timestamps[start:stop:ratio],
+                lower.minimum[start:stop].reshape(shape).min(axis=1),
+                lower.maximum[start:stop].reshape(shape).max(axis=1),
+                lower.mean[start:stop].reshape(shape).mean(axis=1),
+            )
+
+    def sample_rate(self) -> float:
+        """Get the average sample rate of the added data
+
+        Returns:
+
+            The number of samples (per channel) per second or ``0``, if the
+            pyramid does not contain enough data
+
+        """
+
+        if self.start is None or self.end is None or self.end <= self.start:
+            return 0.0
+        return (self.samples - 1) / (self.end - self.start)
+
+    def select(self, duration: float, pixels: int) -> PyramidLevel | None:
+        """Get the level best suited for a plot
+
+        Args:
+
+            duration:
+
+                The time span of the plot in seconds
+
+            pixels:
+
+                The number of horizontal pixels of the plot
+
+        Returns:
+
+            The level with the largest factor that still contains at least
+            one bucket per pixel or ``None``, if the plot should use the raw
+            measurement data
+
+        """
+
+        samples = duration * self.sample_rate()
+        selected = None
+        for level in self.levels:
+            if samples / level.factor < pixels:
+                break
+            selected = level
+
+        return selected
+
+    def save(self, path: Path | str) -> None:
+        """Store the (complete buckets of the) pyramid
+
+        Args:
+
+            path:
+
+                The directory that should store the pyramid
+
+        """
+
+        path = Path(path)
+        path.mkdir(parents=True, exist_ok=True)
+        metadata = {
+            "factors": [level.factor for level in self.levels],
+            "channels": [CHANNELS[channel] for channel in self.channels],
+            "samples": self.samples,
+            "start": self.start,
+            "end": self.end,
+        }
+        (path / "metadata.json").write_text(
+            json.dumps(metadata, indent=2) + "\n", encoding="utf-8"
+        )
+        for level in self.levels:
+            level.timestamps.tofile(
+                path
+                / column_filename(f"{level.factor}.timestamps", TIMESTAMPS)
+            )
+            for name in STATISTICS:
+                getattr(level, name).tofile(
+                    path / column_filename(f"{level.factor}.{name}", SUMMARY)
+                )
+
+    @classmethod
+    def load(cls, path: Path | str) -> Pyramid:
+        """Read a stored pyramid
+
+        The levels of the returned pyramid map the stored data into memory,
+        which is why loading does not read the whole pyramid.
+
+        Args:
+
+            path:
+
+                The directory that stores the pyramid
+
+        Returns:
+
+            The stored pyramid
+
+        Examples:
+
+            Store and load a pyramid
+
+            >>> from tempfile import TemporaryDirectory
+            >>> from icotronic.can.streaming import StreamingData
+            >>> from icostate.buffer import MeasurementBuffer
+
+            >>> configuration = StreamingConfiguration(first=True, third=True)
+            >>> buffer = MeasurementBuffer(configuration, capacity=32)
+            >>> for counter in range(32):
+            ...     buffer.append(StreamingData(values=[counter, 1],
+            ...                                 counter=counter,
+            ...                                 timestamp=counter))
+            >>> pyramid = Pyramid(configuration, factors=(4, 8))
+            >>> pyramid.add(buffer.window(0, 32))
+            >>> with TemporaryDirectory() as directory:
+            ...     pyramid.save(directory)
+            ...     loaded = Pyramid.load(directory)
+            ...     print(loaded.levels[1].minimum[:, 0])
+            ...     del loaded
+            [ 0.  8. 16. 24.]
+
+        """
+
+        path = Path(path)
+        metadata = json.loads((path / "metadata.json").read_text("utf-8"))
+        configuration = StreamingConfiguration(
+            **{name: name in metadata["channels"] for name in CHANNELS}
+        )
+        pyramid = cls(configuration, metadata["factors"])
+        pyramid.samples = metadata["samples"]
+        pyramid.start = metadata["start"]
+        pyramid.end = metadata["end"]
+
+        # pylint: disable=protected-access
+        channels = len(pyramid.channels)
+        for index, level in enumerate(pyramid.levels):
+            filepath = path / column_filename(
+                f"{level.factor}.timestamps", TIMESTAMPS
+            )
+            level.length = filepath.stat().st_size // TIMESTAMPS.itemsize
+            if index > 0:
+                pyramid._consumed[index] = level.length * (
+                    level.factor // pyramid.levels[index - 1].factor
+                )
+            if level.length == 0:
+                continue
+            level._timestamps = np.memmap(filepath, TIMESTAMPS, mode="r")
+            for name in STATISTICS:
+                level._summaries[name] = np.memmap(
+                    path / column_filename(f"{level.factor}.{name}", SUMMARY),
+                    SUMMARY,
+                    mode="r",
+                    shape=(level.length, channels),
+                )
+        # pylint: enable=protected-access
+
+        return pyramid
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
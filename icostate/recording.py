@@ -0,0 +1,408 @@
+"""Record measurement data in the background"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+import os
+
+from collections.abc import Sequence
+from datetime import datetime
+from pathlib import Path
+from queue import Empty
+from time import monotonic
+from types import TracebackType
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+from icotronic.measurement.storage import Storage, StorageData
+
+from icostate.buffer import enabled_channels, MeasurementWindow
+from icostate.capture import CAPTURE_SUFFIX, CaptureWriter
+from icostate.pyramid import FACTORS, Pyramid, pyramid_path
+from icostate.sensor import SensorNodeAttributes
+from icostate.worker import BackgroundWorker
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class Recorder(BackgroundWorker):
+    """Write measurement data into a file using a background thread
+
+    By default the recorder uses the same HDF5 file format as the ICOtronic
+    library (see :class:`icotronic.measurement.storage.Storage`). If the
+    path of the recording uses the suffix ``.icocap``, then the recorder
+    stores the data as capture (see :class:`icostate.capture.Capture`)
+    instead, which provides fast access to arbitrary time ranges of long
+    measurements. The event loop only adds
+    measurement windows to a bounded queue. A dedicated writer thread
+    combines the windows into large chunks, appends them to the file and
+    synchronizes the file with the disk regularly. If the queue is full,
+    then the recorder combines new windows in a backlog (see
+    :class:`icostate.worker.BackgroundWorker`) until the queue has space
+    again. It therefore never blocks the event loop and never drops data.
+
+    Args:
+
+        filepath:
+
+            The path of the HDF5 file or capture directory, which must not
+            exist yet
+
+        sync_interval:
+
+            The maximum time in seconds between two synchronizations of the
+            file with the disk (``fsync``)
+
+        maxsize:
+
+            The maximum number of windows waiting for the writer thread
+
+        chunk_size:
+
+            The number of rows (samples per channel) after which the writer
+            thread appends the data to the file, even if the next
+            synchronization is not due yet
+
+        pyramid_factors:
+
+            The downsampling factors of the pyramid (see
+            :class:`icostate.pyramid.Pyramid`) the writer thread builds from
+            the recorded data and stores next to the recording (see
+            :func:`icostate.pyramid.pyramid_path`) or ``None``, if the
+            recorder should not create a pyramid
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from tempfile import TemporaryDirectory
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Record some measurement data
+
+        >>> async def record(recorder: Recorder):
+        ...     configuration = StreamingConfiguration(first=True)
+        ...     buffer = MeasurementBuffer(configuration, capacity=30)
+        ...     recorder.start(configuration)
+        ...     for counter in range(10):
+        ...         buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                     counter=counter,
+        ...                                     timestamp=counter))
+        ...     recorder.put(buffer.window(0, 15))
+        ...     recorder.put(buffer.window(15, 30))
+        ...     await recorder.stop()
+        >>> with TemporaryDirectory() as directory:
+        ...     filepath = Path(directory) / "measurement.hdf5"
+        ...     recorder = Recorder(filepath)
+        ...     run(record(recorder))
+        ...     with Storage(filepath) as storage:
+        ...         print(storage.acceleration.nrows)
+        30
+        >>> recorder.rows
+        30
+
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+
+    def __init__(
+        self,
+        filepath: Path | str,
+        sync_interval: float = 1,
+        maxsize: int = 256,
+        chunk_size: int = 2**16,
+        pyramid_factors: Sequence[int] | None = FACTORS,
+    ) -> None:
+
+        super().__init__("icostate-recorder", maxsize)
+        self.filepath = Path(filepath).expanduser().resolve()
+        self.sync_interval = sync_interval
+        self.chunk_size = chunk_size
+        self.rows = 0
+        """Number of rows (samples per channel) written to the file"""
+        self.syncs = 0
+        """Number of synchronizations of the file with the disk"""
+        self.lag = 0.0
+        """Time in seconds between adding the last written window to the
+        queue and writing it to the file"""
+        self.pyramid_factors = pyramid_factors
+        self.pyramid: Pyramid | None = None
+        """Pyramid of the recorded data (only accessed by the writer
+        thread during the recording)"""
+        self.writer: CaptureWriter | StorageWriter | None = None
+        """Object that writes the data in the file format of the
+        recording"""
+
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    def start(
+        self,
+        configuration: StreamingConfiguration,
+        attributes: SensorNodeAttributes | None = None,
+    ) -> None:
+        """Start the writer thread
+
+        Args:
+
+            configuration:
+
+                The streaming configuration of the measurement
+
+            attributes:
+
+                Information about the sensor node, which the recorder stores
+                as metadata of the measurement
+
+        Raises:
+
+            ValueError:
+
+                If the file already exists
+
+        """
+
+        writer: CaptureWriter | StorageWriter
+        if self.filepath.suffix == CAPTURE_SUFFIX:
+            writer = CaptureWriter(self.filepath, configuration, attributes)
+        else:
+            writer = StorageWriter(self.filepath, configuration, attributes)
+        self.pyramid = (
+            None
+            if self.pyramid_factors is None
+            else Pyramid(configuration, self.pyramid_factors)
+        )
+        self.writer = writer
+        self._start()
+
+    def _work(self) -> None:
+        """Write the data of the queue into the file (writer thread)"""
+
+        writer = self.writer
+        assert writer is not None
+        pending: list[tuple[float, MeasurementWindow]] = []
+        rows = 0
+        with writer:
+            synchronized = monotonic()
+            while True:
+                timeout = synchronized + self.sync_interval - monotonic()
+                try:
+                    item = self.queue.get(timeout=max(timeout, 0))
+                except Empty:
+                    pass
+                else:
+                    if item is None:
+                        break
+                    pending.append(item)
+                    rows += item[1].samples()
+
+                if rows >= self.chunk_size:
+                    self._append(writer, pending)
+                    pending, rows = [], 0
+                if monotonic() >= synchronized + self.sync_interval:
+                    self._append(writer, pending)
+                    pending, rows = [], 0
+                    self._synchronize(writer)
+                    synchronized = monotonic()
+
+            self._append(writer, pending)
+            self._synchronize(writer)
+        if self.pyramid is not None:
+            self.pyramid.save(pyramid_path(self.filepath))
+
+    def _append(
+        self,
+        writer: CaptureWriter | StorageWriter,
+        pending: list[tuple[float, MeasurementWindow]],
+    ) -> None:
+        """Append measurement windows to the file using a single write
+
+        Args:
+
+            writer:
+
+                The writer of the recording
+
+            pending:
+
+                The windows that should be written and the time they were
+                added to the queue
+
+        """
+
+        if not pending:
+            return
+
+        windows = [window for _, window in pending]
+        self.rows += writer.append(windows)
+        if self.pyramid is not None:
+            for window in windows:
+                self.pyramid.add(window)
+        self.lag = monotonic() - pending[-1][0]
+
+    def _synchronize(self, writer: CaptureWriter | StorageWriter) -> None:
+        """Write all buffered data of the file to the disk
+
+        Args:
+
+            writer:
+
+                The writer of the recording
+
+        """
+
+        writer.synchronize()
+        self.syncs += 1
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+class StorageWriter:
+    """Write measurement data into an HDF5 file (ICOtronic file format)
+
+    Args:
+
+        filepath:
+
+            The path of the HDF5 file, which must not exist yet
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        attributes:
+
+            Information about the sensor node, which the writer stores as
+            metadata of the measurement
+
+    Raises:
+
+        ValueError:
+
+            If the file already exists
+
+    """
+
+    def __init__(
+        self,
+        filepath: Path,
+        configuration: StreamingConfiguration,
+        attributes: SensorNodeAttributes | None = None,
+    ) -> None:
+
+        self.filepath = filepath
+        self.configuration = configuration
+        self.attributes = attributes
+        self.storage = Storage(filepath, configuration)
+        self.data: StorageData | None = None
+
+    def __enter__(self) -> StorageWriter:
+        """Open the file and store the metadata of the measurement
+
+        Returns:
+
+            The opened writer
+
+        """
+
+        self.data = data = self.storage.open()
+        if self.attributes is not None:
+            data["Sensor_Node_Name"] = self.attributes.name
+            data["Sensor_Node_MAC_Address"] = str(self.attributes.mac_address)
+            data.write_sample_rate(self.attributes.adc_configuration)
+
+        return self
+
+    def __exit__(
+        self,
+        exception_type: type[BaseException] | None,
+        exception_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Close the file
+
+        Args:
+
+            exception_type:
+
+                The type of the exception in case of an exception
+
+            exception_value:
+
+                The value of the exception in case of an exception
+
+            traceback:
+
+                The traceback in case of an exception
+
+        """
+
+        self.storage.close()
+        self.data = None
+
+    def append(self, windows: list[MeasurementWindow]) -> int:
+        """Append measurement windows to the file using a single write
+
+        Args:
+
+            windows:
+
+                The measurement windows that should be stored
+
+        Returns:
+
+            The number of rows added to the file
+
+        """
+
+        assert isinstance(self.data, StorageData)
+
+        data = self.data
+        values = np.concatenate([window.data for window in windows])
+        timestamps = np.concatenate([window.timestamps for window in windows])
+        if len(timestamps) == 0:
+            return 0
+        if data.start_time is None:
+            data.start_time = float(timestamps[0])
+            data["Start_Time"] = datetime.now().isoformat()
+
+        table = data.acceleration
+        rows = np.empty(len(values), dtype=table.dtype)
+        rows["counter"] = np.concatenate(
+            [window.counters for window in windows]
+        )
+        rows["timestamp"] = (timestamps - data.start_time) * 1_000_000
+        for axis, column in zip(
+            self.configuration.axes(), enabled_channels(self.configuration)
+        ):
+            rows[axis] = values[:, column]
+        table.append(rows)
+
+        return len(rows)
+
+    def synchronize(self) -> None:
+        """Write all buffered data of the file to the disk"""
+
+        assert isinstance(self.data, StorageData)
+
+        self.data.acceleration.flush()
+        self.data.hdf.flush()
+        descriptor = os.open(self.filepath, os.O_RDWR)
+        try:
+            os.fsync(descriptor)
+        finally:
+            os.close(descriptor)
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -2,9 +2,19 @@
 
 # -- Imports ------------------------------------------------------------------
 
+from __future__ import annotations
+
+from time import monotonic
+from typing import TypeVar
+
 from netaddr import EUI
 
 from icotronic.can.adc import ADCConfiguration
+from icotronic.can.sensor import SensorConfiguration
+
+# -- Attributes ---------------------------------------------------------------
+
+T = TypeVar("T")
 
 # -- Classes ------------------------------------------------------------------
 
@@ -77,8 +87,444 @@ class SensorNodeAttributes:
         ])
 
 
+class SensorNodeProfile:
+    """Store the target configuration of sensor nodes
+
+    Args:
+
+        name:
+
+            The Bluetooth advertisement name of the sensor node or ``None``
+            to keep the current name. Since every sensor node should have a
+            unique name, you can only apply a profile with a name to a
+            single sensor node.
+
+        adc_configuration:
+
+            The ADC configuration of the sensor node or ``None`` to keep the
+            current ADC configuration
+
+        sensor_configuration:
+
+            The sensor configuration of the sensor node or ``None`` to keep
+            the current sensor configuration. The sensor number ``0`` keeps
+            the sensor of the corresponding channel unchanged.
+
+    Raises:
+
+        ValueError:
+
+            If the name is longer than 8 bytes
+
+    Examples:
+
+        Compare a profile with the current configuration of a sensor node
+
+        >>> config = ADCConfiguration(prescaler=2,
+        ...                           acquisition_time=8,
+        ...                           oversampling_rate=64)
+        >>> attributes = SensorNodeAttributes("Test-STH",
+        ...                                   EUI("08-6B-D7-01-DE-81"),
+        ...                                   config)
+        >>> profile = SensorNodeProfile(
+        ...     name="Test-STH",
+        ...     sensor_configuration=SensorConfiguration(first=1))
+        >>> profile.differences(attributes,
+        ...                     SensorConfiguration(first=2))
+        ['sensor_configuration']
+
+        The sensor number ``0`` matches every sensor
+
+        >>> profile = SensorNodeProfile(
+        ...     sensor_configuration=SensorConfiguration(first=1))
+        >>> profile.differences(attributes,
+        ...                     SensorConfiguration(first=1, second=2))
+        []
+
+        Sensor nodes only support names up to 8 bytes
+
+        >>> SensorNodeProfile(name="Long-Sensor-Node")
+        Traceback (most recent call last):
+           ...
+        ValueError: Name is too long (16 bytes)...
+
+    """
+
+    def __init__(
+        self,
+        name: str | None = None,
+        adc_configuration: ADCConfiguration | None = None,
+        sensor_configuration: SensorConfiguration | None = None,
+    ) -> None:
+
+        if name is not None and (length := len(name.encode("utf-8"))) > 8:
+            raise ValueError(
+                f"Name is too long ({length} bytes). "
+                "Please use a name between 0 and 8 bytes."
+            )
+
+        self.name = name
+        self.adc_configuration = adc_configuration
+        self.sensor_configuration = sensor_configuration
+
+    def differences(
+        self,
+        attributes: SensorNodeAttributes,
+        sensor_configuration: SensorConfiguration | None = None,
+    ) -> list[str]:
+        """Get the settings that differ from the profile
+
+        Args:
+
+            attributes:
+
+                The current attributes of the sensor node
+
+            sensor_configuration:
+
+                The current sensor configuration of the sensor node
+
+        Returns:
+
+            The names of the settings (``name``, ``adc_configuration``,
+            ``sensor_configuration``) whose current value differs from the
+            value of the profile
+
+        """
+
+        differences = []
+        if self.name is not None and self.name != attributes.name:
+            differences.append("name")
+        if (
+            self.adc_configuration is not None
+            and self.adc_configuration != attributes.adc_configuration
+        ):
+            differences.append("adc_configuration")
+        if self.sensor_configuration is not None and (
+            sensor_configuration is None
+            or any(
+                sensor not in {0, sensor_configuration[channel]}
+                for channel, sensor in self.sensor_configuration.items()
+            )
+        ):
+            differences.append("sensor_configuration")
+
+        return differences
+
+
+class ProfileResult:
+    """Store the result of applying a profile to a sensor node
+
+    Args:
+
+        mac_address:
+
+            The MAC address of the sensor node
+
+        changed:
+
+            The names of the settings the system changed
+
+        verified:
+
+            Specifies if all settings of the sensor node match the profile
+            after the change
+
+        duration:
+
+            The time in seconds it took to apply the profile
+
+        error:
+
+            The exception that stopped the system from applying the
+            profile or ``None``, if there was no error
+
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+
+    def __init__(
+        self,
+        mac_address: EUI,
+        changed: list[str] | None = None,
+        verified: bool = False,
+        duration: float = 0,
+        error: Exception | None = None,
+    ) -> None:
+
+        self.mac_address = mac_address
+        self.changed = [] if changed is None else changed
+        self.verified = verified
+        self.duration = duration
+        self.error = error
+
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the result
+
+        Returns:
+
+            A string containing the result of every sensor node
+
+        Examples:
+
+            >>> ProfileResult(EUI("08-6B-D7-01-DE-81"), ["name"], True, 0.52)
+            08-6B-D7-01-DE-81: Changed name, verified (0.520 s)
+
+            >>> ProfileResult(EUI("08-6B-D7-01-DE-81"),
+            ...               error=TimeoutError("No sensor node"))
+            08-6B-D7-01-DE-81: Failed: No sensor node (0.000 s)
+
+        """
+
+        if self.error is not None:
+            status = f"Failed: {self.error}"
+        else:
+            changed = ", ".join(self.changed) if self.changed else "nothing"
+            verified = "verified" if self.verified else "not verified"
+            status = f"Changed {changed}, {verified}"
+
+        return f"{self.mac_address}: {status} ({self.duration:.3f} s)"
+
+
 # pylint: enable=too-few-public-methods
 
+
+class AttributeCache:
+    """Store the attributes of sensor nodes read before
+
+    The cache stores the attributes (:class:`SensorNodeAttributes`) and
+    the sensor configuration of every sensor node under its MAC address.
+    Entries expire after a certain time, since other programs might
+    change the sensor node in the meantime.
+
+    Args:
+
+        ttl:
+
+            The time in seconds an entry stays valid or ``None``, if
+            entries should only expire if you invalidate them
+
+    Examples:
+
+        Store and retrieve the attributes of a sensor node
+
+        >>> mac_address = EUI("08-6B-D7-01-DE-81")
+        >>> config = ADCConfiguration(prescaler=2,
+        ...                           acquisition_time=8,
+        ...                           oversampling_rate=64)
+        >>> cache = AttributeCache()
+        >>> cache.update(SensorNodeAttributes("Test-STH", mac_address,
+        ...                                   config))
+        >>> cache.get(mac_address).name
+        'Test-STH'
+
+        Changing the stored attributes requires an update
+
+        >>> cache.get(mac_address).name = "Changed"
+        >>> cache.get(mac_address).name
+        'Test-STH'
+
+        Invalidate entries explicitly
+
+        >>> cache.invalidate(mac_address)
+        >>> cache.get(mac_address) is None
+        True
+
+        Entries of a cache with a time to live of zero expire immediately
+
+        >>> cache = AttributeCache(ttl=0)
+        >>> cache.update_sensor_configuration(
+        ...     mac_address, SensorConfiguration(first=1))
+        >>> cache.get_sensor_configuration(mac_address) is None
+        True
+
+    """
+
+    def __init__(self, ttl: float | None = 60) -> None:
+
+        self.ttl = ttl
+        self.attributes: dict[EUI, tuple[float, SensorNodeAttributes]] = {}
+        """Time of the update and attributes of every sensor node"""
+        self.sensor_configurations: dict[
+            EUI, tuple[float, SensorConfiguration]
+        ] = {}
+        """Time of the update and sensor configuration of every node"""
+
+    def get(self, mac_address: EUI) -> SensorNodeAttributes | None:
+        """Get the attributes of a sensor node
+
+        Args:
+
+            mac_address:
+
+                The MAC address of the sensor node
+
+        Returns:
+
+            A copy of the stored attributes or ``None``, if the cache does
+            not contain valid attributes for the sensor node
+
+        """
+
+        attributes = self._lookup(self.attributes, mac_address)
+        if attributes is None:
+            return None
+
+        return SensorNodeAttributes(
+            name=attributes.name,
+            mac_address=attributes.mac_address,
+            adc_configuration=attributes.adc_configuration,
+        )
+
+    def update(self, attributes: SensorNodeAttributes) -> None:
+        """Store the attributes of a sensor node
+
+        Args:
+
+            attributes:
+
+                The current attributes of the sensor node. The cache stores
+                a copy of them.
+
+        """
+
+        self.attributes[EUI(attributes.mac_address)] = (
+            monotonic(),
+            SensorNodeAttributes(
+                name=attributes.name,
+                mac_address=attributes.mac_address,
+                adc_configuration=attributes.adc_configuration,
+            ),
+        )
+
+    def get_sensor_configuration(
+        self, mac_address: EUI
+    ) -> SensorConfiguration | None:
+        """Get the sensor configuration of a sensor node
+
+        Args:
+
+            mac_address:
+
+                The MAC address of the sensor node
+
+        Returns:
+
+            The sensor configuration or ``None``, if the cache does not
+            contain a valid sensor configuration for the sensor node
+
+        """
+
+        return self._lookup(self.sensor_configurations, mac_address)
+
+    def update_sensor_configuration(
+        self, mac_address: EUI, sensor_configuration: SensorConfiguration
+    ) -> None:
+        """Store the sensor configuration of a sensor node
+
+        As for sensor nodes, the sensor number ``0`` keeps the sensor of the
+        corresponding channel unchanged. If the cache does not know the
+        previous sensor of such a channel, it removes the entry of the
+        sensor node.
+
+        Args:
+
+            mac_address:
+
+                The MAC address of the sensor node
+
+            sensor_configuration:
+
+                The current sensor configuration of the sensor node or the
+                sensor configuration written to the sensor node
+
+        Examples:
+
+            >>> mac_address = EUI("08-6B-D7-01-DE-81")
+            >>> cache = AttributeCache()
+            >>> cache.update_sensor_configuration(
+            ...     mac_address, SensorConfiguration(first=5))
+            >>> cache.get_sensor_configuration(mac_address) is None
+            True
+            >>> cache.update_sensor_configuration(
+            ...     mac_address, SensorConfiguration(first=1, second=2,
+            ...                                      third=3))
+            >>> cache.update_sensor_configuration(
+            ...     mac_address, SensorConfiguration(first=5))
+            >>> cache.get_sensor_configuration(mac_address)
+            M1: S5, M2: S2, M3: S3
+
+        """
+
+        key = EUI(mac_address)
+        if any(sensor == 0 for sensor in sensor_configuration.values()):
+            current = self._lookup(self.sensor_configurations, key)
+            if current is None:
+                self.sensor_configurations.pop(key, None)
+                return
+            sensor_configuration = SensorConfiguration(**{
+                channel: sensor if sensor != 0 else current[channel]
+                for channel, sensor in sensor_configuration.items()
+            })
+
+        self.sensor_configurations[key] = (monotonic(), sensor_configuration)
+
+    def invalidate(self, mac_address: EUI | None = None) -> None:
+        """Remove entries from the cache
+
+        Args:
+
+            mac_address:
+
+                The MAC address of the sensor node whose entries the cache
+                should remove or ``None`` to remove all entries
+
+        """
+
+        if mac_address is None:
+            self.attributes.clear()
+            self.sensor_configurations.clear()
+            return
+
+        self.attributes.pop(EUI(mac_address), None)
+        self.sensor_configurations.pop(EUI(mac_address), None)
+
+    def _lookup(
+        self, entries: dict[EUI, tuple[float, T]], mac_address: EUI
+    ) -> T | None:
+        """Get a valid entry and remove it, if it expired
+
+        Args:
+
+            entries:
+
+                The entries of the cache
+
+            mac_address:
+
+                The MAC address of the sensor node
+
+        Returns:
+
+            The value of the entry or ``None``, if there is no valid entry
+
+        """
+
+        key = EUI(mac_address)
+        entry = entries.get(key)
+        if entry is None:
+            return None
+
+        time, value = entry
+        if self.ttl is not None and monotonic() - time >= self.ttl:
+            del entries[key]
+            return None
+
+        return value
+
+
 # -- Main ---------------------------------------------------------------------
 
 if __name__ == "__main__":
@@ -0,0 +1,816 @@
+"""Simulated ICOtronic system
+
+The classes in this module replace the CAN connection, the STU and sensor
+nodes of the ICOtronic library with in-process simulations. This way you can
+use (and test) :class:`icostate.ICOsystem` without any hardware:
+
+.. code-block:: python
+
+   icosystem = ICOsystem(connection=SimulatedConnection())
+
+"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from asyncio import create_task, gather, sleep, Task
+from logging import getLogger
+from math import tau
+from time import monotonic, time
+from types import TracebackType
+
+import numpy as np
+
+from can import Message
+from icotronic.can import Connection, SensorNode, StreamingConfiguration, STU
+from icotronic.can.adc import ADCConfiguration
+from icotronic.can.node.sensor import DataStreamContextManager
+from icotronic.can.node.stu import AsyncSensorNodeManager, SensorNodeInfo
+from icotronic.can.protocol.identifier import Identifier
+from icotronic.can.sensor import SensorConfiguration
+from icotronic.can.status import State as NodeState
+from icotronic.can.streaming import AsyncStreamBuffer
+from netaddr import EUI
+
+from icostate.buffer import channel_sample_rate, samples_per_message
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=super-init-not-called,too-many-instance-attributes
+
+
+class SimulatedSensorNode(SensorNode):
+    """Simulated sensor node (e.g. STH)
+
+    Args:
+
+        name:
+
+            The (Bluetooth advertisement) name of the sensor node
+
+        mac_address:
+
+            The MAC address of the sensor node
+
+        adc_configuration:
+
+            The initial ADC configuration, which also determines the sample
+            rate of the simulated data stream
+
+        sensor_configuration:
+
+            The initial sensor configuration
+
+        loss_rate:
+
+            The probability (between 0 and 1) that a streaming message gets
+            lost
+
+        jitter:
+
+            The maximum additional delay in seconds between two bursts of
+            streaming messages
+
+        latency:
+
+            The time in seconds each request to the sensor node takes
+
+        seed:
+
+            Seed for the random number generator of the simulation
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+
+        Read the name of a simulated sensor node
+
+        >>> run(SimulatedSensorNode(name="Sim-STH").get_name())
+        'Sim-STH'
+
+    """
+
+    # pylint: disable=too-many-arguments
+
+    def __init__(
+        self,
+        name: str = "Test-STH",
+        mac_address: EUI | str = "08-6B-D7-01-DE-81",
+        adc_configuration: ADCConfiguration | None = None,
+        sensor_configuration: SensorConfiguration | None = None,
+        *,
+        loss_rate: float = 0,
+        jitter: float = 0,
+        latency: float = 0,
+        seed: int | None = None,
+    ) -> None:
+
+        self.logger = getLogger(__name__)
+        self.name = name
+        self.mac_address = EUI(mac_address)
+        self.adc_configuration = (
+            ADCConfiguration(
+                reference_voltage=3.3,
+                prescaler=2,
+                acquisition_time=8,
+                oversampling_rate=64,
+            )
+            if adc_configuration is None
+            else adc_configuration
+        )
+        self.sensor_configuration = (
+            SensorConfiguration(first=1, second=2, third=3)
+            if sensor_configuration is None
+            else sensor_configuration
+        )
+        self.loss_rate = loss_rate
+        self.jitter = jitter
+        self.latency = latency
+        self.rssi = -40
+        self.requests = 0
+        """Number of requests the sensor node answered"""
+        self.pending = 0
+        """Number of requests the sensor node currently handles"""
+        self.max_pending = 0
+        """Maximum number of requests the sensor node handled at once"""
+        self.random = np.random.default_rng(seed)
+
+    # pylint: enable=too-many-arguments
+
+    async def _request(self) -> None:
+        """Simulate the round trip time of a request"""
+
+        self.requests += 1
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        try:
+            await sleep(self.latency)
+        finally:
+            self.pending -= 1
+
+    async def get_name(self) -> str:
+        """Get the name of the sensor node
+
+        Returns:
+
+            The (Bluetooth advertisement) name of the sensor node
+
+        """
+
+        await self._request()
+        return self.name
+
+    async def set_name(self, name: str) -> None:
+        """Set the name of the sensor node
+
+        Args:
+
+            name:
+
+                The new name of the sensor node
+
+        """
+
+        if not isinstance(name, str):
+            raise TypeError(f"Name must be str, not {type(name).__name__}")
+
+        length_name = len(name.encode("utf-8"))
+        if length_name > 8:
+            raise ValueError(
+                f"Name is too long ({length_name} bytes). "
+                "Please use a name between 0 and 8 bytes."
+            )
+
+        await self._request()
+        self.name = name
+
+    async def get_mac_address(self) -> EUI:
+        """Get the MAC address of the sensor node
+
+        Returns:
+
+            The MAC address of the sensor node
+
+        """
+
+        await self._request()
+        return self.mac_address
+
+    async def get_adc_configuration(self) -> ADCConfiguration:
+        """Read the current ADC configuration
+
+        Returns:
+
+            The ADC configuration of the sensor node
+
+        """
+
+        await self._request()
+        return ADCConfiguration(**self.adc_configuration)
+
+    async def set_adc_configuration(
+        self,
+        reference_voltage: float = 3.3,
+        prescaler: int = 2,
+        acquisition_time: int = 8,
+        oversampling_rate: int = 64,
+    ) -> None:
+        """Change the ADC configuration of the sensor node
+
+        Args:
+
+            reference_voltage:
+
+                The ADC reference voltage in Volt
+
+            prescaler:
+
+                The ADC prescaler value
+
+            acquisition_time:
+
+                The ADC acquisition time in number of cycles
+
+            oversampling_rate:
+
+                The ADC oversampling rate
+
+        """
+
+        adc_configuration = ADCConfiguration(
+            reference_voltage=reference_voltage,
+            prescaler=prescaler,
+            acquisition_time=acquisition_time,
+            oversampling_rate=oversampling_rate,
+        )
+        await self._request()
+        self.adc_configuration = adc_configuration
+
+    async def get_sensor_configuration(self) -> SensorConfiguration:
+        """Read the current sensor configuration
+
+        Returns:
+
+            The sensor number for the different axes
+
+        """
+
+        await self._request()
+        return SensorConfiguration(**self.sensor_configuration)
+
+    async def set_sensor_configuration(
+        self, sensors: SensorConfiguration
+    ) -> None:
+        """Change the sensor numbers for the different measurement channels
+
+        As for real sensor nodes, the sensor number ``0`` keeps the sensor of
+        the corresponding channel unchanged.
+
+        Args:
+
+            sensors:
+
+                The sensor numbers of the different measurement channels
+
+        """
+
+        current = self.sensor_configuration
+        await self._request()
+        self.sensor_configuration = SensorConfiguration(**{
+            channel: sensor if sensor != 0 else current[channel]
+            for channel, sensor in sensors.items()
+        })
+
+    def open_data_stream(
+        self,
+        channels: StreamingConfiguration,
+        timeout: float = 5,
+    ) -> DataStreamContextManager:
+        """Open measurement data stream
+
+        Args:
+
+            channels:
+
+                Specifies which measurement channels should be enabled
+
+            timeout:
+
+                The amount of seconds between two consecutive messages, before
+                a TimeoutError will be raised
+
+        Returns:
+
+            A context manager object for managing stream data
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run
+
+            Read some streaming messages
+
+            >>> async def read_streaming_data(node: SimulatedSensorNode):
+            ...     channels = StreamingConfiguration(first=True, third=True)
+            ...     async with node.open_data_stream(channels) as stream:
+            ...         messages = []
+            ...         async for data, _ in stream:
+            ...             messages.append(data)
+            ...             if len(messages) >= 3:
+            ...                 break
+            ...         return messages
+            >>> messages = run(read_streaming_data(SimulatedSensorNode()))
+            >>> [len(message.values) for message in messages]
+            [2, 2, 2]
+
+        """
+
+        return SimulatedDataStream(self, channels, timeout)
+
+
+class SimulatedDataStream(DataStreamContextManager):
+    """Open and close a data stream of a simulated sensor node
+
+    The stream feeds CAN messages into the stream buffer of the ICOtronic
+    library. The simulation therefore also uses the code of the library that
+    decodes streaming messages and counts lost messages.
+
+    Args:
+
+        sensor_node:
+
+            The simulated sensor node that sends the streaming data
+
+        channels:
+
+            A streaming configuration that specifies which of the three
+            streaming channels should be enabled or not
+
+        timeout:
+
+            The amount of seconds between two consecutive messages, before
+            a TimeoutError will be raised
+
+    """
+
+    interval = 0.005
+    """Time in seconds between two bursts of streaming messages"""
+
+    def __init__(
+        self,
+        sensor_node: SimulatedSensorNode,
+        channels: StreamingConfiguration,
+        timeout: float,
+    ) -> None:
+
+        super().__init__(sensor_node, channels, timeout)
+        self.sensor_node = sensor_node
+        self.identifier = Identifier(
+            block="Streaming",
+            block_command="Data",
+            sender="STH 1",
+            receiver="SPU 1",
+            request=False,
+        ).value
+        self.task: Task[None] | None = None
+
+    async def __aenter__(self) -> AsyncStreamBuffer:
+        """Open the stream of measurement data
+
+        Returns:
+
+            The stream buffer for the measurement stream
+
+        """
+
+        adc_configuration = await self.sensor_node.get_adc_configuration()
+        self.reader = AsyncStreamBuffer(
+            self.timeout,
+            max_buffer_size=round(adc_configuration.sample_rate()),
+        )
+        await self.sensor_node._request()  # pylint: disable=protected-access
+        self.task = create_task(self._send(adc_configuration))
+
+        return self.reader
+
+    async def __aexit__(
+        self,
+        exception_type: type[BaseException] | None,
+        exception_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Stop the simulated data stream
+
+        Args:
+
+            exception_type:
+
+                The type of the exception in case of an exception
+
+            exception_value:
+
+                The value of the exception in case of an exception
+
+            traceback:
+
+                The traceback in case of an exception
+
+        """
+
+        if self.task is not None:
+            self.task.cancel()
+            await gather(self.task, return_exceptions=True)
+        self.logger.info("Stopped simulated stream")
+
+    def _values(self, times: np.ndarray, values: int) -> np.ndarray:
+        """Create the raw ADC values of streaming messages
+
+        The values represent an acceleration around 0 g (half of the ADC
+        range) with a small sine component and some noise.
+
+        Args:
+
+            times:
+
+                The time (in seconds since the start of the stream) of each
+                message
+
+            values:
+
+                The number of values per message
+
+        Returns:
+
+            An array with one row of little endian 16 bit values per message
+
+        """
+
+        signal = (
+            2**15
+            + 500 * np.sin(tau * 50 * times)[:, np.newaxis]
+            + self.sensor_node.random.normal(0, 50, (len(times), values))
+        )
+        return np.clip(signal, 0, 2**16 - 1).astype("<u2")
+
+    async def _send(self, adc_configuration: ADCConfiguration) -> None:
+        """Send streaming messages to the stream buffer
+
+        Args:
+
+            adc_configuration:
+
+                The ADC configuration that determines the sample rate
+
+        """
+
+        node = self.sensor_node
+        reader = self.reader
+        assert isinstance(reader, AsyncStreamBuffer)
+        values_per_message = self.channels.data_length()
+        message_rate = channel_sample_rate(
+            adc_configuration, self.channels
+        ) / samples_per_message(self.channels)
+
+        start = monotonic()
+        sent = 0
+        counter = 0
+        while True:
+            await sleep(self.interval + node.random.uniform(0, node.jitter))
+            due = int((monotonic() - start) * message_rate)
+            if due <= sent:
+                continue
+
+            data = self._values(
+                np.arange(sent, due) / message_rate, values_per_message
+            )
+            lost = node.random.random(len(data)) < node.loss_rate
+            timestamp = time()
+
+            for values, lose in zip(data, lost):
+                counter = (counter + 1) % 256
+                if lose:
+                    continue
+                reader.on_message_received(
+                    Message(
+                        arbitration_id=self.identifier,
+                        data=bytearray([0, counter]) + values.tobytes(),
+                        timestamp=timestamp,
+                    )
+                )
+            sent = due
+
+
+class SimulatedSensorNodeManager(AsyncSensorNodeManager):
+    """Context manager for the connection to a simulated sensor node
+
+    Args:
+
+        stu:
+
+            The simulated STU that created the context manager
+
+        identifier:
+
+            The MAC address, name or node number of the sensor node
+
+    """
+
+    def __init__(self, stu: SimulatedSTU, identifier: int | str | EUI) -> None:
+
+        self.logger = getLogger(__name__)
+        self.stu = stu
+        self.identifier = identifier
+
+    async def __aenter__(self) -> SensorNode:
+        """Create the connection to the sensor node
+
+        Returns:
+
+            The simulated sensor node
+
+        Raises:
+
+            TimeoutError:
+
+                If there is no sensor node with the given identifier
+
+        """
+
+        stu: SimulatedSTU = self.stu  # type: ignore[assignment]
+        await stu.request()
+        identifier = self.identifier
+        for number, node in enumerate(stu.sensor_nodes):
+            if identifier in {number, node.name, node.mac_address}:
+                stu.connected = node
+                self.logger.info("Connected to sensor node: %s", node.name)
+                return node
+
+        raise TimeoutError(
+            f"Unable to find sensor node with identifier “{self.identifier}”"
+        )
+
+    async def __aexit__(
+        self,
+        exception_type: type[BaseException] | None,
+        exception_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Disconnect the sensor node
+
+        Args:
+
+            exception_type:
+
+                The type of the exception in case of an exception
+
+            exception_value:
+
+                The value of the exception in case of an exception
+
+            traceback:
+
+                The traceback in case of an exception
+
+        """
+
+        stu: SimulatedSTU = self.stu  # type: ignore[assignment]
+        await stu.request()
+        stu.connected = None
+        self.logger.info("Disconnected from sensor node")
+
+
+class SimulatedSTU(STU):
+    """Simulated STU
+
+    Args:
+
+        sensor_nodes:
+
+            The simulated sensor nodes the STU can connect to
+
+        latency:
+
+            The time in seconds each request to the STU takes
+
+    """
+
+    def __init__(
+        self, sensor_nodes: list[SimulatedSensorNode], latency: float = 0
+    ) -> None:
+
+        self.logger = getLogger(__name__)
+        self.sensor_nodes = sensor_nodes
+        self.latency = latency
+        self.mac_address = EUI("08-6B-D7-01-DE-80")
+        self.connected: SimulatedSensorNode | None = None
+
+    async def request(self) -> None:
+        """Simulate the round trip time of a request"""
+
+        await sleep(self.latency)
+
+    async def reset(self) -> None:
+        """Reset the STU"""
+
+        await self.request()
+        self.connected = None
+
+    async def get_state(self) -> NodeState:
+        """Get the current state of the STU
+
+        Returns:
+
+            The operating state of the STU
+
+        """
+
+        await self.request()
+        return NodeState(location="Application", state="Operating")
+
+    async def get_mac_address(self, sensor_node_number: int = 0xFF) -> EUI:
+        """Retrieve the MAC address of the STU or a sensor node
+
+        Args:
+
+            sensor_node_number:
+
+                The number of the sensor node or ``0xFF`` for the STU
+
+        Returns:
+
+            The MAC address of the specified node
+
+        """
+
+        await self.request()
+        if sensor_node_number == 0xFF:
+            return self.mac_address
+
+        return self.sensor_nodes[sensor_node_number].mac_address
+
+    async def is_connected(self) -> bool:
+        """Check if the STU is connected to a sensor node
+
+        Returns:
+
+            - ``True``, if the STU is connected to a sensor node
+            - ``False``, otherwise
+
+        """
+
+        await self.request()
+        return self.connected is not None
+
+    async def collect_sensor_nodes(self, timeout=5) -> list[SensorNodeInfo]:
+        """Get the sensor nodes that are not connected to the STU
+
+        Args:
+
+            timeout:
+
+                Not used by the simulation
+
+        Returns:
+
+            A list containing information about the available sensor nodes
+
+        """
+
+        await self.request()
+        return [
+            SensorNodeInfo(
+                name=node.name,
+                sensor_node_number=number,
+                mac_address=node.mac_address,
+                rssi=node.rssi,
+            )
+            for number, node in enumerate(self.sensor_nodes)
+            if node is not self.connected
+        ]
+
+    def connect_sensor_node(
+        self,
+        identifier: int | str | EUI,
+        sensor_node_class: type[SensorNode] = SensorNode,
+    ) -> AsyncSensorNodeManager:
+        """Connect to a simulated sensor node
+
+        Args:
+
+            identifier:
+
+                The MAC address (``EUI``), name (``str``) or node number
+                (``int``) of the sensor node
+
+            sensor_node_class:
+
+                Not used by the simulation
+
+        Returns:
+
+            A context manager that returns the simulated sensor node
+
+        """
+
+        return SimulatedSensorNodeManager(self, identifier)
+
+
+class SimulatedConnection(Connection):
+    """Simulated connection to the CAN bus
+
+    Args:
+
+        sensor_nodes:
+
+            The simulated sensor nodes available in the system. If you do not
+            specify any sensor nodes, then the system contains a single
+            sensor node with the default attributes of
+            :class:`SimulatedSensorNode`.
+
+        latency:
+
+            The time in seconds each request to the STU takes
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from icostate import ICOsystem
+
+        Connect to a simulated sensor node
+
+        >>> async def connect(icosystem: ICOsystem):
+        ...     await icosystem.connect_stu()
+        ...     await icosystem.connect_sensor_node_mac("08-6B-D7-01-DE-81")
+        ...     name = await icosystem.sensor_node.get_name()
+        ...     await icosystem.disconnect_sensor_node()
+        ...     await icosystem.disconnect_stu()
+        ...     return name
+        >>> run(connect(ICOsystem(connection=SimulatedConnection())))
+        'Test-STH'
+
+    """
+
+    def __init__(
+        self,
+        sensor_nodes: list[SimulatedSensorNode] | None = None,
+        latency: float = 0,
+    ) -> None:
+
+        super().__init__()
+        self.stu = SimulatedSTU(
+            [SimulatedSensorNode()] if sensor_nodes is None else sensor_nodes,
+            latency,
+        )
+
+    async def __aenter__(self) -> STU:
+        """Connect to the simulated STU
+
+        Returns:
+
+            The simulated STU
+
+        """
+
+        return self.stu
+
+    async def __aexit__(
+        self,
+        exception_type: type[BaseException] | None,
+        exception_value: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        """Disconnect from the simulated STU
+
+        Args:
+
+            exception_type:
+
+                The type of the exception in case of an exception
+
+            exception_value:
+
+                The value of the exception in case of an exception
+
+            traceback:
+
+                The traceback in case of an exception
+
+        """
+
+        self.stu.connected = None
+
+
+# pylint: enable=super-init-not-called,too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,357 @@
+"""Spectral analysis of measurement data"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Callable, Sequence
+
+import numpy as np
+
+from numpy.lib.stride_tricks import sliding_window_view
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import (
+    channel_sample_rate,
+    CHANNELS,
+    enabled_channels,
+)
+from icostate.sensor import SensorNodeAttributes
+from icostate.worker import BackgroundWorker
+
+# -- Attributes ---------------------------------------------------------------
+
+WINDOWS: dict[str, Callable[[int], np.ndarray]] = {
+    "rectangular": np.ones,
+    "hann": np.hanning,
+    "hamming": np.hamming,
+    "blackman": np.blackman,
+}
+"""Supported window functions"""
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-few-public-methods,too-many-instance-attributes
+
+
+class Spectrum:
+    """Spectral features of a single window of measurement data
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        timestamp:
+
+            The timestamp of the first sample of the analyzed data
+
+        frequencies:
+
+            The frequencies of the spectrum in Hz
+
+        power:
+
+            The power spectral density (one column per enabled channel)
+
+        bands:
+
+            The frequency bands (lower and upper limit in Hz) of
+            ``band_power``
+
+    """
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        timestamp: float,
+        frequencies: np.ndarray,
+        power: np.ndarray,
+        bands: Sequence[tuple[float, float]] = (),
+    ) -> None:
+
+        self.configuration = configuration
+        self.timestamp = timestamp
+        self.frequencies = frequencies
+        self.power = power
+        self.bands = list(bands)
+
+        resolution = frequencies[1] - frequencies[0]
+        self.band_power = np.array([
+            power[(frequencies >= low) & (frequencies < high)].sum(axis=0)
+            * resolution
+            for low, high in self.bands
+        ]).reshape(len(self.bands), power.shape[1])
+        """Power of every frequency band (one column per enabled channel)"""
+
+        # Ignore the constant part of the signal
+        self.dominant_frequency = frequencies[1:][power[1:].argmax(axis=0)]
+        """Frequency with the highest power of every channel"""
+
+        total = power.sum(axis=0)
+        total[total == 0] = np.nan
+        centroid = (frequencies[:, None] * power).sum(axis=0) / total
+        deviation = frequencies[:, None] - centroid
+        variance = (deviation**2 * power).sum(axis=0) / total
+        self.spectral_centroid = centroid
+        """Center of mass of the spectrum of every channel"""
+        self.spectral_kurtosis = (deviation**4 * power).sum(axis=0) / (
+            total * variance**2
+        )
+        """Kurtosis of the spectrum (distribution of the power over the
+        frequencies) of every channel"""
+
+    def channel(self, name: str) -> np.ndarray:
+        """Get the power spectral density of a single channel
+
+        Args:
+
+            name:
+
+                The name of the channel (``first``, ``second`` or ``third``)
+
+        Returns:
+
+            The power spectral density at :attr:`frequencies`
+
+        Raises:
+
+            ValueError:
+
+                If the channel is not enabled
+
+        """
+
+        channels = [
+            CHANNELS[index] for index in enabled_channels(self.configuration)
+        ]
+        if name not in channels:
+            raise ValueError(f"Channel “{name}” is not enabled")
+
+        return self.power[:, channels.index(name)]
+
+
+class SpectrumAnalyzer(BackgroundWorker):
+    """Calculate spectra of measurement data using a background thread
+
+    The analyzer splits the measurement data into overlapping windows of
+    ``size`` samples, which start every ``hop`` samples. For every window
+    it removes the mean, applies the window function and calculates the
+    power spectral density (one-sided, based on the real FFT) and the
+    spectral features of :class:`Spectrum`.
+
+    Args:
+
+        size:
+
+            The number of samples (per channel) of a single FFT
+
+        hop:
+
+            The number of samples between the start of two consecutive
+            windows or ``None`` for half the window size (50 % overlap)
+
+        window:
+
+            The name of the window function (``hann``, ``hamming``,
+            ``blackman`` or ``rectangular``)
+
+        bands:
+
+            Frequency bands (lower and upper limit in Hz) whose power the
+            analyzer calculates
+
+        maxsize:
+
+            The maximum number of measurement windows waiting for the
+            analyzer thread
+
+    Raises:
+
+        ValueError:
+
+            If one of the arguments is invalid
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from netaddr import EUI
+        >>> from icotronic.can.adc import ADCConfiguration
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Analyze a sine wave with a frequency of 1 kHz
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> adc_configuration = ADCConfiguration(prescaler=2,
+        ...                                      acquisition_time=8,
+        ...                                      oversampling_rate=64)
+        >>> attributes = SensorNodeAttributes("Test-STH",
+        ...                                   EUI("08-6B-D7-01-DE-81"),
+        ...                                   adc_configuration)
+        >>> sample_rate = channel_sample_rate(adc_configuration,
+        ...                                   configuration)
+        >>> sine = np.sin(2 * np.pi * 1000 * np.arange(3072) / sample_rate)
+        >>> buffer = MeasurementBuffer(configuration, capacity=3072)
+        >>> for counter, values in enumerate(sine.reshape(-1, 3)):
+        ...     buffer.append(StreamingData(values=list(values),
+        ...                                 counter=counter % 256,
+        ...                                 timestamp=counter))
+
+        >>> async def analyze(analyzer: SpectrumAnalyzer):
+        ...     analyzer.start(configuration, attributes)
+        ...     analyzer.put(buffer.window(0, 2000).copy())
+        ...     analyzer.put(buffer.window(2000, 3072).copy())
+        ...     await analyzer.stop()
+        ...     return analyzer.results()
+        >>> analyzer = SpectrumAnalyzer(size=1024, hop=512,
+        ...                             bands=[(900, 1100), (2000, 3000)])
+        >>> spectra = run(analyze(analyzer))
+        >>> len(spectra)
+        5
+        >>> round(float(spectra[0].dominant_frequency[0]), -1)
+        1000.0
+        >>> power = spectra[0].band_power[:, 0]
+        >>> bool(power[0] > 1000 * power[1])
+        True
+
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+
+    def __init__(
+        self,
+        size: int = 4096,
+        hop: int | None = None,
+        window: str = "hann",
+        bands: Sequence[tuple[float, float]] = (),
+        maxsize: int = 256,
+    ) -> None:
+
+        hop = size // 2 if hop is None else hop
+        if size < 2:
+            raise ValueError(f"FFT size must be at least 2, not {size}")
+        if not 0 < hop <= size:
+            raise ValueError(f"Invalid hop size: {hop}")
+        if window not in WINDOWS:
+            raise ValueError(f"Unknown window function: “{window}”")
+
+        super().__init__("icostate-spectrum", maxsize)
+        self.size = size
+        self.hop = hop
+        self.window = window
+        self.bands = list(bands)
+        self.spectra: deque[Spectrum] = deque()
+        """Calculated spectra not retrieved yet"""
+        self.sample_rate = 0.0
+        """Sample rate of a single channel in Hz"""
+        self.configuration = StreamingConfiguration()
+        """Streaming configuration of the measurement"""
+
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    def start(
+        self,
+        configuration: StreamingConfiguration,
+        attributes: SensorNodeAttributes,
+    ) -> None:
+        """Start the analyzer thread
+
+        Args:
+
+            configuration:
+
+                The streaming configuration of the measurement
+
+            attributes:
+
+                Information about the sensor node, which includes the ADC
+                configuration that determines the sample rate
+
+        """
+
+        self.sample_rate = channel_sample_rate(
+            attributes.adc_configuration, configuration
+        )
+        self.configuration = configuration
+        self.spectra.clear()
+        self._start()
+
+    def results(self) -> list[Spectrum]:
+        """Retrieve the spectra calculated since the last call
+
+        Returns:
+
+            The new spectra in chronological order
+
+        """
+
+        spectra = []
+        while self.spectra:
+            spectra.append(self.spectra.popleft())
+
+        return spectra
+
+    def _work(self) -> None:
+        """Calculate the spectra of the data in the queue (analyzer thread)"""
+
+        configuration = self.configuration
+        channels = enabled_channels(configuration)
+        window = WINDOWS[self.window](self.size)
+        frequencies = np.fft.rfftfreq(self.size, 1 / self.sample_rate)
+        # Scale the squared magnitude to a one-sided power spectral density
+        scale = np.full(
+            len(frequencies), 2 / (self.sample_rate * (window**2).sum())
+        )
+        scale[0] /= 2
+        if self.size % 2 == 0:
+            scale[-1] /= 2
+
+        values = np.empty((0, len(channels)))
+        timestamps = np.empty(0)
+        while (item := self.queue.get()) is not None:
+            _, measurement = item
+            values = np.concatenate((values, measurement.data[:, channels]))
+            timestamps = np.concatenate((timestamps, measurement.timestamps))
+            if len(values) < self.size:
+                continue
+
+            frames = sliding_window_view(values, self.size, axis=0)[
+                :: self.hop
+            ]
+            # Remove the constant part (mean) of every window, since the
+            # leakage of the large offset of the raw values would otherwise
+            # hide low frequencies
+            frames = frames - frames.mean(axis=-1, keepdims=True)
+            power = np.abs(np.fft.rfft(frames * window, axis=-1)) ** 2 * scale
+            for start, spectrum in zip(
+                timestamps[: len(values) - self.size + 1 : self.hop], power
+            ):
+                self.spectra.append(
+                    Spectrum(
+                        configuration,
+                        float(start),
+                        frequencies,
+                        spectrum.T,
+                        self.bands,
+                    )
+                )
+
+            consumed = len(frames) * self.hop
+            values = values[consumed:]
+            timestamps = timestamps[consumed:]
+
+
+# pylint: enable=too-few-public-methods,too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
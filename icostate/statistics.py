@@ -0,0 +1,389 @@
+"""Running statistics of measurement data"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Sequence
+from math import inf, isfinite
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import CHANNELS, enabled_channels, MeasurementWindow
+
+# -- Classes ------------------------------------------------------------------
+
+# pylint: disable=too-many-instance-attributes
+
+
+class Statistics:
+    """Store statistics of measurement data (one value per enabled channel)
+
+    The class stores the number of samples, the mean, the sum of squared
+    differences from the mean (Welford), the minimum and the maximum. Two
+    statistics objects for consecutive data can be combined without the
+    original data (:meth:`merge`).
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Calculate statistics in two steps
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=6)
+        >>> for counter, values in enumerate(([1, 2, 3], [-4, 5, 6])):
+        ...     buffer.append(StreamingData(values=values, counter=counter,
+        ...                                 timestamp=counter))
+        >>> statistics = Statistics.calculate(buffer.window(0, 3)).merge(
+        ...     Statistics.calculate(buffer.window(3, 6)))
+        >>> statistics.count
+        6
+        >>> first = statistics.channel("first")
+        >>> round(first["mean"], 2), round(first["rms"], 2), first["peak"]
+        (2.17, 3.89, 6.0)
+
+    """
+
+    def __init__(self, configuration: StreamingConfiguration) -> None:
+
+        channels = len(enabled_channels(configuration))
+        self.configuration = configuration
+        self.count = 0
+        """Number of samples (per channel)"""
+        self.mean = np.zeros(channels)
+        """Mean of every channel"""
+        self.m2 = np.zeros(channels)
+        """Sum of squared differences from the mean of every channel"""
+        self.minimum = np.full(channels, inf)
+        """Minimum of every channel"""
+        self.maximum = np.full(channels, -inf)
+        """Maximum of every channel"""
+        self.start = inf
+        """Timestamp of the first sample"""
+        self.end = -inf
+        """Timestamp of the last sample"""
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the statistics
+
+        Returns:
+
+            A string containing the statistics of every channel
+
+        Examples:
+
+            >>> Statistics(StreamingConfiguration(first=True))
+            Samples: 0
+
+        """
+
+        parts = [f"Samples: {self.count}"]
+        for name in self.channels() if self.count else []:
+            values = ", ".join(
+                f"{key}: {value:.2f}"
+                for key, value in self.channel(name).items()
+            )
+            parts.append(f"{name.capitalize()}: {values}")
+
+        return "; ".join(parts)
+
+    @classmethod
+    def calculate(cls, window: MeasurementWindow) -> Statistics:
+        """Calculate the statistics of measurement data
+
+        Args:
+
+            window:
+
+                The measurement data
+
+        Returns:
+
+            The statistics of the data
+
+        """
+
+        statistics = cls(window.configuration)
+        if window.samples() == 0:
+            return statistics
+
+        values = window.data[:, enabled_channels(window.configuration)]
+        statistics.count = len(values)
+        statistics.mean = values.mean(axis=0)
+        statistics.m2 = np.square(values - statistics.mean).sum(axis=0)
+        statistics.minimum = values.min(axis=0)
+        statistics.maximum = values.max(axis=0)
+        statistics.start = float(window.timestamps[0])
+        statistics.end = float(window.timestamps[-1])
+
+        return statistics
+
+    def merge(self, other: Statistics) -> Statistics:
+        """Combine two statistics
+
+        Args:
+
+            other:
+
+                The statistics of other measurement data
+
+        Returns:
+
+            The statistics of the data of both objects
+
+        """
+
+        if other.count == 0:
+            return self
+        if self.count == 0:
+            return other
+
+        merged = Statistics(self.configuration)
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        merged.count = count
+        merged.mean = self.mean + delta * (other.count / count)
+        merged.m2 = (
+            self.m2 + other.m2 + delta**2 * (self.count * other.count / count)
+        )
+        merged.minimum = np.minimum(self.minimum, other.minimum)
+        merged.maximum = np.maximum(self.maximum, other.maximum)
+        merged.start = min(self.start, other.start)
+        merged.end = max(self.end, other.end)
+
+        return merged
+
+    def channels(self) -> list[str]:
+        """Get the names of the channels
+
+        Returns:
+
+            The names of the enabled channels
+
+        """
+
+        return [
+            CHANNELS[index] for index in enabled_channels(self.configuration)
+        ]
+
+    def variance(self) -> np.ndarray:
+        """Get the (population) variance of every channel
+
+        Returns:
+
+            The variance or NaN, if there is no data
+
+        """
+
+        if self.count == 0:
+            return np.full_like(self.m2, np.nan)
+        return self.m2 / self.count
+
+    def rms(self) -> np.ndarray:
+        """Get the root mean square of every channel
+
+        Returns:
+
+            The root mean square or NaN, if there is no data
+
+        """
+
+        return np.sqrt(np.square(self.mean) + self.variance())
+
+    def peak(self) -> np.ndarray:
+        """Get the largest absolute value of every channel
+
+        Returns:
+
+            The peak value or NaN, if there is no data
+
+        """
+
+        if self.count == 0:
+            return np.full_like(self.m2, np.nan)
+        return np.maximum(np.abs(self.minimum), np.abs(self.maximum))
+
+    def channel(self, name: str) -> dict[str, float]:
+        """Get the statistics of a single channel
+
+        Args:
+
+            name:
+
+                The name of the channel (``first``, ``second`` or ``third``)
+
+        Returns:
+
+            A dictionary containing the mean, variance, root mean square,
+            minimum, maximum and peak value of the channel
+
+        Raises:
+
+            ValueError:
+
+                If the channel is not enabled
+
+        """
+
+        channels = self.channels()
+        if name not in channels:
+            raise ValueError(f"Channel “{name}” is not enabled")
+
+        column = channels.index(name)
+        if self.count == 0:
+            return {}
+        return {
+            "mean": float(self.mean[column]),
+            "variance": float(self.variance()[column]),
+            "rms": float(self.rms()[column]),
+            "minimum": float(self.minimum[column]),
+            "maximum": float(self.maximum[column]),
+            "peak": float(self.peak()[column]),
+        }
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+class RunningStatistics:
+    """Keep statistics of measurement data over sliding time windows
+
+    The class calculates the statistics of every added window using a few
+    vectorized operations. The statistics of a sliding window combine the
+    statistics of the added windows that ended within the duration of the
+    sliding window. The duration of a sliding window is therefore only
+    accurate up to the length of the added windows.
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        durations:
+
+            The durations of the sliding windows in seconds. The duration
+            ``inf`` (default) stands for all data since the start of the
+            measurement.
+
+    Raises:
+
+        ValueError:
+
+            If a duration is invalid
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Calculate statistics of the last two seconds and all data
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=12)
+        >>> statistics = RunningStatistics(configuration, durations=(2, inf))
+        >>> for counter in range(4):
+        ...     buffer.append(StreamingData(values=[counter] * 3,
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+        ...     statistics.add(buffer.window(3 * counter, 3 * counter + 3))
+        >>> snapshot = statistics.snapshot()
+        >>> snapshot[2].count, snapshot[2].minimum
+        (6, array([2.]))
+        >>> snapshot[inf].count, snapshot[inf].minimum
+        (12, array([0.]))
+
+    """
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        durations: Sequence[float] = (inf,),
+    ) -> None:
+
+        if any(duration <= 0 for duration in durations):
+            raise ValueError(f"Invalid statistics durations: {durations}")
+
+        self.configuration = configuration
+        self.durations = sorted(set(durations))
+        self.total = Statistics(configuration)
+        """Statistics of all data"""
+        self.batches: deque[Statistics] = deque()
+        """Statistics of the windows added during the longest (finite)
+        sliding window"""
+        self._longest = max(
+            (duration for duration in self.durations if isfinite(duration)),
+            default=0,
+        )
+
+    def add(self, window: MeasurementWindow) -> None:
+        """Add measurement data
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        """
+
+        batch = Statistics.calculate(window)
+        if batch.count == 0:
+            return
+
+        self.total = self.total.merge(batch)
+        if self._longest == 0:
+            return
+
+        self.batches.append(batch)
+        while self.batches[0].end <= batch.end - self._longest:
+            self.batches.popleft()
+
+    def snapshot(self) -> dict[float, Statistics]:
+        """Get the current statistics
+
+        Returns:
+
+            A dictionary that maps the duration of every sliding window to
+            its statistics
+
+        """
+
+        snapshot = {}
+        merged = Statistics(self.configuration)
+        end = self.batches[-1].end if self.batches else 0
+        index = len(self.batches)
+        for duration in self.durations:
+            if not isfinite(duration):
+                continue
+            while index > 0 and self.batches[index - 1].end > end - duration:
+                index -= 1
+                merged = self.batches[index].merge(merged)
+            snapshot[duration] = merged
+        if inf in self.durations:
+            snapshot[inf] = self.total
+
+        return snapshot
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
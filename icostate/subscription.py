@@ -0,0 +1,272 @@
+"""Pull based access to measurement data"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from asyncio import Event
+from collections import deque
+from enum import Enum
+
+from icostate.buffer import MeasurementWindow
+
+# -- Classes ------------------------------------------------------------------
+
+
+class OverflowPolicy(str, Enum):
+    """Specifies what happens if the queue of a consumer is full
+
+    Examples:
+
+        Get policy variables
+
+        >>> OverflowPolicy.BLOCK
+        <OverflowPolicy.BLOCK: 'BLOCK'>
+
+        >>> OverflowPolicy.DROP_OLDEST
+        <OverflowPolicy.DROP_OLDEST: 'DROP_OLDEST'>
+
+    """
+
+    BLOCK = "BLOCK"
+    """Delay the measurement updates until the consumer catches up
+
+    The measurement buffer keeps the data in the meantime, which is why no
+    data gets lost. All other consumers will also receive their updates
+    later. Since the buffer grows as long as the consumer does not catch
+    up, only use this policy for consumers that read all of the data.
+    """
+
+    DROP_OLDEST = "DROP_OLDEST"
+    """Remove the oldest window of the queue"""
+
+    COALESCE = "COALESCE"
+    """Merge the new window into the newest window of the queue"""
+
+
+# pylint: disable=too-many-instance-attributes
+
+
+class WindowQueue:
+    """Bounded queue of measurement windows for a single consumer
+
+    The queue is an asynchronous iterator, which ends after the measurement
+    ends and the consumer retrieved all windows.
+
+    Args:
+
+        maxsize:
+
+            The maximum number of windows stored in the queue
+
+        policy:
+
+            Specifies what happens, if a new window arrives while the queue
+            is full
+
+        update_rate:
+
+            The number of windows per second the queue receives or ``None``,
+            if the queue should receive the windows of the measurement
+            (update rate of the measurement)
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from icotronic.can.streaming import (StreamingConfiguration,
+        ...                                      StreamingData)
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Create some measurement windows
+
+        >>> buffer = MeasurementBuffer(StreamingConfiguration(first=True),
+        ...                            capacity=12)
+        >>> windows = []
+        >>> for counter in range(4):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter, timestamp=1))
+        ...     windows.append(buffer.window(3 * counter, 3 * counter + 3))
+
+        Drop the oldest window if the queue is full
+
+        >>> async def consume(queue: WindowQueue):
+        ...     for window in windows:
+        ...         queue.put(window)
+        ...     queue.close()
+        ...     return [window.samples() async for window in queue]
+        >>> queue = WindowQueue(maxsize=2, policy=OverflowPolicy.DROP_OLDEST)
+        >>> run(consume(queue))
+        [3, 3]
+        >>> queue.dropped
+        2
+
+        Combine windows if the queue is full
+
+        >>> queue = WindowQueue(maxsize=2, policy=OverflowPolicy.COALESCE)
+        >>> run(consume(queue))
+        [3, 9]
+        >>> queue.coalesced
+        2
+
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 16,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        update_rate: float | None = None,
+    ) -> None:
+
+        if maxsize < 1:
+            raise ValueError(
+                f"Maximum queue size must be at least 1, not {maxsize}"
+            )
+        if update_rate is not None and update_rate <= 0:
+            raise ValueError(
+                f"Update rate must be larger than 0, not {update_rate}"
+            )
+
+        self.maxsize = maxsize
+        self.policy = policy
+        self.windows: deque[MeasurementWindow] = deque()
+        self.dropped = 0
+        """Number of windows removed because of the ``DROP_OLDEST`` policy"""
+        self.coalesced = 0
+        """Number of windows merged into the newest window of the queue"""
+        self.update_rate = update_rate
+        self.position = 0
+        """Buffer position of the next window (own update rate only)"""
+        self.deadline = 0.0
+        """Time of the next update (own update rate only)"""
+        self.sequence = 0
+        """Sequence number of the last window (own update rate only)"""
+        self.closed = False
+        self._available = Event()
+        self._space = Event()
+        self._space.set()
+
+    def period(self) -> float:
+        """Get the time between two updates of the queue
+
+        Returns:
+
+            The update period in seconds or ``0``, if the queue uses the
+            update rate of the measurement
+
+        Examples:
+
+            >>> WindowQueue(update_rate=4).period()
+            0.25
+            >>> WindowQueue().period()
+            0
+
+        """
+
+        return 1 / self.update_rate if self.update_rate else 0
+
+    def full(self) -> bool:
+        """Check if the queue is full
+
+        Returns:
+
+            ``True``, if the queue contains the maximum number of windows,
+            ``False`` otherwise
+
+        """
+
+        return len(self.windows) >= self.maxsize
+
+    def put(self, window: MeasurementWindow) -> None:
+        """Add a window to the queue
+
+        This method never waits. If the queue is full, then it applies the
+        overflow policy. For the policy ``BLOCK`` the producer needs to wait
+        for space (:meth:`wait_for_space`) before it adds a window, otherwise
+        the queue merges the window into the newest window of the queue.
+
+        Args:
+
+            window:
+
+                The measurement window that should be added to the queue
+
+        """
+
+        if self.full():
+            if self.policy == OverflowPolicy.DROP_OLDEST:
+                self.windows.popleft()
+                self.dropped += 1
+            else:
+                self.windows.append(self.windows.pop().merge(window))
+                self.coalesced += 1
+                return
+
+        self.windows.append(window)
+        self._available.set()
+
+    async def wait_for_space(self) -> None:
+        """Wait until the queue is not full anymore (or closed)"""
+
+        while self.full() and not self.closed:
+            self._space.clear()
+            await self._space.wait()
+
+    def close(self) -> None:
+        """Mark the end of the measurement
+
+        The consumer still retrieves the windows stored in the queue.
+
+        """
+
+        self.closed = True
+        self._available.set()
+        self._space.set()
+
+    def __aiter__(self) -> WindowQueue:
+        """Get the asynchronous iterator of the queue
+
+        Returns:
+
+            The queue itself
+
+        """
+
+        return self
+
+    async def __anext__(self) -> MeasurementWindow:
+        """Retrieve the next measurement window
+
+        Returns:
+
+            The oldest window of the queue
+
+        Raises:
+
+            StopAsyncIteration:
+
+                If the measurement ended and the queue is empty
+
+        """
+
+        while not self.windows:
+            if self.closed:
+                raise StopAsyncIteration
+            self._available.clear()
+            await self._available.wait()
+
+        window = self.windows.popleft()
+        self._space.set()
+        return window
+
+
+# pylint: enable=too-many-instance-attributes
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -6,27 +6,68 @@
 
 from __future__ import annotations
 
-from asyncio import create_task, sleep, Task
+from asyncio import (
+    create_task,
+    current_task,
+    Event,
+    FIRST_COMPLETED,
+    Future,
+    gather,
+    shield,
+    sleep,
+    Task,
+    wait,
+    wait_for,
+)
+from collections.abc import AsyncIterator, Sequence
+from contextlib import suppress
 from logging import getLogger
-from math import inf
-from time import monotonic
+from math import ceil, inf
+from time import monotonic, perf_counter
 from typing import Any
 
 from icotronic.can import Connection, SensorNode, StreamingConfiguration, STU
 from icotronic.can.adc import ADCConfiguration
+from icotronic.can.error import (
+    CANConnectionError,
+    UnsupportedFeatureException,
+)
 from icotronic.can.node.stu import AsyncSensorNodeManager, SensorNodeInfo
 from icotronic.can.sensor import SensorConfiguration
+from icotronic.can.streaming import AsyncStreamBuffer, StreamingData
 from icotronic.can.status import State as NodeState
-from icotronic.measurement import MeasurementData
 from netaddr import AddrFormatError, EUI
 from pyee.asyncio import AsyncIOEventEmitter
 
+from icostate.buffer import (
+    channel_sample_rate,
+    MeasurementBuffer,
+    MeasurementWindow,
+)
+from icostate.conversion import LinearConversion, SensorCalibration
+from icostate.counters import MeasurementCounters
+from icostate.envelope import EnvelopeDecimator
 from icostate.error import IncorrectStateError
-from icostate.sensor import SensorNodeAttributes
+from icostate.history import History
+from icostate.pyramid import Pyramid
+from icostate.recording import Recorder
+from icostate.sensor import (
+    AttributeCache,
+    ProfileResult,
+    SensorNodeAttributes,
+    SensorNodeProfile,
+)
+from icostate.spectrum import SpectrumAnalyzer
 from icostate.state import State
+from icostate.statistics import RunningStatistics, Statistics
+from icostate.subscription import OverflowPolicy, WindowQueue
+from icostate.timing import GapFill, GapIndex, RegularGrid, SampleClock
+from icostate.trigger import TriggeredCapture
 
 # -- Classes ------------------------------------------------------------------
 
+# pylint: disable=too-many-instance-attributes
+
 
 class Measurement:
     """Collect measurement data
@@ -39,6 +80,8 @@ class Measurement:
 
     """
 
+    # pylint: disable=too-many-statements
+
     def __init__(self, icosystem: ICOsystem) -> None:
 
         self.icosystem = icosystem
@@ -46,12 +89,96 @@ class Measurement:
         self.logger = getLogger()
         self.update_rate = 60.0  # Sensible default of 60 Hz
         """Measurement update rate in Hz"""
-
-    def start(
+        self.buffer_duration = 2.0
+        """Amount of measurement data (in seconds) stored in the buffer"""
+        self.buffer: MeasurementBuffer | None = None
+        """Buffer that stores the data of the current measurement"""
+        self.zero_copy = False
+        """Emit views into the measurement buffer instead of copies"""
+        self.sequence = 0
+        """Sequence number of the last emitted measurement window"""
+        self.last_message = monotonic()
+        """Time when the last streaming message arrived"""
+        self.stop_event = Event()
+        """Event used to request the end of the current measurement"""
+        self.stream_closed = Event()
+        """Event that signals the end of the data stream of the current
+        measurement"""
+        self.counters = MeasurementCounters()
+        """Running counters of the current (or last) measurement"""
+        self.counter_interval = 1.0
+        """Time in seconds between two ``sensor_node_measurement_counters``
+        events"""
+        self.queues: list[WindowQueue] = []
+        """Queues of the consumers of measurement windows"""
+        self.position = 0
+        """Buffer position up to which the measurement emitted data"""
+        self.recorder: Recorder | None = None
+        """Recorder that stores the data of the measurement"""
+        self.pyramid_factors: Sequence[int] | None = None
+        """Downsampling factors of the measurement pyramid or ``None``, if
+        the measurement should not build a pyramid"""
+        self.pyramid: Pyramid | None = None
+        """Minimum, maximum and mean of the current (or last) measurement
+        at different resolutions"""
+        self.envelope_rate: float | None = None
+        """Number of minimum/maximum pairs per second and channel emitted
+        with the ``sensor_node_measurement_envelope`` event"""
+        self.decimator: EnvelopeDecimator | None = None
+        """Decimator that calculates the envelope of the current
+        measurement"""
+        self.statistics_durations: Sequence[float] | None = None
+        """Durations in seconds of the sliding windows of the measurement
+        statistics (``inf``: whole measurement) or ``None``, if the
+        measurement should not calculate statistics"""
+        self.statistics_interval = 1.0
+        """Time in seconds between two ``sensor_node_measurement_statistics``
+        events"""
+        self.statistics: RunningStatistics | None = None
+        """Running statistics of the current (or last) measurement"""
+        self.analyzer: SpectrumAnalyzer | None = None
+        """Analyzer that calculates the spectra of the measurement data"""
+        self.trigger: TriggeredCapture | None = None
+        """Capture of the measurement data around trigger events"""
+        self.conversion: LinearConversion | None = None
+        """Conversion of the raw measurement values into physical units"""
+        self.converted = 0
+        """Position in the measurement buffer up to which the values are
+        converted"""
+        self.fill: GapFill | None = None
+        """Specifies how to fill gaps, if the measurement emits data on a
+        regular grid"""
+        self.gaps = GapIndex()
+        """Lost samples of the current (or last) measurement"""
+        self.clock: SampleClock | None = None
+        """Clock that calculates the time of every sample of the current
+        (or last) measurement"""
+        self.grid: RegularGrid | None = None
+        """Grid that fills the gaps of the emitted measurement data"""
+        self.history: History | None = None
+        """Complete data of the measurement with bounded memory"""
+
+    # pylint: enable=too-many-statements
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals
+
+    async def start(
         self,
         configuration: StreamingConfiguration,
         update_rate: float,
         runtime: float = inf,
+        zero_copy: bool = False,
+        samples: int | None = None,
+        recorder: Recorder | None = None,
+        envelope_rate: float | None = None,
+        analyzer: SpectrumAnalyzer | None = None,
+        trigger: TriggeredCapture | None = None,
+        conversion: LinearConversion | None = None,
+        fill: GapFill | None = None,
+        history: History | None = None,
+        pyramid_factors: Sequence[int] | None = None,
+        statistics_durations: Sequence[float] | None = None,
     ) -> None:
         """Start the measurement
 
@@ -66,32 +193,226 @@ class Measurement:
 
                 The measurement update rate in Hz, i.e. how many times in
                 a second ``icosystem`` emits the
-                ``sensor_node_measurement_data`` event.
+                ``sensor_node_measurement_data`` event. A timer triggers
+                these updates independent of the arrival of streaming
+                messages. If there was no new data since the last update,
+                then ``icosystem`` emits the
+                ``sensor_node_measurement_stalled`` event instead.
 
             runtime:
 
                 The measurement runtime in seconds
 
+            zero_copy:
+
+                Specifies if listeners should receive read only views into
+                the measurement buffer (``True``) or copies of the
+                measurement data (``False``)
+
+            samples:
+
+                The number of samples (per channel) after which the
+                measurement should end
+
+            recorder:
+
+                The recorder that should store the measurement data
+
+            envelope_rate:
+
+                The number of minimum/maximum pairs per second and channel
+                of the ``sensor_node_measurement_envelope`` event or
+                ``None``, if the measurement should not emit this event
+
+            analyzer:
+
+                The analyzer that should calculate the spectra of the
+                measurement data (``sensor_node_spectrum`` event)
+
+            trigger:
+
+                The triggered capture that should collect the measurement
+                data around trigger events (``sensor_node_trigger`` event)
+
+            conversion:
+
+                The conversion that turns the raw values into physical
+                units before any consumer receives them or ``None`` for
+                raw values
+
+            fill:
+
+                Specifies how to fill the samples of lost messages, if the
+                measurement should emit data on a regular grid or ``None``
+                for the received data
+
+            history:
+
+                The history that should store all data of the measurement
+
+            pyramid_factors:
+
+                The downsampling factors of the pyramid the measurement
+                should build or ``None`` for no pyramid
+
+            statistics_durations:
+
+                The durations in seconds of the sliding windows of the
+                running statistics or ``None`` for no statistics
+
         """
 
-        self.update_rate = update_rate
+        if envelope_rate is not None and envelope_rate <= 0:
+            raise ValueError(
+                f"Envelope rate must be larger than 0, not {envelope_rate}"
+            )
 
+        # The old measurement task uses the settings until it finished
         if self.read_task is not None:
             self.logger.info("Stopping old measurement task")
-            self.stop()
+            await self.stop()
+
+        self.update_rate = update_rate
+        self.zero_copy = zero_copy
+        self.envelope_rate = envelope_rate
+        self.conversion = conversion
+        self.fill = fill
+        self.pyramid_factors = pyramid_factors
+        self.statistics_durations = statistics_durations
+
+        self.recorder = recorder
+        if recorder is not None:
+            recorder.start(
+                configuration, self.icosystem.sensor_node_attributes
+            )
+        self.analyzer = analyzer
+        if analyzer is not None:
+            attributes = self.icosystem.sensor_node_attributes
+            assert isinstance(attributes, SensorNodeAttributes)
+            analyzer.start(configuration, attributes)
+        self.history = history
+        if history is not None:
+            history.start(configuration, self.icosystem.sensor_node_attributes)
+        self.trigger = trigger
+        if trigger is not None:
+            attributes = self.icosystem.sensor_node_attributes
+            assert isinstance(attributes, SensorNodeAttributes)
+            trigger.start(configuration, attributes)
 
         self.logger.info("Creating new measurement task")
-        self.read_task = create_task(self._read(configuration, runtime))
+        self.stop_event = Event()
+        self.stream_closed = Event()
+        self.read_task = create_task(
+            self._read(configuration, runtime, samples)
+        )
 
-    def stop(self):
-        """Stop the current measurement"""
+    # pylint: enable=too-many-locals
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
 
-        if self.read_task is not None:
-            self.read_task.cancel()
+    async def stop(self, timeout: float = 1) -> None:
+        """Stop the current measurement
+
+        The measurement task emits the data collected since the last update,
+        closes the stream and waits until the recorder, analyzer, triggered
+        capture and history processed all data before this coroutine
+        returns.
+
+        Args:
+
+            timeout:
+
+                The maximum amount of time in seconds to wait for the
+                data stream to close. After this time the coroutine
+                cancels the task, which discards the data collected since the
+                last update. The coroutine still waits for the background
+                threads to process the data they already received.
+
+        Raises:
+
+            Exception:
+
+                The exception that stopped the measurement task
+
+        """
+
+        read_task = self.read_task
         self.read_task = None
+        if read_task is None:
+            return
+
+        self.stop_event.set()
+        try:
+            await wait_for(shield(self.stream_closed.wait()), timeout)
+        except TimeoutError:
+            self.logger.warning(
+                "Measurement stream did not close within %s seconds", timeout
+            )
+            read_task.cancel()
+
+        results: list[BaseException | None] = await gather(
+            read_task, return_exceptions=True
+        )
+        if isinstance(results[0], Exception):
+            raise results[0]
+
+    def subscribe(
+        self,
+        maxsize: int = 16,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        update_rate: float | None = None,
+    ) -> WindowQueue:
+        """Create a queue that receives the windows of the measurement
+
+        Args:
+
+            maxsize:
+
+                The maximum number of windows stored in the queue
+
+            policy:
+
+                Specifies what happens, if the queue is full
+
+            update_rate:
+
+                The update rate of the queue in Hz or ``None`` to use the
+                update rate of the measurement
+
+        Returns:
+
+            A queue that receives the windows of the current (or next)
+            measurement
+
+        """
+
+        queue = WindowQueue(maxsize, policy, update_rate)
+        if self.buffer is not None and self.read_task is not None:
+            # Start with the data that arrives after the subscription
+            queue.position = self.buffer.position
+            queue.deadline = monotonic() + queue.period()
+        self.queues.append(queue)
+        return queue
+
+    def unsubscribe(self, queue: WindowQueue) -> None:
+        """Stop sending measurement windows to a queue
+
+        Args:
+
+            queue:
+
+                A queue returned by :meth:`subscribe`
+
+        """
+
+        if queue in self.queues:
+            self.queues.remove(queue)
+        queue.close()
 
     async def _read(
-        self, configuration: StreamingConfiguration, runtime: float = inf
+        self,
+        configuration: StreamingConfiguration,
+        runtime: float = inf,
+        samples: int | None = None,
     ):
         """Task for collecting measurement data
 
@@ -104,31 +425,491 @@ class Measurement:
 
             The measurement runtime in seconds
 
+        samples:
+
+            The number of samples (per channel) after which the measurement
+            should end
+
         """
 
-        async with self.icosystem.sensor_node.open_data_stream(
-            configuration
-        ) as stream:
-            self.logger.info(
-                "Opened stream with configuration: %s", configuration
+        attributes = self.icosystem.sensor_node_attributes
+        assert isinstance(attributes, SensorNodeAttributes)
+        sample_rate = attributes.adc_configuration.sample_rate()
+        buffer = MeasurementBuffer(
+            configuration,
+            capacity=ceil(sample_rate * self.buffer_duration),
+            limit=inf if samples is None else samples,
+        )
+        self.buffer = buffer
+        self.sequence = 0
+        self.position = 0
+        self.converted = 0
+        self.counters = MeasurementCounters()
+        self.gaps = GapIndex()
+        self.clock = SampleClock(
+            channel_sample_rate(attributes.adc_configuration, configuration)
+        )
+        self.grid = (
+            None
+            if self.fill is None
+            else RegularGrid(configuration, self.clock, self.fill)
+        )
+        self.pyramid = (
+            None
+            if self.pyramid_factors is None
+            else Pyramid(configuration, self.pyramid_factors)
+        )
+        self.statistics = (
+            None
+            if self.statistics_durations is None
+            else RunningStatistics(configuration, self.statistics_durations)
+        )
+        self.decimator = (
+            None
+            if self.envelope_rate is None
+            else EnvelopeDecimator(
+                configuration,
+                max(
+                    round(
+                        channel_sample_rate(
+                            attributes.adc_configuration, configuration
+                        )
+                        / self.envelope_rate
+                    ),
+                    1,
+                ),
             )
+        )
+        for queue in self.queues:
+            queue.position = 0
+            queue.sequence = 0
+
+        try:
+            async with self.icosystem.sensor_node.open_data_stream(
+                configuration
+            ) as stream:
+                self.logger.info(
+                    "Opened stream with configuration: %s", configuration
+                )
+
+                self.last_message = monotonic()
+                receive_task = create_task(self._receive(stream, buffer))
+                try:
+                    await self._emit(receive_task, runtime)
+                finally:
+                    # The receive task also checks the stop event, in case
+                    # the cancellation coincides with the arrival of a message
+                    self.stop_event.set()
+                    receive_task.cancel()
+                    await gather(receive_task, return_exceptions=True)
+
+                # Store data that arrived, but was not processed yet
+                while not stream.queue.empty():
+                    self._store(buffer, *stream.queue.get_nowait())
+                self._emit_window(final=True)
+                for queue in self.queues:
+                    if queue.update_rate:
+                        self._emit_queue(queue, final=True)
+        finally:
+            # Stopping the measurement must not interrupt the background
+            # threads anymore (see `stop`)
+            self.stream_closed.set()
+            try:
+                for queue in self.queues:
+                    queue.close()
+                self.queues.clear()
+                error = await self._stop_workers()
+                self._emit_counters()
+                self._emit_statistics()
+                self._emit_spectra()
+                self._emit_triggers()
+            finally:
+                self.icosystem.state = State.SENSOR_NODE_CONNECTED
+
+        if error is not None:
+            raise error
+
+    async def _stop_workers(self) -> Exception | None:
+        """Stop the background threads of the measurement
+
+        Returns:
+
+            The first exception that stopped one of the background threads
+            or ``None``, if all threads processed their data successfully
+
+        """
+
+        errors = []
+        for worker in (
+            self.recorder,
+            self.analyzer,
+            self.trigger,
+            self.history,
+        ):
+            if worker is None:
+                continue
+            # pylint: disable=broad-exception-caught
+            try:
+                await worker.stop()
+            except Exception as error:
+                self.logger.error("Stopping “%s” failed", worker.name)
+                errors.append(error)
+            # pylint: enable=broad-exception-caught
+
+        return errors[0] if errors else None
+
+    async def _receive(
+        self, stream: AsyncStreamBuffer, buffer: MeasurementBuffer
+    ) -> None:
+        """Task for storing streamed data in the measurement buffer
+
+        The task stops the measurement as soon as the buffer is full (i.e.
+        it reached the requested number of samples).
+
+        Args:
+
+            stream:
+
+                The stream that provides the measurement data
+
+            buffer:
+
+                The buffer that stores the measurement data
+
+        """
+
+        async for data, lost_messages in stream:
+            self._store(buffer, data, lost_messages)
+            if buffer.full():
+                self.stop_event.set()
+            if self.stop_event.is_set():
+                break
+
+    def _store(
+        self, buffer: MeasurementBuffer, data: StreamingData, lost: int
+    ) -> None:
+        """Store a streaming message in the measurement buffer
+
+        Args:
+
+            buffer:
+
+                The buffer that stores the measurement data
+
+            data:
+
+                The data of the streaming message
+
+            lost:
+
+                The number of messages lost right before the message
+
+        """
+
+        position = buffer.position
+        buffer.append(data, lost)
+        self.counters.add_message(
+            buffer.position - position, lost, data.timestamp
+        )
+        self.last_message = monotonic()
+
+    async def _emit(self, receive_task: Task[None], runtime: float) -> None:
+        """Emit measurement data in regular intervals
+
+        The intervals only depend on the update rates and not on the arrival
+        time of the streaming messages. The coroutine returns after the
+        measurement runtime or as soon as someone requests to stop the
+        measurement.
+
+        Args:
+
+            receive_task:
+
+                The task that stores the streaming data in the buffer
 
-            period = 1 / self.update_rate
-            collected_data = MeasurementData(configuration)
-            start = monotonic()
-            end = start + runtime
-            async for data, _ in stream:
-                collected_data.append(data)
-                current = monotonic()
-                if current - start >= period or current >= end:
-                    self.icosystem.emit(
-                        "sensor_node_measurement_data", collected_data
+            runtime:
+
+                The measurement runtime in seconds
+
+        """
+
+        period = 1 / self.update_rate
+        current = monotonic()
+        deadline = current + period
+        end = current + runtime
+        report = current + self.counter_interval
+        summary = current + self.statistics_interval
+        for queue in self.queues:
+            queue.deadline = current + queue.period()
+
+        while True:
+            wake = min([
+                deadline,
+                end,
+                *(
+                    queue.deadline
+                    for queue in self.queues
+                    if queue.update_rate
+                ),
+            ])
+            with suppress(TimeoutError):
+                await wait_for(self.stop_event.wait(), wake - monotonic())
+
+            if receive_task.done():
+                # Raise exceptions of the receive task (e.g. stream timeout)
+                receive_task.result()
+                break
+
+            if self.stop_event.is_set() or wake >= end:
+                break
+
+            current = monotonic()
+            if deadline <= current:
+                await self._wait_for_consumers()
+                self._emit_window()
+                deadline = next_deadline(deadline, period, current)
+
+            for queue in self.queues:
+                if queue.update_rate and queue.deadline <= current:
+                    self._emit_queue(queue)
+                    queue.deadline = next_deadline(
+                        queue.deadline, queue.period(), current
                     )
-                    if current >= end:
-                        self.icosystem.state = State.SENSOR_NODE_CONNECTED
-                        break
-                    start = current
-                    collected_data = MeasurementData(configuration)
+
+            if current >= report:
+                self._emit_counters()
+                report = next_deadline(report, self.counter_interval, current)
+
+            if current >= summary:
+                self._emit_statistics()
+                summary = next_deadline(
+                    summary, self.statistics_interval, current
+                )
+
+    async def _wait_for_consumers(self) -> None:
+        """Wait until all blocking consumers have space for a new window
+
+        Consumers with their own update rate never delay other consumers.
+        The coroutine also returns, if someone requests to stop the
+        measurement.
+
+        """
+
+        blocked = [
+            queue
+            for queue in self.queues
+            if queue.policy == OverflowPolicy.BLOCK
+            and not queue.update_rate
+            and queue.full()
+        ]
+        if not blocked:
+            return
+
+        space = gather(*(queue.wait_for_space() for queue in blocked))
+        stop = create_task(self.stop_event.wait())
+        waiters: set[Future[Any]] = {space, stop}
+        await wait(waiters, return_when=FIRST_COMPLETED)
+        space.cancel()
+        stop.cancel()
+        await gather(space, stop, return_exceptions=True)
+
+    def _emit_counters(self) -> None:
+        """Emit a snapshot of the measurement counters"""
+
+        self.counters.update_sample_rate()
+        if self.recorder is not None:
+            self.counters.recorded_samples = self.recorder.rows
+            self.counters.recording_lag = self.recorder.lag
+        self.icosystem.emit(
+            "sensor_node_measurement_counters", self.counters.copy()
+        )
+
+    def _emit_statistics(self) -> None:
+        """Emit a snapshot of the measurement statistics"""
+
+        if self.statistics is None:
+            return
+        self.icosystem.emit(
+            "sensor_node_measurement_statistics", self.statistics.snapshot()
+        )
+
+    def _emit_spectra(self) -> None:
+        """Emit the spectra the analyzer calculated since the last call"""
+
+        if self.analyzer is None:
+            return
+
+        for spectrum in self.analyzer.results():
+            self.icosystem.emit("sensor_node_spectrum", spectrum)
+
+    def _emit_triggers(self) -> None:
+        """Emit the triggered captures completed since the last call"""
+
+        if self.trigger is None:
+            return
+
+        for data in self.trigger.results():
+            self.icosystem.emit("sensor_node_trigger", data)
+
+    def _convert(self) -> None:
+        """Convert the values stored since the last call in place"""
+
+        buffer = self.buffer
+        assert isinstance(buffer, MeasurementBuffer)
+
+        if self.conversion is None or buffer.position <= self.converted:
+            return
+
+        # No consumer received these rows yet, which is why the buffer
+        # still stores them
+        values = buffer.data[self.converted - buffer.start : buffer.length]
+        self.conversion.apply(values, out=values)
+        self.converted = buffer.position
+
+    def _release(self) -> None:
+        """Allow the buffer to reuse the rows every consumer received"""
+
+        buffer = self.buffer
+        assert isinstance(buffer, MeasurementBuffer)
+        buffer.retained = min([
+            self.position,
+            *(queue.position for queue in self.queues if queue.update_rate),
+        ])
+
+    def _emit_window(self, final: bool = False) -> None:
+        """Emit the measurement data collected since the last emission
+
+        If the buffer did not receive any data since the last emission, then
+        this method emits the ``sensor_node_measurement_stalled`` event
+        instead, which contains the time in seconds since the last streaming
+        message arrived.
+
+        Args:
+
+            final:
+
+                Specifies if this is the last emission of the measurement,
+                which never emits the ``sensor_node_measurement_stalled``
+                event
+
+        """
+
+        buffer = self.buffer
+        assert isinstance(buffer, MeasurementBuffer)
+
+        self._convert()
+        if buffer.position <= self.position:
+            if final:
+                return
+            self.icosystem.emit(
+                "sensor_node_measurement_stalled",
+                monotonic() - self.last_message,
+            )
+            return
+
+        window = buffer.window(self.position, buffer.position)
+        self.position = buffer.position
+        self._release()
+        self.sequence += 1
+        window.sequence = self.sequence
+        self.gaps.add(window)
+        # Listeners might keep the data longer than the buffer stores it,
+        # hence we only hand out views on request
+        if self.grid is not None:
+            data = self.grid.add(window)
+            data.sequence = self.sequence
+        else:
+            data = window if self.zero_copy else window.copy()
+        start = perf_counter()
+        self.icosystem.emit("sensor_node_measurement_data", data)
+        self.counters.add_window(perf_counter() - start)
+        for queue in self.queues:
+            if not queue.update_rate:
+                queue.put(data)
+        if self.decimator is not None:
+            envelope = self.decimator.add(window)
+            if len(envelope) > 0:
+                envelope.sequence = self.sequence
+                self.icosystem.emit(
+                    "sensor_node_measurement_envelope", envelope
+                )
+        self._summarize(window)
+        workers = [
+            worker
+            for worker in (
+                self.recorder,
+                self.analyzer,
+                self.trigger,
+                self.history,
+            )
+            if worker is not None
+        ]
+        if workers:
+            # Background threads must not access the buffer and always
+            # receive the data without filled gaps
+            copy = (
+                window.copy()
+                if self.zero_copy or self.grid is not None
+                else data
+            )
+            for worker in workers:
+                worker.put(copy)
+        self._emit_spectra()
+        self._emit_triggers()
+
+    def _summarize(self, window: MeasurementWindow) -> None:
+        """Add measurement data to the pyramid and statistics
+
+        Args:
+
+            window:
+
+                The measurement data since the last update
+
+        """
+
+        if self.pyramid is not None:
+            self.pyramid.add(window)
+        if self.statistics is not None:
+            self.statistics.add(window)
+
+    def _emit_queue(self, queue: WindowQueue, final: bool = False) -> None:
+        """Send the data collected since the last update to a queue
+
+        Args:
+
+            queue:
+
+                A queue with its own update rate
+
+            final:
+
+                Specifies if this is the last update of the measurement
+
+        """
+
+        buffer = self.buffer
+        assert isinstance(buffer, MeasurementBuffer)
+
+        if buffer.position <= queue.position:
+            return
+        self._convert()
+        if not final and queue.policy == OverflowPolicy.BLOCK and queue.full():
+            # Keep the data in the buffer until the next update
+            return
+
+        # The window only contains the rows since the last update of the
+        # queue, independent of the data other consumers received
+        window = buffer.window(queue.position, buffer.position)
+        queue.position = buffer.position
+        self._release()
+        queue.sequence += 1
+        window.sequence = queue.sequence
+        queue.put(window if self.zero_copy else window.copy())
+        self.counters.add_window()
+
+
+# pylint: disable=too-many-public-methods
 
 
 class ICOsystem(AsyncIOEventEmitter):
@@ -140,6 +921,13 @@ class ICOsystem(AsyncIOEventEmitter):
 
             Positional arguments (handled by pyee)
 
+        connection:
+
+            The connection to the ICOtronic system. If you do not specify a
+            connection, then the system uses a CAN connection to the real
+            hardware. To use the system without hardware use a
+            :class:`icostate.simulation.SimulatedConnection`.
+
         **keyword_arguments:
 
             Keyword arguments (handled by pyee)
@@ -150,11 +938,17 @@ class ICOsystem(AsyncIOEventEmitter):
 
     """
 
-    def __init__(self, *arguments, **keyword_arguments):
+    def __init__(
+        self,
+        *arguments,
+        connection: Connection | None = None,
+        **keyword_arguments,
+    ):
         super().__init__(*arguments, **keyword_arguments)
 
         self.state = State.DISCONNECTED
-        self.connection = Connection()
+        self.logger = getLogger(__name__)
+        self.connection = Connection() if connection is None else connection
         self.stu: STU | None = None
         self.sensor_node_connection: AsyncSensorNodeManager | None = None
         self.sensor_node: SensorNode = None
@@ -164,6 +958,34 @@ class ICOsystem(AsyncIOEventEmitter):
         self.sensor_node_attributes: SensorNodeAttributes | None = None
         """Information about currently connected sensor node"""
 
+        self.sensors: dict[int, SensorCalibration] = {}
+        """Calibration of the sensors (key: sensor number), which
+        :meth:`get_conversion` uses for sensor nodes with a sensor
+        configuration"""
+        self.acceleration_range: float | None = None
+        """Range (maximum minus minimum) in multiples of g₀ of the
+        acceleration sensors of sensor nodes without sensor configuration
+        (e.g. 200 for a ±100 g₀ sensor), which :meth:`get_conversion`
+        requires for these sensor nodes"""
+        self.conversion: LinearConversion | None = None
+        """Conversion of the currently connected sensor node (cache of
+        :meth:`get_conversion`)"""
+        self.connect_latency: float | None = None
+        """Time in seconds the last connection to a sensor node took"""
+        self.attribute_cache = AttributeCache()
+        """Attributes of sensor nodes read before (key: MAC address)"""
+        self.idle_timeout = 0.0
+        """Time in seconds the system keeps the connection to a sensor node
+        open after an operation that connected to it (0: disconnect
+        immediately)"""
+        self.idle_connection: (
+            tuple[AsyncSensorNodeManager, SensorNode, SensorNodeAttributes]
+            | None
+        ) = None
+        """Connection kept open after the last operation"""
+        self.idle_task: Task[None] | None = None
+        """Task that closes the idle connection after the idle timeout"""
+
     def check_in_state(
         self, states: set[State], description: str, invert=False
     ) -> None:
@@ -281,6 +1103,7 @@ class ICOsystem(AsyncIOEventEmitter):
 
         self.check_in_state({State.STU_CONNECTED}, "Disconnecting from STU")
 
+        await self._take_idle_connection()
         await self.connection.__aexit__(None, None, None)
         self.state = State.DISCONNECTED
         self.stu = None
@@ -373,6 +1196,7 @@ class ICOsystem(AsyncIOEventEmitter):
 
         assert isinstance(self.stu, STU)
 
+        await self._take_idle_connection()
         await self.stu.reset()
 
         # Make sure that the STU is in the correct state after the reset,
@@ -432,6 +1256,8 @@ class ICOsystem(AsyncIOEventEmitter):
 
         assert isinstance(self.stu, STU)
 
+        # Sensor nodes connected to the STU do not advertise themselves
+        await self._take_idle_connection()
         return await self.stu.collect_sensor_nodes()
 
     async def connect_sensor_node_mac(self, mac_address: str) -> None:
@@ -443,6 +1269,13 @@ class ICOsystem(AsyncIOEventEmitter):
 
                 The MAC address of the sensor node
 
+        The coroutine requests the name and the ADC configuration of the
+        sensor node concurrently and uses the specified MAC address instead
+        of requesting it again. If the system kept the connection to the
+        sensor node open (see :attr:`idle_timeout`), then the coroutine
+        reuses this connection. Afterwards the attribute
+        :attr:`connect_latency` contains the time the connection took.
+
         Raises:
 
             ValueError:
@@ -507,18 +1340,45 @@ class ICOsystem(AsyncIOEventEmitter):
 
         assert isinstance(eui, EUI)
 
-        self.sensor_node_connection = self.stu.connect_sensor_node(eui)
-        assert isinstance(self.sensor_node_connection, AsyncSensorNodeManager)
-        # pylint: disable=unnecessary-dunder-call
-        self.sensor_node = await self.sensor_node_connection.__aenter__()
-        # pylint: enable=unnecessary-dunder-call
-        assert isinstance(self.sensor_node, SensorNode)
-
-        mac_address = await self.sensor_node.get_mac_address()
-        self.emit("sensor_node_mac_address", mac_address)
-        name = await self.sensor_node.get_name()
+        start = perf_counter()
+        idle_connection = await self._take_idle_connection(eui)
+        if idle_connection is None:
+            connection = self.stu.connect_sensor_node(eui)
+            assert isinstance(connection, AsyncSensorNodeManager)
+            # pylint: disable=unnecessary-dunder-call
+            sensor_node = await connection.__aenter__()
+            # pylint: enable=unnecessary-dunder-call
+            assert isinstance(sensor_node, SensorNode)
+
+            # The STU only connects to the node with the specified MAC
+            # address and the responses of different commands do not
+            # interfere, which means we can request the other attributes at
+            # the same time
+            mac_address = eui
+            try:
+                self.emit("sensor_node_mac_address", mac_address)
+                name, adc_configuration = await gather(
+                    sensor_node.get_name(),
+                    sensor_node.get_adc_configuration(),
+                )
+            except BaseException:
+                # Do not keep a half open connection, otherwise the STU
+                # stays connected to a sensor node we do not know about
+                # pylint: disable=unnecessary-dunder-call
+                await connection.__aexit__(None, None, None)
+                # pylint: enable=unnecessary-dunder-call
+                raise
+            self.sensor_node_connection = connection
+            self.sensor_node = sensor_node
+        else:
+            self.sensor_node_connection, self.sensor_node, attributes = (
+                idle_connection
+            )
+            mac_address = attributes.mac_address
+            self.emit("sensor_node_mac_address", mac_address)
+            name = attributes.name
+            adc_configuration = attributes.adc_configuration
         self.emit("sensor_node_name", name)
-        adc_configuration = await self.sensor_node.get_adc_configuration()
         self.emit("sensor_node_adc_configuration", adc_configuration)
 
         self.sensor_node_attributes = SensorNodeAttributes(
@@ -526,6 +1386,14 @@ class ICOsystem(AsyncIOEventEmitter):
             name=name,
             adc_configuration=adc_configuration,
         )
+        self.attribute_cache.update(self.sensor_node_attributes)
+        self.conversion = None
+        self.connect_latency = perf_counter() - start
+        self.logger.info(
+            "Connected to sensor node “%s” in %.3f seconds",
+            name,
+            self.connect_latency,
+        )
         self.state = State.SENSOR_NODE_CONNECTED
 
     async def disconnect_sensor_node(self) -> None:
@@ -551,6 +1419,7 @@ class ICOsystem(AsyncIOEventEmitter):
 
         self.sensor_node = None
         self.sensor_node_attributes = None
+        self.conversion = None
         self.state = State.STU_CONNECTED
 
     async def is_sensor_node_connected(self) -> bool:
@@ -595,6 +1464,11 @@ class ICOsystem(AsyncIOEventEmitter):
         if self.state == State.DISCONNECTED:
             return False
 
+        # The connection kept open after the last operation does not count,
+        # since the system is still in the state “STU Connected”
+        if self.state == State.STU_CONNECTED and self.idle_connection:
+            return False
+
         assert isinstance(self.stu, STU)
 
         return await self.stu.is_connected()
@@ -635,54 +1509,175 @@ class ICOsystem(AsyncIOEventEmitter):
 
         return disconnected_before
 
-    async def rename(
-        self, new_name: str, mac_address: str | None = None
-    ) -> str:
-        """Set the name of the sensor node with the specified MAC address
+    async def _release_sensor_node(self) -> None:
+        """Release a sensor node connected only for a single operation
 
-        Depending on the state the system is in this coroutine will **either**:
+        Depending on :attr:`idle_timeout` the coroutine either disconnects
+        from the sensor node or keeps the connection open for further
+        operations. In both cases the system is in the state
+        :attr:`State.STU_CONNECTED` afterwards.
 
-        1. connect to the sensor device with the given MAC address, if there
-           is no connection yet and disconnect afterwards or
-        2. just use the current connection and rename the current sensor
-           device. In this case the given MAC address will be ignored!
+        """
 
-        Args:
+        if self.idle_timeout <= 0:
+            await self.disconnect_sensor_node()
+            return
 
-            new_name:
+        assert isinstance(self.sensor_node, SensorNode)
+        assert isinstance(self.sensor_node_connection, AsyncSensorNodeManager)
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
 
-                The new name of the sensor device
+        self.idle_connection = (
+            self.sensor_node_connection,
+            self.sensor_node,
+            self.sensor_node_attributes,
+        )
+        self.idle_task = create_task(self._close_idle_connection())
+        self.idle_task.add_done_callback(self._idle_task_done)
+
+        self.sensor_node_connection = None
+        self.sensor_node = None
+        self.sensor_node_attributes = None
+        self.conversion = None
+        self.state = State.STU_CONNECTED
+
+    async def _take_idle_connection(
+        self, mac_address: EUI | None = None
+    ) -> (
+        tuple[AsyncSensorNodeManager, SensorNode, SensorNodeAttributes] | None
+    ):
+        """Remove the connection kept open after the last operation
+
+        Args:
 
             mac_address:
 
-                The MAC address of the sensor device that should be renamed
+                The MAC address of the sensor node the caller wants to use
 
         Returns:
 
-            The (old) name before it was changed to ``new_name``
+            The idle connection, if it is connected to the sensor node with
+            the specified MAC address or ``None`` otherwise. In the latter
+            case the coroutine closes the idle connection.
 
-        Raises:
+        """
 
-            NoResponseError: If there was no response to an request made by
-                             this coroutine
+        idle_connection = self.idle_connection
+        if idle_connection is None:
+            return None
 
-            ValueError: If you call this method without specifying the MAC
-                        address while the system is not connected to a sensor
-                        node
+        self.idle_connection = None
+        if self.idle_task is not None and self.idle_task is not current_task():
+            self.idle_task.cancel()
+        self.idle_task = None
 
-        Examples:
+        connection, _, attributes = idle_connection
+        if mac_address is not None and attributes.mac_address == mac_address:
+            return idle_connection
 
-            Import necessary code
+        await connection.__aexit__(None, None, None)
+        return None
 
-            >>> from asyncio import run
-            >>> from icostate.config import settings
+    async def _close_idle_connection(self) -> None:
+        """Close the idle connection after the idle timeout"""
 
-            Rename a disconnected sensor node
+        await sleep(self.idle_timeout)
+        await self._take_idle_connection()
 
-            >>> async def rename_disconnected(icosystem: ICOsystem,
-            ...                               mac_address: str,
-            ...                               name: str):
-            ...     await icosystem.connect_stu()
+    def _idle_task_done(self, task: Task[None]) -> None:
+        """Report errors of the task that closes the idle connection
+
+        Args:
+
+            task:
+
+                The finished task that closed the idle connection
+
+        """
+
+        if task.cancelled():
+            return
+
+        error = task.exception()
+        if error is not None:
+            self.logger.error("Closing idle connection failed: %s", error)
+
+    def _cached_attributes(
+        self, mac_address: str | None = None
+    ) -> SensorNodeAttributes | None:
+        """Get the cached attributes of a disconnected sensor node
+
+        Args:
+
+            mac_address:
+
+                The MAC address of the sensor node
+
+        Returns:
+
+            The attributes stored in :attr:`attribute_cache` or ``None``, if
+            the system is connected to a sensor node or the cache does not
+            contain the attributes of the sensor node
+
+        """
+
+        if self.state != State.STU_CONNECTED or mac_address is None:
+            return None
+
+        try:
+            return self.attribute_cache.get(EUI(mac_address))
+        except AddrFormatError:
+            return None
+
+    async def rename(
+        self, new_name: str, mac_address: str | None = None
+    ) -> str:
+        """Set the name of the sensor node with the specified MAC address
+
+        Depending on the state the system is in this coroutine will **either**:
+
+        1. connect to the sensor device with the given MAC address, if there
+           is no connection yet and disconnect afterwards (immediately or
+           after :attr:`idle_timeout`) or
+        2. just use the current connection and rename the current sensor
+           device. In this case the given MAC address will be ignored!
+
+        Args:
+
+            new_name:
+
+                The new name of the sensor device
+
+            mac_address:
+
+                The MAC address of the sensor device that should be renamed
+
+        Returns:
+
+            The (old) name before it was changed to ``new_name``
+
+        Raises:
+
+            NoResponseError: If there was no response to an request made by
+                             this coroutine
+
+            ValueError: If you call this method without specifying the MAC
+                        address while the system is not connected to a sensor
+                        node
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run
+            >>> from icostate.config import settings
+
+            Rename a disconnected sensor node
+
+            >>> async def rename_disconnected(icosystem: ICOsystem,
+            ...                               mac_address: str,
+            ...                               name: str):
+            ...     await icosystem.connect_stu()
             ...     print(f"Before renaming: {icosystem.state}")
             ...     await icosystem.rename(name, mac_address)
             ...     print(f"After renaming: {icosystem.state}")
@@ -748,10 +1743,11 @@ class ICOsystem(AsyncIOEventEmitter):
 
         await self.sensor_node.set_name(new_name)
         self.sensor_node_attributes.name = new_name
+        self.attribute_cache.update(self.sensor_node_attributes)
         self.emit("sensor_node_name", self.sensor_node_attributes.name)
 
         if disconnect_after:
-            await self.disconnect_sensor_node()
+            await self._release_sensor_node()
 
         return old_name
 
@@ -762,9 +1758,13 @@ class ICOsystem(AsyncIOEventEmitter):
 
         Depending on the state the system is in this coroutine will **either**:
 
-        1. connect to the sensor device with the given MAC address, if there
-           is no connection yet and disconnect afterwards or
-        2. just use the current connection and get the ADC configuration of
+        1. return the ADC configuration stored in :attr:`attribute_cache`,
+           if there is no connection yet and the cache contains the
+           configuration of the sensor device with the given MAC address,
+        2. connect to the sensor device with the given MAC address, if there
+           is no connection yet and disconnect afterwards (immediately or
+           after :attr:`idle_timeout`) or
+        3. just use the current connection and get the ADC configuration of
            the current sensor device. In this case the given MAC address will
            be ignored!
 
@@ -845,16 +1845,25 @@ class ICOsystem(AsyncIOEventEmitter):
             "Getting ADC configuration of sensor node",
         )
 
+        attributes = self._cached_attributes(mac_address)
+        if attributes is not None:
+            self.emit(
+                "sensor_node_adc_configuration", attributes.adc_configuration
+            )
+            return attributes.adc_configuration
+
         disconnect_after = await self._connect_sensor_node(mac_address)
 
         # Sensor node attributes should have been set at least once by
         # calling `connect_sensor_node_mac` either directly or indirectly.
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
         adc_configuration = await self.sensor_node.get_adc_configuration()
-        self.sensor_node.adc_configuration = adc_configuration
+        self.sensor_node_attributes.adc_configuration = adc_configuration
+        self.attribute_cache.update(self.sensor_node_attributes)
         self.emit("sensor_node_adc_configuration", adc_configuration)
 
         if disconnect_after:
-            await self.disconnect_sensor_node()
+            await self._release_sensor_node()
 
         return adc_configuration
 
@@ -862,24 +1871,40 @@ class ICOsystem(AsyncIOEventEmitter):
         self,
         adc_configuration: ADCConfiguration,
         mac_address: str | None = None,
+        force: bool = False,
     ) -> None:
         """Change the ADC configuration of a sensor node
 
         Depending on the state the system is in this coroutine will **either**:
 
         1. connect to the sensor device with the given MAC address, if there
-           is no connection yet and disconnect afterwards or
+           is no connection yet and disconnect afterwards (immediately or
+           after :attr:`idle_timeout`) or
         2. just use the current connection and change the ADC configuration of
            the current sensor device. In this case the given MAC address will
            be ignored!
 
+        If the sensor node already uses the given ADC configuration (read
+        while connecting or stored in :attr:`attribute_cache`), then the
+        coroutine neither changes the configuration nor emits the event
+        ``sensor_node_adc_configuration``.
+
         Args:
 
+            adc_configuration:
+
+                The new ADC configuration of the sensor device
+
             mac_address:
 
                 The MAC address of the sensor device for which we want to
                 change the ADC configuration
 
+            force:
+
+                Change the ADC configuration, even if the sensor node already
+                uses it
+
         Raises:
 
             NoResponseError: If there was no response to an request made by
@@ -944,17 +1969,42 @@ class ICOsystem(AsyncIOEventEmitter):
             "Setting ADC configuration of sensor node",
         )
 
+        attributes = self._cached_attributes(mac_address)
+        if (
+            not force
+            and attributes is not None
+            and attributes.adc_configuration == adc_configuration
+        ):
+            return
+
         disconnect_after = await self._connect_sensor_node(mac_address)
 
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
+        if (
+            not force
+            and self.sensor_node_attributes.adc_configuration
+            == adc_configuration
+        ):
+            if disconnect_after:
+                await self._release_sensor_node()
+            return
+
         await self.sensor_node.set_adc_configuration(**adc_configuration)
+        self.sensor_node_attributes.adc_configuration = adc_configuration
+        self.attribute_cache.update(self.sensor_node_attributes)
+        # The reference voltage might have changed
+        self.conversion = None
         self.emit("sensor_node_adc_configuration", adc_configuration)
 
         if disconnect_after:
-            await self.disconnect_sensor_node()
+            await self._release_sensor_node()
 
     async def get_sensor_configuration(self) -> SensorConfiguration:
         """Get the sensor numbers for the different measurement channels
 
+        The coroutine only requests the sensor configuration, if
+        :attr:`attribute_cache` does not contain it already.
+
         Raises:
 
             UnsupportedFeatureException: if the sensor node does not
@@ -988,21 +2038,28 @@ class ICOsystem(AsyncIOEventEmitter):
             {State.SENSOR_NODE_CONNECTED}, "Setting sensor configuration"
         )
 
-        assert isinstance(self.sensor_node, SensorNode)
-
-        return await self.sensor_node.get_sensor_configuration()
+        return await self._get_sensor_configuration()
 
     async def set_sensor_configuration(
-        self, sensors: SensorConfiguration
+        self, sensors: SensorConfiguration, force: bool = False
     ) -> None:
         """Change the sensor numbers for the different measurement channels
 
+        If :attr:`attribute_cache` shows that the sensor node already uses
+        the given sensor configuration, then the coroutine does not change
+        the configuration.
+
         Args:
 
             sensors:
 
                 The sensor numbers for the different measurement channels
 
+            force:
+
+                Change the sensor configuration, even if the sensor node
+                already uses it
+
         Raises:
 
             UnsupportedFeatureException: if the sensor node does not
@@ -1040,14 +2097,347 @@ class ICOsystem(AsyncIOEventEmitter):
         )
 
         assert isinstance(self.sensor_node, SensorNode)
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
+
+        current = self.attribute_cache.get_sensor_configuration(
+            self.sensor_node_attributes.mac_address
+        )
+        # The sensor number 0 keeps the current sensor of a channel
+        if (
+            not force
+            and current is not None
+            and all(
+                sensor in {0, current[channel]}
+                for channel, sensor in sensors.items()
+            )
+        ):
+            return
 
         await self.sensor_node.set_sensor_configuration(sensors)
+        self.attribute_cache.update_sensor_configuration(
+            self.sensor_node_attributes.mac_address, sensors
+        )
+        self.conversion = None
+
+    async def _get_sensor_configuration(self) -> SensorConfiguration:
+        """Get the sensor configuration of the connected sensor node
+
+        Returns:
+
+            The sensor configuration stored in :attr:`attribute_cache` or
+            the sensor configuration requested from the sensor node
+
+        """
+
+        assert isinstance(self.sensor_node, SensorNode)
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
+
+        mac_address = self.sensor_node_attributes.mac_address
+        sensor_configuration = self.attribute_cache.get_sensor_configuration(
+            mac_address
+        )
+        if sensor_configuration is None:
+            sensor_configuration = (
+                await self.sensor_node.get_sensor_configuration()
+            )
+            self.attribute_cache.update_sensor_configuration(
+                mac_address, sensor_configuration
+            )
+
+        return sensor_configuration
+
+    async def apply_profile(
+        self,
+        profile: SensorNodeProfile,
+        mac_addresses: Sequence[str] | None = None,
+    ) -> list[ProfileResult]:
+        """Apply a configuration profile to one or multiple sensor nodes
+
+        The coroutine connects to every sensor node once, reads the current
+        configuration, only changes the settings that differ from the
+        profile and reads them again to verify the change. An error of a
+        single sensor node (e.g. a sensor node that does not respond) does
+        not stop the coroutine from configuring the other sensor nodes.
+
+        Depending on the state the system is in this coroutine will **either**:
+
+        1. connect to the sensor devices with the given MAC addresses one
+           after another and disconnect afterwards (immediately or after
+           :attr:`idle_timeout`) or
+        2. just use the current connection and configure the current
+           sensor device. In this case the given MAC addresses will be
+           ignored!
+
+        Args:
+
+            profile:
+
+                The target configuration of the sensor nodes
+
+            mac_addresses:
+
+                The MAC addresses of the sensor nodes that should use the
+                profile
+
+        Returns:
+
+            The result of every sensor node (in the order of
+            ``mac_addresses``)
+
+        Raises:
+
+            ValueError:
+
+                If one of the MAC addresses is not valid, if you call
+                this method without specifying MAC addresses while the
+                system is not connected to a sensor node or if you apply a
+                profile containing a name to multiple sensor nodes
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run
+            >>> from icostate.config import settings
+
+            Apply a profile to a disconnected sensor node
+
+            >>> async def apply_profile(icosystem: ICOsystem,
+            ...                         profile: SensorNodeProfile,
+            ...                         mac_address: str):
+            ...     await icosystem.connect_stu()
+            ...     results = await icosystem.apply_profile(profile,
+            ...                                             [mac_address])
+            ...     await icosystem.disconnect_stu()
+            ...     return results
+            >>> config = ADCConfiguration(prescaler=2,
+            ...                           acquisition_time=8,
+            ...                           oversampling_rate=64)
+            >>> results = run(apply_profile(
+            ...     ICOsystem(), SensorNodeProfile(adc_configuration=config),
+            ...     settings.sensor_node.eui))
+            >>> results[0].verified
+            True
+
+        """
+
+        self.check_in_state(
+            {State.STU_CONNECTED, State.SENSOR_NODE_CONNECTED},
+            "Applying profile",
+        )
+
+        if self.state == State.SENSOR_NODE_CONNECTED:
+            assert isinstance(
+                self.sensor_node_attributes, SensorNodeAttributes
+            )
+            targets = [self.sensor_node_attributes.mac_address]
+        elif mac_addresses is None:
+            raise ValueError(
+                "MAC address is required for connecting to sensor node"
+            )
+        else:
+            try:
+                targets = [EUI(mac_address) for mac_address in mac_addresses]
+            except AddrFormatError as error:
+                raise ValueError(f"Invalid MAC address: {error}") from error
+
+        if profile.name is not None and len(targets) > 1:
+            raise ValueError(
+                "Applying the same name to multiple sensor nodes is not "
+                "supported"
+            )
+
+        results = []
+        for mac_address in targets:
+            result = ProfileResult(mac_address)
+            start = perf_counter()
+            disconnect_after = False
+            try:
+                disconnect_after = await self._connect_sensor_node(
+                    str(mac_address)
+                )
+                result.changed, result.verified = await self._apply_profile(
+                    profile
+                )
+            except (
+                CANConnectionError,
+                TimeoutError,
+                UnsupportedFeatureException,
+            ) as error:
+                result.error = error
+            finally:
+                if disconnect_after:
+                    await self._release_sensor_node()
+            result.duration = perf_counter() - start
+            results.append(result)
+
+        return results
+
+    async def _apply_profile(
+        self, profile: SensorNodeProfile
+    ) -> tuple[list[str], bool]:
+        """Apply a configuration profile to the connected sensor node
+
+        Args:
+
+            profile:
+
+                The target configuration of the sensor node
+
+        Returns:
+
+            The names of the changed settings and if all settings match the
+            profile after the change
+
+        """
+
+        assert isinstance(self.sensor_node, SensorNode)
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
+
+        sensor_node = self.sensor_node
+        attributes = self.sensor_node_attributes
+        sensor_configuration = None
+        if profile.sensor_configuration is not None:
+            sensor_configuration = await sensor_node.get_sensor_configuration()
+
+        changed = profile.differences(attributes, sensor_configuration)
+        if not changed:
+            return changed, True
+
+        # Setting the name requires multiple requests, hence we change the
+        # settings one after another
+        if "name" in changed:
+            assert profile.name is not None
+            await sensor_node.set_name(profile.name)
+        if "adc_configuration" in changed:
+            assert profile.adc_configuration is not None
+            await sensor_node.set_adc_configuration(
+                **profile.adc_configuration
+            )
+        if "sensor_configuration" in changed:
+            assert profile.sensor_configuration is not None
+            await sensor_node.set_sensor_configuration(
+                profile.sensor_configuration
+            )
+        readers = {
+            "name": sensor_node.get_name,
+            "adc_configuration": sensor_node.get_adc_configuration,
+            "sensor_configuration": sensor_node.get_sensor_configuration,
+        }
+        values = {name: await readers[name]() for name in changed}
+
+        attributes.name = values.get("name", attributes.name)
+        attributes.adc_configuration = values.get(
+            "adc_configuration", attributes.adc_configuration
+        )
+        sensor_configuration = values.get(
+            "sensor_configuration", sensor_configuration
+        )
+        self.attribute_cache.update(attributes)
+        if sensor_configuration is not None:
+            self.attribute_cache.update_sensor_configuration(
+                attributes.mac_address, sensor_configuration
+            )
+        if "name" in values:
+            self.emit("sensor_node_name", attributes.name)
+        if "adc_configuration" in values:
+            self.emit(
+                "sensor_node_adc_configuration", attributes.adc_configuration
+            )
+        if "adc_configuration" in values or "sensor_configuration" in values:
+            self.conversion = None
+
+        return changed, not profile.differences(
+            attributes, sensor_configuration
+        )
+
+    async def get_conversion(self) -> LinearConversion:
+        """Get the conversion of raw values into physical units
+
+        The coroutine derives the conversion from the ADC configuration
+        (reference voltage), the sensor configuration of the connected
+        sensor node and the calibration of the sensors (:attr:`sensors`).
+        It only requests the sensor configuration once and reuses the
+        result until the ADC or sensor configuration changes. If you change
+        :attr:`sensors`, then set :attr:`conversion` to ``None``.
+
+        Returns:
+
+            The conversion for the measurement channels of the connected
+            sensor node
+
+        Raises:
+
+            ValueError:
+
+                If the sensor node does not support a sensor configuration
+                and :attr:`acceleration_range` is not set
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run
+            >>> from icostate.config import settings
+
+            Get the conversion of a sensor node
+
+            >>> async def get_conversion(icosystem: ICOsystem,
+            ...                          mac_address: str):
+            ...     await icosystem.connect_stu()
+            ...     await icosystem.connect_sensor_node_mac(mac_address)
+            ...     conversion = await icosystem.get_conversion()
+            ...     cached = conversion is await icosystem.get_conversion()
+            ...     await icosystem.disconnect_sensor_node()
+            ...     await icosystem.disconnect_stu()
+            ...     return conversion, cached
+            >>> conversion, cached = run(get_conversion(
+            ...     ICOsystem(), settings.sensor_node.eui))
+            >>> cached
+            True
+
+        """
+
+        self.check_in_state(
+            {State.SENSOR_NODE_CONNECTED, State.MEASUREMENT},
+            "Getting conversion",
+        )
+
+        if self.conversion is not None:
+            return self.conversion
+
+        assert isinstance(self.sensor_node_attributes, SensorNodeAttributes)
+        sensor_configuration: SensorConfiguration | None = None
+        with suppress(UnsupportedFeatureException):
+            sensor_configuration = await self._get_sensor_configuration()
+        self.conversion = LinearConversion.create(
+            self.sensor_node_attributes.adc_configuration,
+            sensor_configuration,
+            self.sensors,
+            self.acceleration_range,
+        )
+
+        return self.conversion
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+    # pylint: disable=too-many-locals
 
     async def start_measurement(
         self,
         configuration: StreamingConfiguration,
         update_rate: float = 60,
         runtime: float = inf,
+        zero_copy: bool = False,
+        samples: int | None = None,
+        recorder: Recorder | None = None,
+        envelope_rate: float | None = None,
+        analyzer: SpectrumAnalyzer | None = None,
+        trigger: TriggeredCapture | None = None,
+        convert: bool = False,
+        fill: GapFill | None = None,
+        history: History | None = None,
+        pyramid_factors: Sequence[int] | None = None,
+        statistics_durations: Sequence[float] | None = None,
     ) -> None:
         """Start Measurement
 
@@ -1062,31 +2452,427 @@ class ICOsystem(AsyncIOEventEmitter):
 
                 The measurement update rate in Hz, i.e. how many times in
                 a second ``icosystem`` emits the
-                ``sensor_node_measurement_data`` event.
+                ``sensor_node_measurement_data`` event. A timer triggers
+                these updates independent of the arrival of streaming
+                messages. If there was no new data since the last update,
+                then ``icosystem`` emits the
+                ``sensor_node_measurement_stalled`` event instead.
 
             runtime:
 
                 The measurement runtime in seconds
 
+            zero_copy:
+
+                Specifies if the ``sensor_node_measurement_data`` event
+                should provide read only views into the measurement buffer
+                instead of copies of the measurement data. All listeners
+                share the same views. A view stays valid at least for the
+                buffer duration (``measurement.buffer_duration``) minus
+                two update periods. Afterwards the buffer recycles the
+                memory of the view. Use :meth:`MeasurementWindow.valid` to
+                check if a view is still valid and
+                :meth:`MeasurementWindow.copy` to keep the data for a longer
+                time.
+
+            samples:
+
+                The exact number of samples (per channel) the measurement
+                should collect. The measurement ends as soon as the sensor
+                node sent this amount of data, independent of the time
+                measured on the host. The argument ``runtime`` still
+                specifies the maximum runtime of the measurement. To convert
+                a runtime based on the clock of the sensor node into a
+                number of samples use the function
+                :func:`channel_sample_rate`.
+
+            recorder:
+
+                A recorder that stores the measurement data in an HDF5
+                file. The recorder writes the data in a separate thread,
+                which is why recording does not delay the measurement
+                updates. The ``sensor_node_measurement_counters`` event
+                contains the number of recorded samples and the time it
+                took the recorder to write the newest data.
+
+            envelope_rate:
+
+                If you specify this argument, then ``icosystem`` also emits
+                the event ``sensor_node_measurement_envelope`` with every
+                update. The event contains the minimum and maximum of
+                consecutive groups of samples (:class:`Envelope`), where the
+                number of groups per second and channel is about
+                ``envelope_rate``. This reduced data is usually sufficient
+                for plots and much smaller than the full measurement data,
+                which ``icosystem`` still provides to all other consumers.
+
+            analyzer:
+
+                A spectrum analyzer that calculates the power spectral
+                density and spectral features (e.g. band power and dominant
+                frequency) of overlapping windows of the measurement data in
+                a separate thread. ``icosystem`` emits the results with the
+                event ``sensor_node_spectrum``.
+
+            trigger:
+
+                A triggered capture that checks threshold or slope
+                conditions for the measurement data in a separate thread.
+                It keeps a constant amount of data before the trigger in
+                memory and combines it with the data after the trigger.
+                ``icosystem`` emits the result with the event
+                ``sensor_node_trigger`` and the triggered capture optionally
+                stores it in a capture directory.
+
+            convert:
+
+                Specifies if all consumers should receive values in
+                physical units (see :meth:`get_conversion`) instead of raw
+                ADC values. ``icosystem`` converts the data of every update
+                with a few NumPy operations before it emits, records or
+                analyzes the data.
+
+            fill:
+
+                If you specify this argument, then the
+                ``sensor_node_measurement_data`` event (and consumers
+                without their own update rate) provides uniformly sampled
+                data: one row for every sample, where ``fill`` specifies
+                how to fill the samples of lost messages (``NaN`` or linear
+                interpolation). The timestamps of the rows are based on
+                the sample index and sample rate instead of the arrival
+                time of the streaming messages.
+
+            history:
+
+                A history that keeps all data of the measurement with a
+                fixed memory budget. The history moves older data to a
+                capture on the disk and still provides arbitrary time
+                ranges of the whole measurement (:meth:`History.window`),
+                which is why even measurements that run for days do not
+                use more and more memory.
+
+            pyramid_factors:
+
+                If you specify this argument, then ``icosystem`` summarizes
+                the data of the measurement in a :class:`Pyramid`
+                (``measurement.pyramid``), which contains the minimum,
+                maximum and mean of groups of ``pyramid_factors`` samples
+                (e.g. :data:`icostate.pyramid.FACTORS`).
+
+            statistics_durations:
+
+                If you specify this argument, then ``icosystem`` calculates
+                running statistics (:class:`Statistics`) over sliding
+                windows with the given durations in seconds (``inf``: whole
+                measurement) and emits them with the event
+                ``sensor_node_measurement_statistics``.
+
+        Raises:
+
+            ValueError:
+
+                If the file of the recorder already exists or the envelope
+                rate is invalid
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run, sleep
+            >>> from icostate.buffer import (channel_sample_rate,
+            ...                              MeasurementWindow)
+            >>> from icostate.config import settings
+
+            Collect exactly one second of measurement data
+
+            >>> async def measure(icosystem: ICOsystem, mac_address: str):
+            ...     data = []
+            ...
+            ...     @icosystem.on("sensor_node_measurement_data")
+            ...     async def store(window: MeasurementWindow):
+            ...         data.append(window)
+            ...
+            ...     await icosystem.connect_stu()
+            ...     await icosystem.connect_sensor_node_mac(mac_address)
+            ...     configuration = StreamingConfiguration(first=True)
+            ...     adc_configuration = (
+            ...         await icosystem.get_adc_configuration())
+            ...     samples = round(channel_sample_rate(adc_configuration,
+            ...                                         configuration))
+            ...     await icosystem.start_measurement(configuration,
+            ...                                       samples=samples)
+            ...     while icosystem.state == State.MEASUREMENT:
+            ...         await sleep(0.1)
+            ...     await icosystem.disconnect_sensor_node()
+            ...     await icosystem.disconnect_stu()
+            ...     return sum(window.samples() for window in data), samples
+            >>> collected, samples = run(measure(ICOsystem(),
+            ...                                  settings.sensor_node.eui))
+            >>> collected == samples
+            True
+
         """
 
         self.check_in_state(
             {State.SENSOR_NODE_CONNECTED}, "Starting measurement"
         )
 
-        self.measurement.start(configuration, update_rate, runtime)
+        conversion = await self.get_conversion() if convert else None
+        await self.measurement.start(
+            configuration,
+            update_rate,
+            runtime,
+            zero_copy,
+            samples,
+            recorder,
+            envelope_rate=envelope_rate,
+            analyzer=analyzer,
+            trigger=trigger,
+            conversion=conversion,
+            fill=fill,
+            history=history,
+            pyramid_factors=pyramid_factors,
+            statistics_durations=statistics_durations,
+        )
 
         self.state = State.MEASUREMENT
 
-    async def stop_measurement(self) -> None:
-        """Stop measurement"""
+    # pylint: enable=too-many-locals
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    async def stop_measurement(self, timeout: float = 1) -> None:
+        """Stop measurement
+
+        Before the coroutine returns, ``icosystem`` emits the measurement
+        data collected since the last update (``sensor_node_measurement_data``
+        event) and closes the data stream of the sensor node. It also waits
+        until the recorder, analyzer, triggered capture and history processed
+        all data.
+
+        Args:
+
+            timeout:
+
+                The maximum amount of time in seconds the coroutine waits for
+                the data stream to close. After this time the coroutine
+                cancels the measurement, which discards the data collected
+                since the last update.
+
+        Raises:
+
+            Exception:
+
+                The exception that stopped the measurement, for example a
+                write error of the recorder
+
+        """
 
         self.check_in_state({State.MEASUREMENT}, "Stopping measurement")
 
-        self.measurement.stop()
+        try:
+            await self.measurement.stop(timeout)
+        finally:
+            self.state = State.SENSOR_NODE_CONNECTED
+
+    def get_measurement_counters(self) -> MeasurementCounters:
+        """Get the running counters of the current (or last) measurement
+
+        During a measurement ``icosystem`` also emits the counters regularly
+        (every ``measurement.counter_interval`` seconds) using the event
+        ``sensor_node_measurement_counters``.
+
+        Returns:
+
+            A snapshot of the measurement counters. The sample rate of the
+            snapshot is the rate of the last counters event.
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run, sleep
+            >>> from icostate.config import settings
+
+            Check the data loss of a measurement
+
+            >>> async def measure(icosystem: ICOsystem, mac_address: str):
+            ...     await icosystem.connect_stu()
+            ...     await icosystem.connect_sensor_node_mac(mac_address)
+            ...     await icosystem.start_measurement(
+            ...         StreamingConfiguration(first=True), runtime=1)
+            ...     while icosystem.state == State.MEASUREMENT:
+            ...         await sleep(0.1)
+            ...     counters = icosystem.get_measurement_counters()
+            ...     await icosystem.disconnect_sensor_node()
+            ...     await icosystem.disconnect_stu()
+            ...     return counters
+            >>> counters = run(measure(ICOsystem(), settings.sensor_node.eui))
+            >>> counters.messages > 0
+            True
+            >>> 0 <= counters.dataloss() <= 1
+            True
+
+        """
+
+        return self.measurement.counters.copy()
+
+    def get_measurement_statistics(self) -> dict[float, Statistics]:
+        """Get the running statistics of the current (or last) measurement
+
+        ``icosystem`` calculates the statistics (mean, variance, root mean
+        square, minimum, maximum and peak value) once for every measurement
+        update and every enabled channel. During a measurement ``icosystem``
+        also emits the statistics regularly (every
+        ``measurement.statistics_interval`` seconds) using the event
+        ``sensor_node_measurement_statistics``.
+
+        Returns:
+
+            A dictionary that maps the duration of every sliding window (see
+            the argument ``statistics_durations`` of
+            :meth:`start_measurement`) to its statistics. The duration
+            ``inf`` stands for the whole measurement. The dictionary is
+            empty, if the measurement does not calculate statistics.
+
+        """
+
+        if self.measurement.statistics is None:
+            return {}
+        return self.measurement.statistics.snapshot()
+
+    def measurement_windows(
+        self,
+        maxsize: int = 16,
+        policy: OverflowPolicy = OverflowPolicy.DROP_OLDEST,
+        update_rate: float | None = None,
+    ) -> AsyncIterator[MeasurementWindow]:
+        """Iterate over the measurement data of the current (or next)
+        measurement
+
+        In contrast to the event ``sensor_node_measurement_data`` the
+        consumer retrieves the data at its own pace. Every consumer gets its
+        own queue of measurement windows, starting with the first window
+        the consumer requests. The iterator ends after the measurement ended
+        and the consumer retrieved all windows.
+
+        Args:
+
+            maxsize:
+
+                The maximum number of windows stored for the consumer
+
+            policy:
+
+                Specifies what happens, if the consumer does not keep up
+                with the measurement and its queue is full:
+
+                - ``OverflowPolicy.DROP_OLDEST`` (default): Discard the
+                  oldest window of the queue.
+                - ``OverflowPolicy.BLOCK``: Delay the updates of the
+                  measurement (for all consumers), until the consumer
+                  retrieved a window. The measurement buffer stores the data
+                  in the meantime, which means it grows as long as the
+                  consumer does not retrieve any data. Consumers with their
+                  own update rate only delay their own updates.
+                - ``OverflowPolicy.COALESCE``: Add the data to the newest
+                  window of the queue.
+
+            update_rate:
+
+                The number of windows per second the consumer receives. All
+                consumers share the same data stream, but every consumer
+                with its own update rate receives windows that contain
+                exactly the data since its last update. If you do not
+                specify an update rate, then the consumer receives the same
+                windows as the ``sensor_node_measurement_data`` event.
+
+        Returns:
+
+            An asynchronous iterator over the windows of the measurement
+
+        Examples:
+
+            Import necessary code
+
+            >>> from asyncio import run
+            >>> from icostate.config import settings
+
+            Retrieve measurement data using an iterator
+
+            >>> async def measure(icosystem: ICOsystem, mac_address: str):
+            ...     await icosystem.connect_stu()
+            ...     await icosystem.connect_sensor_node_mac(mac_address)
+            ...     windows = icosystem.measurement_windows(maxsize=4)
+            ...     await icosystem.start_measurement(
+            ...         StreamingConfiguration(first=True), runtime=1)
+            ...     samples = 0
+            ...     async for window in windows:
+            ...         samples += window.samples()
+            ...     await icosystem.disconnect_sensor_node()
+            ...     await icosystem.disconnect_stu()
+            ...     return samples
+            >>> run(measure(ICOsystem(), settings.sensor_node.eui)) > 0
+            True
+
+        """
+
+        async def iterate() -> AsyncIterator[MeasurementWindow]:
+            # Only subscribe on the first iteration, since otherwise an
+            # unused iterator would collect (or block) measurement data
+            queue = self.measurement.subscribe(maxsize, policy, update_rate)
+            try:
+                async for window in queue:
+                    yield window
+            finally:
+                self.measurement.unsubscribe(queue)
+
+        return iterate()
+
+
+# pylint: enable=too-many-public-methods
+# pylint: enable=too-many-instance-attributes
+
+# -- Functions ----------------------------------------------------------------
+
+
+def next_deadline(deadline: float, period: float, current: float) -> float:
+    """Calculate the time of the next periodic update
+
+    Args:
+
+        deadline:
+
+            The time of the last update
+
+        period:
+
+            The time between two updates
+
+        current:
+
+            The current time
+
+    Returns:
+
+        The time of the next update. If the next update is more than one
+        period late, then the update happens now instead of catching up with
+        all missed updates.
+
+    Examples:
+
+        >>> next_deadline(deadline=1.0, period=0.5, current=1.2)
+        1.5
+        >>> next_deadline(deadline=1.0, period=0.5, current=3.2)
+        3.2
+
+    """
+
+    deadline += period
+    return current if deadline < current - period else deadline
 
-        self.state = State.SENSOR_NODE_CONNECTED
 
+# -- Main ---------------------------------------------------------------------
 
 if __name__ == "__main__":
     from doctest import testmod
@@ -0,0 +1,340 @@
+"""Reconstruct the timing of measurement data"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from enum import Enum
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import (
+    CHANNELS,
+    enabled_channels,
+    MeasurementWindow,
+    samples_per_message,
+)
+
+# -- Classes ------------------------------------------------------------------
+
+
+class GapFill(str, Enum):
+    """Specifies how a regular grid fills the samples of lost messages
+
+    Examples:
+
+        Get fill variants
+
+        >>> GapFill.NAN
+        <GapFill.NAN: 'NAN'>
+
+        >>> GapFill.INTERPOLATE
+        <GapFill.INTERPOLATE: 'INTERPOLATE'>
+
+    """
+
+    NAN = "NAN"
+    """Use the value ``NaN`` for every lost sample"""
+
+    INTERPOLATE = "INTERPOLATE"
+    """Interpolate linearly between the samples before and after the gap"""
+
+
+class GapIndex:
+    """Store the position and length of gaps in measurement data
+
+    The index only stores one row (index of the first lost sample, number
+    of lost samples) for every gap, no matter how many messages the gap
+    contains.
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Detect lost messages
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=12)
+        >>> for counter, lost in ((0, 0), (2, 1), (3, 0), (6, 2)):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter), lost)
+        >>> gaps = GapIndex()
+        >>> gaps.add(buffer.window(0, 7))
+        >>> gaps.add(buffer.window(7, 12))
+        >>> gaps.gaps
+        array([[ 3,  3],
+               [12,  6]])
+        >>> gaps.lost()
+        9
+
+    """
+
+    def __init__(self) -> None:
+
+        self.gaps = np.empty((0, 2), dtype=np.int64)
+        """Index of the first lost sample and number of lost samples of
+        every gap"""
+        self.next: int | None = None
+        """Index of the sample expected next"""
+
+    def __len__(self) -> int:
+        """Get the number of gaps
+
+        Returns:
+
+            The number of gaps in the measurement data
+
+        """
+
+        return len(self.gaps)
+
+    def add(self, window: MeasurementWindow) -> None:
+        """Add measurement data
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        """
+
+        indices = window.sample_indices
+        if len(indices) == 0:
+            return
+
+        expected = np.concatenate((
+            [indices[0] if self.next is None else self.next],
+            indices[:-1] + 1,
+        ))
+        missing = indices - expected
+        gaps = np.flatnonzero(missing > 0)
+        if len(gaps) > 0:
+            self.gaps = np.concatenate(
+                (self.gaps, np.column_stack((expected[gaps], missing[gaps])))
+            )
+        self.next = int(indices[-1]) + 1
+
+    def lost(self) -> int:
+        """Get the number of lost samples
+
+        Returns:
+
+            The number of samples (per channel) of all gaps
+
+        """
+
+        return int(self.gaps[:, 1].sum())
+
+
+# pylint: disable=too-few-public-methods
+
+
+class SampleClock:
+    """Calculate the time of samples based on their index
+
+    The timestamps of streaming messages contain the arrival time on the
+    host, which jitters and is the same for all samples of a message. Since
+    the sample index already accounts for lost messages (message counter),
+    the time of every sample follows from its index and the sample rate.
+
+    Args:
+
+        sample_rate:
+
+            The sample rate of a single channel in Hz
+
+        start:
+
+            The time of the sample with index 0 or ``None``, if the clock
+            should use the timestamp of the first data it receives
+
+    Examples:
+
+        >>> clock = SampleClock(sample_rate=4, start=10)
+        >>> clock.times(np.array([0, 1, 2, 6]))
+        array([10.  , 10.25, 10.5 , 11.5 ])
+
+    """
+
+    def __init__(self, sample_rate: float, start: float | None = None) -> None:
+
+        self.sample_rate = sample_rate
+        self.start = start
+
+    def times(
+        self, sample_indices: np.ndarray, timestamp: float | None = None
+    ) -> np.ndarray:
+        """Get the time of samples
+
+        Args:
+
+            sample_indices:
+
+                The indices of the samples
+
+            timestamp:
+
+                The timestamp of the first sample, which determines the
+                start time of the clock, if it is not known yet
+
+        Returns:
+
+            The time of every sample
+
+        """
+
+        if self.start is None and len(sample_indices) > 0:
+            self.start = (
+                0 if timestamp is None else timestamp
+            ) - sample_indices[0] / self.sample_rate
+
+        return (
+            0 if self.start is None else self.start
+        ) + sample_indices / self.sample_rate
+
+
+class RegularGrid:
+    """Convert measurement data into uniformly sampled data
+
+    The grid contains a row for every sample index, including the samples
+    of lost messages. The timestamps of the rows are based on the sample
+    index (see :class:`SampleClock`) and the message counters continue
+    regularly over gaps.
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        clock:
+
+            The clock that calculates the time of the samples
+
+        fill:
+
+            Specifies how to fill the samples of lost messages
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Fill the gap of a lost message
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=6)
+        >>> for counter, lost, values in ((0, 0, [1, 2, 3]),
+        ...                               (2, 1, [7, 8, 9])):
+        ...     buffer.append(StreamingData(values=values,
+        ...                                 counter=counter,
+        ...                                 timestamp=counter), lost)
+        >>> grid = RegularGrid(configuration,
+        ...                    SampleClock(sample_rate=3, start=0),
+        ...                    GapFill.INTERPOLATE)
+        >>> first = grid.add(buffer.window(0, 3))
+        >>> window = grid.add(buffer.window(3, 6))
+        >>> window.channel("first")
+        array([4., 5., 6., 7., 8., 9.])
+        >>> window.sample_indices
+        array([3, 4, 5, 6, 7, 8])
+        >>> window.timestamps
+        array([1.        , 1.33333333, 1.66666667, 2.        , 2.33333333,
+               2.66666667])
+        >>> window.counters
+        array([1, 1, 1, 2, 2, 2], dtype=uint8)
+
+    """
+
+    def __init__(
+        self,
+        configuration: StreamingConfiguration,
+        clock: SampleClock,
+        fill: GapFill = GapFill.NAN,
+    ) -> None:
+
+        self.configuration = configuration
+        self.clock = clock
+        self.fill = GapFill(fill)
+        self.channels = enabled_channels(configuration)
+        self.rows = samples_per_message(configuration)
+        self.next: int | None = None
+        """Index of the sample expected next"""
+        self.last = np.full(len(CHANNELS), np.nan)
+        """Values of the last sample"""
+
+    def add(self, window: MeasurementWindow) -> MeasurementWindow:
+        """Convert measurement data
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        Returns:
+
+            A new window that contains one row for every sample index
+            between the last sample added before and the last sample of
+            ``window``
+
+        """
+
+        indices = window.sample_indices
+        if len(indices) == 0:
+            return window.copy()
+
+        first = int(indices[0]) if self.next is None else self.next
+        grid = np.arange(first, int(indices[-1]) + 1, dtype=np.int64)
+        offsets = indices - first
+        values = np.full((len(grid), len(CHANNELS)), np.nan)
+        values[offsets] = window.data
+
+        if self.fill == GapFill.INTERPOLATE and len(grid) > len(indices):
+            missing = np.ones(len(grid), dtype=bool)
+            missing[offsets] = False
+            known = indices
+            known_values = window.data
+            if self.next is not None:
+                # Interpolate between the last sample added before and
+                # the first sample of the window
+                known = np.concatenate(([first - 1], indices))
+                known_values = np.concatenate(([self.last], known_values))
+            for channel in self.channels:
+                values[missing, channel] = np.interp(
+                    grid[missing], known, known_values[:, channel]
+                )
+
+        messages = grid // self.rows - indices[0] // self.rows
+        counters = (int(window.counters[0]) + messages) % 256
+
+        self.next = int(indices[-1]) + 1
+        self.last = window.data[-1].copy()
+
+        return MeasurementWindow(
+            self.configuration,
+            values,
+            grid,
+            self.clock.times(grid, float(window.timestamps[0])),
+            counters.astype(np.uint8),
+            window.position,
+        )
+
+
+# pylint: enable=too-few-public-methods
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,634 @@
+"""Capture measurement data around events"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from collections import deque
+from collections.abc import Sequence
+from enum import Enum
+from pathlib import Path
+
+import numpy as np
+
+from icotronic.can.streaming import StreamingConfiguration
+
+from icostate.buffer import (
+    channel_sample_rate,
+    CHANNELS,
+    combine,
+    MeasurementWindow,
+    slice_window,
+)
+from icostate.capture import CAPTURE_SUFFIX, CaptureWriter
+from icostate.sensor import SensorNodeAttributes
+from icostate.worker import BackgroundWorker
+
+# -- Classes ------------------------------------------------------------------
+
+
+class TriggerKind(str, Enum):
+    """Specifies which change of the measurement data fires a trigger
+
+    Examples:
+
+        Get trigger kinds
+
+        >>> TriggerKind.RISING
+        <TriggerKind.RISING: 'RISING'>
+
+        >>> TriggerKind.SLOPE
+        <TriggerKind.SLOPE: 'SLOPE'>
+
+    """
+
+    RISING = "RISING"
+    """The value reaches the level coming from below"""
+
+    FALLING = "FALLING"
+    """The value reaches the level coming from above"""
+
+    SLOPE = "SLOPE"
+    """The absolute difference between two consecutive values reaches the
+    level"""
+
+
+# pylint: disable=too-few-public-methods
+
+
+class TriggerCondition:
+    """Condition that starts a triggered capture
+
+    Args:
+
+        channel:
+
+            The name of the channel (``first``, ``second`` or ``third``)
+            the condition checks
+
+        kind:
+
+            The change of the values that fires the trigger
+
+        level:
+
+            The threshold (``RISING``, ``FALLING``) or the minimum absolute
+            difference between two consecutive samples (``SLOPE``) in the
+            unit of the measurement values
+
+    Raises:
+
+        ValueError:
+
+            If the channel does not exist
+
+    Examples:
+
+        Create values for the first channel
+
+        >>> values = np.full((4, 3), np.nan)
+        >>> values[:, 0] = [5, 12, 8, 11]
+        >>> previous = np.array([15, np.nan, np.nan])
+
+        Find the samples that reach a value of 10 coming from below
+
+        >>> condition = TriggerCondition("first", TriggerKind.RISING, 10)
+        >>> condition.evaluate(values, previous)
+        array([False,  True, False,  True])
+
+        Find large jumps between consecutive samples
+
+        >>> condition = TriggerCondition("first", TriggerKind.SLOPE, 5)
+        >>> condition.evaluate(values, previous)
+        array([ True,  True, False, False])
+
+    """
+
+    def __init__(
+        self,
+        channel: str = "first",
+        kind: TriggerKind = TriggerKind.RISING,
+        level: float = 0,
+    ) -> None:
+
+        if channel not in CHANNELS:
+            raise ValueError(f"Unknown channel: “{channel}”")
+
+        self.channel = channel
+        self.kind = TriggerKind(kind)
+        self.level = level
+
+    def __repr__(self) -> str:
+        """Get the textual representation of the condition
+
+        Returns:
+
+            A string that describes the condition
+
+        Examples:
+
+            >>> TriggerCondition("second", TriggerKind.FALLING, -3)
+            Second channel FALLING -3
+
+        """
+
+        channel = self.channel.capitalize()
+        return f"{channel} channel {self.kind.value} {self.level}"
+
+    def evaluate(self, values: np.ndarray, previous: np.ndarray) -> np.ndarray:
+        """Check the condition for every sample
+
+        Args:
+
+            values:
+
+                The values of the measurement channels (one row per sample,
+                one column for each channel)
+
+            previous:
+
+                The values of the sample before the first row of ``values``
+                (``NaN``: unknown)
+
+        Returns:
+
+            A boolean array that specifies for every sample, if it fires
+            the trigger
+
+        """
+
+        column = CHANNELS.index(self.channel)
+        current = values[:, column]
+        before = np.concatenate(([previous[column]], current[:-1]))
+
+        if self.kind == TriggerKind.RISING:
+            return (before < self.level) & (current >= self.level)
+        if self.kind == TriggerKind.FALLING:
+            return (before > self.level) & (current <= self.level)
+        return np.abs(current - before) >= self.level
+
+
+class TriggeredData:
+    """Measurement data around a trigger event
+
+    Args:
+
+        window:
+
+            The measurement data before and after the trigger
+
+        timestamp:
+
+            The timestamp of the sample that fired the trigger
+
+        condition:
+
+            The condition that fired the trigger
+
+        path:
+
+            The path of the capture that stores the data or ``None``, if the
+            data was not stored
+
+    """
+
+    def __init__(
+        self,
+        window: MeasurementWindow,
+        timestamp: float,
+        condition: TriggerCondition,
+        path: Path | None = None,
+    ) -> None:
+
+        self.window = window
+        self.timestamp = timestamp
+        self.condition = condition
+        self.path = path
+
+
+# pylint: enable=too-few-public-methods
+
+# pylint: disable=too-many-instance-attributes
+
+
+class RingBuffer:
+    """Keep the latest rows of measurement data in preallocated storage
+
+    Args:
+
+        configuration:
+
+            The streaming configuration of the measurement
+
+        capacity:
+
+            The number of rows the buffer stores
+
+    Examples:
+
+        Import necessary code
+
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Keep the last 4 samples
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> buffer = MeasurementBuffer(configuration, capacity=9)
+        >>> for counter in range(3):
+        ...     buffer.append(StreamingData(values=[3 * counter,
+        ...                                         3 * counter + 1,
+        ...                                         3 * counter + 2],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+        >>> ring = RingBuffer(configuration, capacity=4)
+        >>> ring.extend(buffer.window(0, 5))
+        >>> ring.extend(buffer.window(5, 7))
+        >>> ring.window().channel("first")
+        array([3., 4., 5., 6.])
+
+    """
+
+    def __init__(
+        self, configuration: StreamingConfiguration, capacity: int
+    ) -> None:
+
+        self.configuration = configuration
+        self.capacity = capacity
+        self.values = np.full((capacity, len(CHANNELS)), np.nan)
+        self.sample_indices = np.zeros(capacity, dtype=np.int64)
+        self.timestamps = np.zeros(capacity)
+        self.counters = np.zeros(capacity, dtype=np.uint8)
+        self.end = 0
+        """Index of the row after the latest row"""
+        self.length = 0
+        """Number of used rows"""
+
+    def extend(self, window: MeasurementWindow) -> None:
+        """Add measurement data
+
+        Args:
+
+            window:
+
+                The measurement data that follows the data added before
+
+        """
+
+        added = min(window.samples(), self.capacity)
+        if added == 0:
+            return
+
+        indices = (self.end + np.arange(added)) % self.capacity
+        self.values[indices] = window.data[-added:]
+        self.sample_indices[indices] = window.sample_indices[-added:]
+        self.timestamps[indices] = window.timestamps[-added:]
+        self.counters[indices] = window.counters[-added:]
+        self.end = (self.end + added) % self.capacity
+        self.length = min(self.length + added, self.capacity)
+
+    def window(self) -> MeasurementWindow:
+        """Get the stored data
+
+        Returns:
+
+            A copy of the stored rows in chronological order
+
+        """
+
+        indices = (self.end - self.length + np.arange(self.length)) % max(
+            self.capacity, 1
+        )
+
+        return MeasurementWindow(
+            self.configuration,
+            self.values[indices],
+            self.sample_indices[indices],
+            self.timestamps[indices],
+            self.counters[indices],
+        )
+
+
+class TriggeredCapture(BackgroundWorker):
+    """Capture measurement data around trigger events in a background thread
+
+    The capture keeps the latest data in a ring buffer of constant size.
+    The background thread checks the trigger conditions for all samples of
+    a window at once. If one of the conditions fires, then it combines the
+    data of the ring buffer (pre-trigger) with the following data
+    (post-trigger) into a single window. The memory usage therefore stays
+    constant, no matter how long the measurement runs. While collecting the
+    post-trigger data the capture ignores further events.
+
+    Args:
+
+        conditions:
+
+            The conditions that fire a trigger
+
+        pre_trigger:
+
+            The duration in seconds of the data before the trigger
+
+        post_trigger:
+
+            The duration in seconds of the data after the trigger (including
+            the sample that fired the trigger)
+
+        directory:
+
+            The directory, which stores every triggered capture (see
+            :class:`icostate.capture.Capture`) or ``None``, if the data
+            should not be stored
+
+        maxsize:
+
+            The maximum number of measurement windows waiting for the
+            background thread
+
+    Raises:
+
+        ValueError:
+
+            If one of the arguments is invalid
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from tempfile import TemporaryDirectory
+        >>> from netaddr import EUI
+        >>> from icotronic.can.adc import ADCConfiguration
+        >>> from icotronic.can.streaming import StreamingData
+        >>> from icostate.buffer import MeasurementBuffer
+        >>> from icostate.capture import Capture
+
+        Create measurement data containing a single peak
+
+        >>> configuration = StreamingConfiguration(first=True)
+        >>> adc_configuration = ADCConfiguration(prescaler=2,
+        ...                                      acquisition_time=8,
+        ...                                      oversampling_rate=64)
+        >>> attributes = SensorNodeAttributes("Test-STH",
+        ...                                   EUI("08-6B-D7-01-DE-81"),
+        ...                                   adc_configuration)
+        >>> sample_rate = channel_sample_rate(adc_configuration,
+        ...                                   configuration)
+        >>> values = np.zeros(3000)
+        >>> values[2000:2010] = 100
+        >>> buffer = MeasurementBuffer(configuration, capacity=3000)
+        >>> for counter, part in enumerate(values.reshape(-1, 3)):
+        ...     buffer.append(StreamingData(values=list(part),
+        ...                                 counter=counter % 256,
+        ...                                 timestamp=counter))
+
+        Store 100 samples before and 200 samples after the peak
+
+        >>> async def capture(trigger: TriggeredCapture):
+        ...     trigger.start(configuration, attributes)
+        ...     for start in range(0, 3000, 500):
+        ...         trigger.put(buffer.window(start, start + 500).copy())
+        ...     await trigger.stop()
+        ...     return trigger.results()
+        >>> with TemporaryDirectory() as directory:
+        ...     trigger = TriggeredCapture(
+        ...         [TriggerCondition("first", TriggerKind.RISING, 50)],
+        ...         pre_trigger=100 / sample_rate,
+        ...         post_trigger=200 / sample_rate,
+        ...         directory=directory)
+        ...     captured = run(capture(trigger))
+        ...     with Capture(captured[0].path) as stored:
+        ...         print(len(stored))
+        300
+        >>> len(captured)
+        1
+        >>> data = captured[0]
+        >>> data.window.samples(), int(data.window.sample_indices[0])
+        (300, 1900)
+        >>> float(data.window.channel("first")[100])
+        100.0
+
+    """
+
+    # pylint: disable=too-many-arguments,too-many-positional-arguments
+
+    def __init__(
+        self,
+        conditions: Sequence[TriggerCondition],
+        pre_trigger: float = 1,
+        post_trigger: float = 1,
+        directory: Path | str | None = None,
+        maxsize: int = 256,
+    ) -> None:
+
+        if not conditions:
+            raise ValueError("Triggered capture requires a condition")
+        if pre_trigger < 0:
+            raise ValueError(f"Invalid pre-trigger duration: {pre_trigger}")
+        if post_trigger <= 0:
+            raise ValueError(f"Invalid post-trigger duration: {post_trigger}")
+
+        super().__init__("icostate-trigger", maxsize)
+        self.conditions = list(conditions)
+        self.pre_trigger = pre_trigger
+        self.post_trigger = post_trigger
+        self.directory = None if directory is None else Path(directory)
+        self.captures: deque[TriggeredData] = deque()
+        """Triggered captures not retrieved yet"""
+        self.triggers = 0
+        """Number of triggers since the start of the measurement"""
+        self.configuration = StreamingConfiguration()
+        """Streaming configuration of the measurement"""
+        self.attributes: SensorNodeAttributes | None = None
+        """Information about the sensor node"""
+        self.ring = RingBuffer(self.configuration, 0)
+        """Data before the current sample"""
+
+    # pylint: enable=too-many-arguments,too-many-positional-arguments
+
+    def start(
+        self,
+        configuration: StreamingConfiguration,
+        attributes: SensorNodeAttributes,
+    ) -> None:
+        """Start the background thread
+
+        Args:
+
+            configuration:
+
+                The streaming configuration of the measurement
+
+            attributes:
+
+                Information about the sensor node, which includes the ADC
+                configuration that determines the sample rate
+
+        """
+
+        sample_rate = channel_sample_rate(
+            attributes.adc_configuration, configuration
+        )
+        self.configuration = configuration
+        self.attributes = attributes
+        self.ring = RingBuffer(
+            configuration, round(self.pre_trigger * sample_rate)
+        )
+        self.captures.clear()
+        self.triggers = 0
+        if self.directory is not None:
+            self.directory.mkdir(parents=True, exist_ok=True)
+        self._start()
+
+    def results(self) -> list[TriggeredData]:
+        """Retrieve the captures completed since the last call
+
+        Returns:
+
+            The new captures in chronological order
+
+        """
+
+        captures = []
+        while self.captures:
+            captures.append(self.captures.popleft())
+
+        return captures
+
+    def _work(self) -> None:
+        """Check the trigger conditions (background thread)"""
+
+        assert isinstance(self.attributes, SensorNodeAttributes)
+        post_samples = max(
+            round(
+                self.post_trigger
+                * channel_sample_rate(
+                    self.attributes.adc_configuration, self.configuration
+                )
+            ),
+            1,
+        )
+        previous = np.full(len(CHANNELS), np.nan)
+        pending: list[MeasurementWindow] = []
+        remaining = 0
+        fired: tuple[float, TriggerCondition] | None = None
+
+        while (item := self.queue.get()) is not None:
+            _, window = item
+            start = 0
+            samples = window.samples()
+            while start < samples:
+                if fired is not None:
+                    part = slice_window(window, start, start + remaining)
+                    pending.append(part)
+                    self.ring.extend(part)
+                    remaining -= part.samples()
+                    start += part.samples()
+                    if remaining == 0:
+                        self._complete(pending, *fired)
+                        pending = []
+                        fired = None
+                    continue
+
+                part = slice_window(window, start, samples)
+                before = previous if start == 0 else window.data[start - 1]
+                index, condition = self._find(part, before)
+                if condition is None:
+                    self.ring.extend(part)
+                    break
+
+                self.ring.extend(slice_window(part, 0, index))
+                pending = [self.ring.window()]
+                fired = (float(part.timestamps[index]), condition)
+                remaining = post_samples
+                start += index
+
+            if samples > 0:
+                previous = window.data[-1]
+
+        if fired is not None:
+            # Keep the data of a trigger shortly before the end of the
+            # measurement, even if the post-trigger data is incomplete
+            self._complete(pending, *fired)
+
+    def _find(
+        self, window: MeasurementWindow, previous: np.ndarray
+    ) -> tuple[int, TriggerCondition | None]:
+        """Find the first sample that fires a trigger
+
+        Args:
+
+            window:
+
+                The measurement data that should be checked
+
+            previous:
+
+                The values of the sample before the data
+
+        Returns:
+
+            The index of the sample that fired the trigger and the
+            corresponding condition or ``None``, if no condition fired
+
+        """
+
+        first = window.samples()
+        fired = None
+        for condition in self.conditions:
+            hits = np.flatnonzero(
+                condition.evaluate(window.data[:first], previous)
+            )
+            if len(hits) > 0:
+                first = int(hits[0])
+                fired = condition
+
+        return first, fired
+
+    def _complete(
+        self,
+        windows: list[MeasurementWindow],
+        timestamp: float,
+        condition: TriggerCondition,
+    ) -> None:
+        """Store the data of a trigger event
+
+        Args:
+
+            windows:
+
+                The pre-trigger and post-trigger data
+
+            timestamp:
+
+                The timestamp of the sample that fired the trigger
+
+            condition:
+
+                The condition that fired the trigger
+
+        """
+
+        window = combine(self.configuration, windows)
+        self.triggers += 1
+        path = None
+        if self.directory is not None:
+            path = self.directory / f"trigger-{self.triggers:04}"
+            path = path.with_suffix(CAPTURE_SUFFIX)
+            with CaptureWriter(
+                path, self.configuration, self.attributes
+            ) as writer:
+                writer.append([window])
+
+        self.captures.append(TriggeredData(window, timestamp, condition, path))
+
+
+# pylint: enable=too-many-instance-attributes
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
@@ -0,0 +1,195 @@
+"""Process measurement data in a background thread"""
+
+# -- Imports ------------------------------------------------------------------
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from asyncio import to_thread
+from collections import deque
+from logging import getLogger
+from queue import Full, Queue
+from threading import Thread
+from time import monotonic
+
+from icostate.buffer import MeasurementWindow
+
+# -- Attributes ---------------------------------------------------------------
+
+BACKLOG_ROWS = 2**16
+"""Maximum number of rows the worker combines into one entry of the backlog"""
+
+# -- Classes ------------------------------------------------------------------
+
+
+class BackgroundWorker(ABC):
+    """Hand over measurement data to a background thread
+
+    The event loop only adds measurement windows to a bounded queue. If the
+    queue is full, then the worker combines new windows in a backlog until
+    the queue has space again. Every entry of the backlog contains up to
+    :data:`BACKLOG_ROWS` rows, which is why a slow background thread does
+    not create one entry per window. Adding data therefore never blocks the
+    event loop and never drops data. Subclasses implement the processing of
+    the queue in the method ``_work``.
+
+    Args:
+
+        name:
+
+            The name of the background thread
+
+        maxsize:
+
+            The maximum number of windows waiting for the background thread
+
+    Examples:
+
+        Import necessary code
+
+        >>> from asyncio import run
+        >>> from icotronic.can.streaming import (StreamingConfiguration,
+        ...                                      StreamingData)
+        >>> from icostate.buffer import MeasurementBuffer
+
+        Count the samples of all windows
+
+        >>> class Counter(BackgroundWorker):
+        ...     samples = 0
+        ...     def _work(self):
+        ...         while (item := self.queue.get()) is not None:
+        ...             self.samples += item[1].samples()
+
+        >>> buffer = MeasurementBuffer(StreamingConfiguration(first=True),
+        ...                            capacity=30)
+        >>> for counter in range(10):
+        ...     buffer.append(StreamingData(values=[1, 2, 3],
+        ...                                 counter=counter,
+        ...                                 timestamp=counter))
+
+        Windows that do not fit into the queue wait in the backlog
+
+        >>> counter = Counter("counter", maxsize=2)
+        >>> for start in range(0, 30, 3):
+        ...     counter.put(buffer.window(start, start + 3).copy())
+        >>> [window.samples() for _, window in counter.backlog]
+        [24]
+        >>> async def count(counter: Counter):
+        ...     counter._start()
+        ...     await counter.stop()
+        ...     return counter.samples
+        >>> run(count(counter))
+        30
+
+    """
+
+    def __init__(self, name: str, maxsize: int = 256) -> None:
+
+        self.name = name
+        self.queue: Queue[tuple[float, MeasurementWindow] | None] = Queue(
+            maxsize
+        )
+        self.logger = getLogger(__name__)
+        self.thread: Thread | None = None
+        self.backlog: deque[tuple[float, MeasurementWindow]] = deque()
+        """Data (and the time its oldest part was added) waiting for space in
+        the queue"""
+        self.error: Exception | None = None
+        """Exception that stopped the background thread"""
+
+    def put(self, window: MeasurementWindow) -> None:
+        """Add measurement data to the queue of the background thread
+
+        The method never blocks. If the queue is full, then the method adds
+        the data to the newest entry of the backlog. Since the background
+        thread accesses the data of the window later, the window must not be
+        a view into the measurement buffer.
+
+        Args:
+
+            window:
+
+                The measurement data that should be processed
+
+        """
+
+        if self.error is not None:
+            return
+
+        backlog = self.backlog
+        if backlog and backlog[-1][1].samples() < BACKLOG_ROWS:
+            added, newest = backlog.pop()
+            backlog.append((added, newest.merge(window)))
+        else:
+            backlog.append((monotonic(), window))
+        try:
+            while backlog:
+                self.queue.put_nowait(backlog[0])
+                backlog.popleft()
+        except Full:
+            pass
+
+    async def stop(self) -> None:
+        """Process the remaining data and stop the background thread
+
+        Raises:
+
+            Exception:
+
+                The exception that stopped the background thread, if
+                processing the data failed
+
+        """
+
+        if self.thread is None:
+            return
+
+        await to_thread(self._finish)
+        self.thread = None
+
+        if self.error is not None:
+            raise self.error
+
+    def _start(self) -> None:
+        """Start the background thread"""
+
+        self.error = None
+        self.thread = Thread(target=self._run, name=self.name, daemon=True)
+        self.thread.start()
+
+    def _finish(self) -> None:
+        """Hand over the remaining data and wait for the background thread"""
+
+        assert isinstance(self.thread, Thread)
+
+        while self.backlog:
+            item = self.backlog.popleft()
+            if self.error is None:
+                self.queue.put(item)
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self) -> None:
+        """Process the data of the queue (background thread)"""
+
+        try:
+            self._work()
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            self.logger.exception("Background thread “%s” failed", self.name)
+            self.error = error
+            # Do not block the event loop, if it waits for space in the queue
+            while True:
+                if self.queue.get() is None:
+                    break
+
+    @abstractmethod
+    def _work(self) -> None:
+        """Process the data of the queue until it contains ``None``"""
+
+
+# -- Main ---------------------------------------------------------------------
+
+if __name__ == "__main__":
+    from doctest import testmod
+
+    testmod()
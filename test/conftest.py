@@ -5,8 +5,22 @@
 from icotronic.can import Connection
 from pytest import fixture
 
+from icostate.simulation import SimulatedConnection
 from icostate.system import ICOsystem
 
+# -- Functions ----------------------------------------------------------------
+
+
+def pytest_addoption(parser):
+    """Add command line options for pytest"""
+
+    parser.addoption(
+        "--simulation",
+        action="store_true",
+        help="use simulated ICOtronic system instead of hardware",
+    )
+
+
 # -- Fixtures -----------------------------------------------------------------
 
 # pylint: disable=redefined-outer-name
@@ -19,6 +33,16 @@ def anyio_backend():
     return "asyncio"
 
 
+@fixture(scope="session")
+def connection_class(request):
+    """Returns the class used to connect to the ICOtronic system"""
+
+    if request.config.getoption("--simulation"):
+        return SimulatedConnection
+
+    return Connection
+
+
 @fixture(scope="session")
 def sensor_node_name():
     """Returns the name of the sensor node used for the test"""
@@ -27,18 +51,18 @@ def sensor_node_name():
 
 
 @fixture(scope="session")
-async def sensor_node_mac_address(sensor_node_name):
+async def sensor_node_mac_address(connection_class, sensor_node_name):
     """Return the MAC address of the sensor node used for the test"""
 
-    async with Connection() as stu:
+    async with connection_class() as stu:
         async with stu.connect_sensor_node(sensor_node_name) as sensor_node:
             return await sensor_node.get_mac_address()
 
 
 @fixture
-async def connect_stu():
+async def connect_stu(connection_class):
     """Connect to and disconnect from STU"""
-    icosystem = ICOsystem()
+    icosystem = ICOsystem(connection=connection_class())
 
     await icosystem.connect_stu()
     yield icosystem
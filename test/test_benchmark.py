@@ -0,0 +1,83 @@
+"""Tests for the benchmark of the measurement pipeline"""
+
+# -- Imports ------------------------------------------------------------------
+
+import json
+import sys
+
+from icotronic.can import StreamingConfiguration
+from pytest import mark
+
+from icostate.benchmark import compare, main, measure, METRICS, SCENARIOS
+
+# -- Functions ----------------------------------------------------------------
+
+
+@mark.anyio
+async def test_measure():
+    """Test measuring the performance of a single measurement"""
+
+    results = await measure(
+        StreamingConfiguration(first=True, third=True),
+        duration=0.5,
+        update_rate=20,
+        trace=True,
+    )
+
+    assert results["messages"] > 0
+    assert results["samples"] > 0
+    assert results["windows"] > 0
+    for metric in METRICS:
+        assert results[metric] > 0
+    assert 0 <= results["latency_p50"] <= results["latency_max"]
+    assert set(results["transitions"]) == {
+        "connect_stu",
+        "connect_sensor_node",
+        "start_measurement",
+        "disconnect_sensor_node",
+        "disconnect_stu",
+    }
+
+
+def test_main(tmp_path, monkeypatch):
+    """Test running the benchmark and comparing it with a baseline"""
+
+    baseline = tmp_path / "baseline.json"
+    output = tmp_path / "benchmark.json"
+    arguments = ["benchmark", "--duration", "0.2", "--update-rate", "20"]
+
+    monkeypatch.setattr(sys, "argv", [*arguments, "--output", str(baseline)])
+    main()
+    results = json.loads(baseline.read_text())
+    assert set(results["scenarios"]) == set(SCENARIOS)
+    assert not compare(results, results, tolerance=0)
+
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            *arguments,
+            "--output",
+            str(output),
+            "--baseline",
+            str(baseline),
+            "--tolerance",
+            "100",
+        ],
+    )
+    main()
+    assert output.exists()
+
+
+def test_main_without_data(tmp_path, monkeypatch, capsys):
+    """Test running the benchmark without receiving any data"""
+
+    output = tmp_path / "benchmark.json"
+    monkeypatch.setattr(
+        sys, "argv", ["benchmark", "--duration", "0", "--output", str(output)]
+    )
+    main()
+    assert "no data" in capsys.readouterr().out
+    results = json.loads(output.read_text())
+    for scenario in results["scenarios"].values():
+        assert scenario["cpu_per_data_second"] is None
@@ -0,0 +1,126 @@
+"""Tests for the measurement window"""
+
+# -- Imports ------------------------------------------------------------------
+
+from icotronic.can.streaming import StreamingConfiguration, StreamingData
+from icotronic.measurement import Conversion, MeasurementData
+from pytest import mark, raises
+
+from icostate.buffer import MeasurementBuffer, MeasurementWindow
+
+# -- Functions ----------------------------------------------------------------
+
+
+def messages(configuration: StreamingConfiguration) -> list[StreamingData]:
+    """Create some example streaming data"""
+
+    channels = configuration.enabled_channels()
+    values = 3 if channels == 1 else channels
+    return [
+        StreamingData(
+            values=[counter * 10 + value for value in range(values)],
+            counter=counter,
+            timestamp=counter / 10,
+        )
+        for counter in range(4)
+    ]
+
+
+def measurement(
+    configuration: StreamingConfiguration, data: list[StreamingData]
+) -> tuple[MeasurementWindow, MeasurementData]:
+    """Store the same streaming data in a window and measurement data"""
+
+    buffer = MeasurementBuffer(configuration, capacity=12)
+    reference = MeasurementData(configuration)
+    for message in data:
+        buffer.append(message)
+        reference.append(
+            StreamingData(
+                values=list(message.values),
+                counter=message.counter,
+                timestamp=message.timestamp,
+            )
+        )
+
+    return buffer.window(0, buffer.position), reference
+
+
+CONFIGURATIONS = [
+    StreamingConfiguration(first=True),
+    StreamingConfiguration(first=True, third=True),
+    StreamingConfiguration(first=True, second=True, third=True),
+]
+
+
+@mark.parametrize("configuration", CONFIGURATIONS)
+def test_window_matches_measurement_data(configuration):
+    """Test that a window behaves like the equivalent measurement data"""
+
+    window, reference = measurement(configuration, messages(configuration))
+
+    assert window.values() == reference.values()
+    assert len(window) == len(reference)
+    assert repr(window) == repr(reference)
+    assert [str(data) for data in window] == [str(data) for data in reference]
+    for channel in ("first", "second", "third"):
+        assert repr(getattr(window, channel)()) == repr(
+            getattr(reference, channel)()
+        )
+    assert window.dataloss() == reference.dataloss()
+
+
+@mark.parametrize("configuration", CONFIGURATIONS)
+def test_window_extend(configuration):
+    """Test that extending a window updates its arrays"""
+
+    data = messages(configuration)
+    window, reference = measurement(configuration, data[:2])
+    other, other_reference = measurement(configuration, data[2:])
+
+    window.extend(other_reference)
+    reference.extend(other_reference)
+    assert len(window) == len(reference) == len(list(window))
+    assert window.values() == reference.values()
+    assert window.samples() == len(window.sample_indices)
+    assert window.sample_indices.tolist() == list(range(window.samples()))
+
+    window.append(data[0])
+    reference.append(data[0])
+    assert len(window) == len(reference) == len(list(window))
+    assert window.values() == reference.values()
+
+    first, _ = measurement(configuration, data[:2])
+    first.extend(other)
+    assert first.values() == reference.values()[: len(first.values())]
+
+    with raises(ValueError):
+        window.extend(MeasurementData(StreamingConfiguration(second=True)))
+
+
+@mark.parametrize("configuration", CONFIGURATIONS)
+def test_window_apply(configuration):
+    """Test that applying a conversion changes the values of the window"""
+
+    window, reference = measurement(configuration, messages(configuration))
+    buffer = window.buffer
+    conversion = Conversion(
+        first=lambda value: value * 2,
+        second=lambda value: value + 1,
+        third=lambda value: value / 2,
+    )
+
+    assert window.apply(conversion) is window
+    reference.apply(conversion)
+    assert window.values() == reference.values()
+    assert repr(window.first()) == repr(reference.first())
+    if configuration.first:
+        assert window.channel("first").tolist() == [
+            point.value for point in reference.first()
+        ]
+    # The conversion must not change the data of the buffer
+    assert buffer is not None
+    assert window.buffer is None
+    assert buffer.window(0, buffer.position).values() == (
+        measurement(configuration, messages(configuration))[0].values()
+    )
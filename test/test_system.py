@@ -1,28 +1,58 @@
 """Tests code for ICOsystem class"""
 
+# pylint: disable=too-many-lines
+
 # -- Imports ------------------------------------------------------------------
 
-from asyncio import sleep
-from math import isclose
+from asyncio import gather, sleep
+from collections.abc import AsyncIterator
+from math import inf, isclose
 from statistics import mean
-from time import monotonic
+from time import monotonic, sleep as blocking_sleep
+
+import numpy as np
 
 from icotronic.can.adc import ADCConfiguration
+from icotronic.can.error import CANConnectionError
 from icotronic.can import StreamingConfiguration
+from icotronic.can.sensor import SensorConfiguration
 from icotronic.measurement import MeasurementData
+from icotronic.measurement.storage import Storage
 from netaddr import EUI
-from pytest import mark
+from pytest import approx, mark, raises
 
+from icostate.buffer import channel_sample_rate, MeasurementWindow
+from icostate.capture import Capture
+from icostate.conversion import SensorCalibration
+from icostate.counters import MeasurementCounters
+from icostate.envelope import Envelope
+from icostate.history import History
+from icostate.pyramid import FACTORS, Pyramid, pyramid_path
+from icostate.recording import Recorder
+from icostate.sensor import SensorNodeProfile
+from icostate.simulation import SimulatedConnection, SimulatedSensorNode
+from icostate.spectrum import Spectrum, SpectrumAnalyzer
+from icostate.statistics import Statistics
+from icostate.subscription import OverflowPolicy
 from icostate.system import ICOsystem, State
+from icostate.timing import GapFill
+from icostate.trigger import (
+    TriggerCondition,
+    TriggeredCapture,
+    TriggeredData,
+    TriggerKind,
+)
 
 # -- Functions ----------------------------------------------------------------
 
 
 @mark.anyio
-async def test_connect(sensor_node_mac_address, sensor_node_name):
+async def test_connect(
+    connection_class, sensor_node_mac_address, sensor_node_name
+):
     """Test sensor connection"""
 
-    icosystem = ICOsystem()
+    icosystem = ICOsystem(connection=connection_class())
     name_event_triggered = False
     mac_address_event_triggered = False
 
@@ -49,6 +79,312 @@ async def test_connect(sensor_node_mac_address, sensor_node_name):
     await icosystem.disconnect_stu()
 
 
+@mark.anyio
+async def test_connect_latency():
+    """Test that connecting requests the sensor node attributes concurrently"""
+
+    latency = 0.1
+    sensor_node = SimulatedSensorNode(latency=latency)
+    icosystem = ICOsystem(connection=SimulatedConnection([sensor_node]))
+
+    await icosystem.connect_stu()
+    await icosystem.connect_sensor_node_mac(str(sensor_node.mac_address))
+    # Only name and ADC configuration, since the MAC address is known
+    assert sensor_node.requests == 2
+    assert icosystem.sensor_node_attributes is not None
+    assert icosystem.sensor_node_attributes.mac_address == (
+        sensor_node.mac_address
+    )
+    assert icosystem.connect_latency is not None
+    assert icosystem.connect_latency > 0
+    # Both requests were in progress at the same time
+    assert sensor_node.max_pending == 2
+    await icosystem.disconnect_sensor_node()
+    await icosystem.disconnect_stu()
+
+
+@mark.anyio
+async def test_attribute_cache():
+    """Test reading sensor node attributes from the cache"""
+
+    sensor_node = SimulatedSensorNode()
+    mac_address = str(sensor_node.mac_address)
+    icosystem = ICOsystem(connection=SimulatedConnection([sensor_node]))
+
+    await icosystem.connect_stu()
+    adc_configuration = await icosystem.get_adc_configuration(mac_address)
+    requests = sensor_node.requests
+    assert await icosystem.get_adc_configuration(mac_address) == (
+        adc_configuration
+    )
+    assert sensor_node.requests == requests
+
+    # Setters write through to the cache
+    await icosystem.rename("Cached", mac_address)
+    attributes = icosystem.attribute_cache.get(sensor_node.mac_address)
+    assert attributes is not None
+    assert attributes.name == "Cached"
+    adc_configuration = ADCConfiguration(
+        prescaler=4, acquisition_time=8, oversampling_rate=64
+    )
+    await icosystem.set_adc_configuration(adc_configuration, mac_address)
+    requests = sensor_node.requests
+    assert await icosystem.get_adc_configuration(mac_address) == (
+        adc_configuration
+    )
+    assert sensor_node.requests == requests
+
+    await icosystem.connect_sensor_node_mac(mac_address)
+    sensor_configuration = await icosystem.get_sensor_configuration()
+    requests = sensor_node.requests
+    assert await icosystem.get_sensor_configuration() == sensor_configuration
+    assert sensor_node.requests == requests
+
+    # The sensor number 0 keeps the current sensor of a channel
+    icosystem.sensors = {5: SensorCalibration("°C", 100, -50)}
+    await icosystem.set_sensor_configuration(SensorConfiguration(first=5))
+    assert await icosystem.get_sensor_configuration() == SensorConfiguration(
+        first=5,
+        second=sensor_configuration["second"],
+        third=sensor_configuration["third"],
+    )
+    assert (await icosystem.get_conversion()).units[0] == "°C"
+    await icosystem.set_sensor_configuration(sensor_configuration)
+    await icosystem.disconnect_sensor_node()
+
+    # Invalidated and expired entries require a new request
+    icosystem.attribute_cache.invalidate(sensor_node.mac_address)
+    await icosystem.get_adc_configuration(mac_address)
+    assert sensor_node.requests > requests
+    icosystem.attribute_cache.ttl = 0
+    requests = sensor_node.requests
+    await icosystem.get_adc_configuration(mac_address)
+    assert sensor_node.requests > requests
+
+    await icosystem.rename("Test-STH", mac_address)
+    await icosystem.disconnect_stu()
+
+
+@mark.anyio
+async def test_idle_connection():
+    """Test reusing the connection to a sensor node"""
+
+    sensor_node = SimulatedSensorNode()
+    other = SimulatedSensorNode("Test-Other", "08-6B-D7-01-DE-82")
+    connection = SimulatedConnection([sensor_node, other])
+    icosystem = ICOsystem(connection=connection)
+    icosystem.idle_timeout = 0.2
+    icosystem.attribute_cache.ttl = 0
+    mac_address = str(sensor_node.mac_address)
+
+    await icosystem.connect_stu()
+    await icosystem.rename("Test-STH", mac_address)
+    assert icosystem.state == State.STU_CONNECTED
+    assert connection.stu.connected is sensor_node
+    assert not await icosystem.is_sensor_node_connected()
+    requests = sensor_node.requests
+    # Only the request of the operation itself, no connection setup
+    await icosystem.get_adc_configuration(mac_address)
+    assert sensor_node.requests == requests + 1
+    await icosystem.connect_sensor_node_mac(mac_address)
+    assert sensor_node.requests == requests + 1
+    await icosystem.disconnect_sensor_node()
+    assert connection.stu.connected is None
+
+    # Requesting another sensor node closes the idle connection
+    await icosystem.get_adc_configuration(mac_address)
+    await icosystem.get_adc_configuration(str(other.mac_address))
+    assert connection.stu.connected is other
+
+    # The system closes the connection after the idle timeout
+    await sleep(0.3)
+    assert icosystem.idle_connection is None
+    assert connection.stu.connected is None
+
+    # Collecting sensor nodes also closes the idle connection
+    await icosystem.get_adc_configuration(mac_address)
+    assert connection.stu.connected is sensor_node
+    await icosystem.collect_sensor_nodes()
+    assert icosystem.idle_connection is None
+    assert connection.stu.connected is None
+
+    await icosystem.get_adc_configuration(mac_address)
+    await icosystem.disconnect_stu()
+    assert connection.stu.connected is None
+
+
+@mark.anyio
+async def test_idle_connection_error(caplog):
+    """Test that errors of the idle timeout do not go unnoticed"""
+
+    sensor_node = SimulatedSensorNode()
+    icosystem = ICOsystem(connection=SimulatedConnection([sensor_node]))
+    icosystem.idle_timeout = 0.1
+
+    await icosystem.connect_stu()
+    await icosystem.get_adc_configuration(str(sensor_node.mac_address))
+    assert icosystem.idle_connection is not None
+
+    async def fail(*_):
+        raise CANConnectionError("Connection lost")
+
+    icosystem.idle_connection[0].__aexit__ = fail
+    await sleep(0.2)
+    assert icosystem.idle_connection is None
+    assert "Closing idle connection failed: Connection lost" in caplog.text
+
+    await icosystem.disconnect_stu()
+
+
+@mark.anyio
+async def test_apply_profile():
+    """Test applying a profile to multiple sensor nodes"""
+
+    sensor_nodes = [
+        SimulatedSensorNode("Test-1", "08-6B-D7-01-DE-81"),
+        SimulatedSensorNode("Test-2", "08-6B-D7-01-DE-82"),
+    ]
+    icosystem = ICOsystem(connection=SimulatedConnection(sensor_nodes))
+    adc_configuration = ADCConfiguration(
+        prescaler=4, acquisition_time=8, oversampling_rate=64
+    )
+    profile = SensorNodeProfile(
+        adc_configuration=adc_configuration,
+        sensor_configuration=SensorConfiguration(first=2, second=1, third=3),
+    )
+    mac_addresses = [str(node.mac_address) for node in sensor_nodes]
+    # Only the first node requires a change of the sensor configuration
+    sensor_nodes[1].sensor_configuration = profile.sensor_configuration
+
+    await icosystem.connect_stu()
+    results = await icosystem.apply_profile(
+        profile, mac_addresses + ["08-6B-D7-01-DE-83"]
+    )
+    assert [result.changed for result in results[:2]] == [
+        ["adc_configuration", "sensor_configuration"],
+        ["adc_configuration"],
+    ]
+    assert all(result.verified for result in results[:2])
+    assert all(result.duration > 0 for result in results)
+    assert isinstance(results[2].error, TimeoutError)
+    for sensor_node in sensor_nodes:
+        assert sensor_node.adc_configuration == adc_configuration
+        assert sensor_node.sensor_configuration == (
+            profile.sensor_configuration
+        )
+    assert icosystem.state == State.STU_CONNECTED
+
+    # Applying the profile again does not change any setting
+    requests = [node.requests for node in sensor_nodes]
+    results = await icosystem.apply_profile(profile, mac_addresses)
+    assert [result.changed for result in results] == [[], []]
+    assert all(result.verified for result in results)
+    # Name, ADC configuration and sensor configuration
+    assert [node.requests for node in sensor_nodes] == [
+        count + 3 for count in requests
+    ]
+
+    # The sensor number 0 keeps the sensor of a channel unchanged
+    keep = SensorNodeProfile(sensor_configuration=SensorConfiguration(first=2))
+    results = await icosystem.apply_profile(keep, mac_addresses)
+    assert [result.changed for result in results] == [[], []]
+
+    # Every sensor node should have its own name
+    with raises(ValueError):
+        await icosystem.apply_profile(
+            SensorNodeProfile(name="Test"), mac_addresses
+        )
+    with raises(ValueError):
+        SensorNodeProfile(name="Test-Sensor-Node")
+    [result] = await icosystem.apply_profile(
+        SensorNodeProfile(name="Renamed"), mac_addresses[:1]
+    )
+    assert result.changed == ["name"]
+    assert result.verified
+    assert sensor_nodes[0].name == "Renamed"
+    await icosystem.disconnect_stu()
+
+
+@mark.anyio
+async def test_apply_profile_timeout(monkeypatch):
+    """Test applying a profile if a sensor node does not respond"""
+
+    sensor_nodes = [
+        SimulatedSensorNode("Test-1", "08-6B-D7-01-DE-81"),
+        SimulatedSensorNode("Test-2", "08-6B-D7-01-DE-82"),
+    ]
+    icosystem = ICOsystem(connection=SimulatedConnection(sensor_nodes))
+
+    async def get_name() -> str:
+        raise TimeoutError("Unable to read name")
+
+    monkeypatch.setattr(sensor_nodes[0], "get_name", get_name)
+    profile = SensorNodeProfile(
+        adc_configuration=ADCConfiguration(
+            prescaler=4, acquisition_time=8, oversampling_rate=64
+        )
+    )
+    mac_addresses = [str(node.mac_address) for node in sensor_nodes]
+    await icosystem.connect_stu()
+
+    # The system closes the connection to the sensor node that timed out
+    [result] = await icosystem.apply_profile(profile, mac_addresses[:1])
+    assert isinstance(result.error, TimeoutError)
+    assert icosystem.sensor_node is None
+    assert icosystem.sensor_node_connection is None
+    assert icosystem.stu.connected is None
+
+    results = await icosystem.apply_profile(profile, mac_addresses)
+    assert isinstance(results[0].error, TimeoutError)
+    assert results[1].error is None
+    assert results[1].verified
+    assert icosystem.state == State.STU_CONNECTED
+    assert icosystem.sensor_node is None
+    assert icosystem.stu.connected is not sensor_nodes[0]
+
+    # The failed connection does not stop later connections to the node
+    monkeypatch.undo()
+    await icosystem.connect_sensor_node_mac(mac_addresses[0])
+    assert icosystem.stu.connected is sensor_nodes[0]
+    await icosystem.disconnect_sensor_node()
+    await icosystem.disconnect_stu()
+
+
+@mark.anyio
+async def test_skip_unchanged_configuration():
+    """Test that setters do not write the current configuration again"""
+
+    sensor_node = SimulatedSensorNode()
+    mac_address = str(sensor_node.mac_address)
+    connection = SimulatedConnection([sensor_node])
+    icosystem = ICOsystem(connection=connection)
+
+    await icosystem.connect_stu()
+    adc_configuration = await icosystem.get_adc_configuration(mac_address)
+    requests = sensor_node.requests
+    # The cache contains the ADC configuration, which means the system does
+    # not have to connect to the sensor node
+    await icosystem.set_adc_configuration(adc_configuration, mac_address)
+    assert sensor_node.requests == requests
+
+    await icosystem.connect_sensor_node_mac(mac_address)
+    requests = sensor_node.requests
+    await icosystem.set_adc_configuration(adc_configuration)
+    assert sensor_node.requests == requests
+    await icosystem.set_adc_configuration(adc_configuration, force=True)
+    assert sensor_node.requests == requests + 1
+
+    sensor_configuration = await icosystem.get_sensor_configuration()
+    requests = sensor_node.requests
+    await icosystem.set_sensor_configuration(sensor_configuration)
+    assert sensor_node.requests == requests
+    await icosystem.set_sensor_configuration(sensor_configuration, force=True)
+    assert sensor_node.requests == requests + 1
+
+    await icosystem.disconnect_sensor_node()
+    await icosystem.disconnect_stu()
+
+
 @mark.anyio
 async def test_collect_sensor_nodes(connect_sensor_node):
     """Test sensor node collection"""
@@ -131,7 +467,7 @@ async def test_adc_set(connect_sensor_node):
 
     # Set non-default ADC configuration
     non_default_adc_config = ADCConfiguration(
-        prescaler=2, acquisition_time=8, oversampling_rate=64
+        prescaler=3, acquisition_time=8, oversampling_rate=64
     )
     await icosystem.set_adc_configuration(non_default_adc_config)
     await sleep(0)  # Allow scheduler to trigger event coroutines
@@ -153,6 +489,15 @@ async def test_adc_set(connect_sensor_node):
     assert adc_event_triggered == 4
     assert adc_config == default_adc_config
 
+    # Setting the current ADC configuration again only changes it, if we
+    # force the change
+    await icosystem.set_adc_configuration(default_adc_config)
+    await sleep(0)  # Allow scheduler to trigger event coroutines
+    assert adc_event_triggered == 4
+    await icosystem.set_adc_configuration(default_adc_config, force=True)
+    await sleep(0)  # Allow scheduler to trigger event coroutines
+    assert adc_event_triggered == 5
+
 
 @mark.anyio
 async def test_measurement(connect_sensor_node):
@@ -218,3 +563,674 @@ async def test_measurement(connect_sensor_node):
         len(collected_data) * values_per_message
         >= (runtime - approx_time_stream_open) * sample_rate
     )
+
+
+@mark.anyio
+async def test_measurement_samples(connect_sensor_node):
+    """Test measurement with fixed number of samples"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    sample_rate = (await icosystem.get_adc_configuration()).sample_rate()
+    samples = round(sample_rate)
+    collected_samples = 0
+
+    @icosystem.on("sensor_node_measurement_data")
+    async def count_samples(measurement_data: MeasurementWindow):
+        nonlocal collected_samples
+        collected_samples += measurement_data.samples()
+
+    await icosystem.start_measurement(streaming_configuration, samples=samples)
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+    await sleep(0)  # Allow scheduler to trigger event coroutines
+
+    assert collected_samples == samples
+
+
+@mark.anyio
+async def test_measurement_counters(connect_sensor_node):
+    """Test measurement counters"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    sample_rate = (await icosystem.get_adc_configuration()).sample_rate()
+    collected_samples = 0
+    counter_events: list[MeasurementCounters] = []
+
+    @icosystem.on("sensor_node_measurement_data")
+    async def count_samples(measurement_data: MeasurementWindow):
+        nonlocal collected_samples
+        collected_samples += measurement_data.samples()
+
+    @icosystem.on("sensor_node_measurement_counters")
+    async def store_counters(counters: MeasurementCounters):
+        counter_events.append(counters)
+
+    await icosystem.start_measurement(streaming_configuration, runtime=2.5)
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+    await sleep(0)  # Allow scheduler to trigger event coroutines
+
+    # Two regular events and one at the end of the measurement
+    assert len(counter_events) == 3
+    counters = icosystem.get_measurement_counters()
+    assert counters.samples == collected_samples
+    assert counters.windows == counter_events[-1].windows
+    assert counters.dataloss() < 0.02
+    assert counter_events[1].sample_rate == approx(sample_rate, rel=0.1)
+
+
+@mark.anyio
+async def test_measurement_ring_buffer(connect_sensor_node):
+    """Test a measurement that wraps around the measurement buffer"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True, third=True)
+    sample_rate = (await icosystem.get_adc_configuration()).sample_rate()
+    samples = round(sample_rate)
+    icosystem.measurement.buffer_duration = 0.1
+    windows: list[MeasurementWindow] = []
+    icosystem.on("sensor_node_measurement_data", windows.append)
+
+    await icosystem.start_measurement(streaming_configuration, samples=samples)
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    buffer = icosystem.measurement.buffer
+    assert buffer is not None
+    assert buffer.wraps > 0
+    sample_indices = np.concatenate([w.sample_indices for w in windows])
+    assert sample_indices.tolist() == list(range(samples))
+    third = np.concatenate([window.channel("third") for window in windows])
+    assert len(third) == samples
+    assert not np.isnan(third).any()
+    timestamps = np.concatenate([window.timestamps for window in windows])
+    assert np.all(np.diff(timestamps) >= 0)
+
+
+@mark.anyio
+async def test_measurement_timer():
+    """Test that a timer and not the message arrival drives the updates"""
+
+    # Bursts of streaming messages arrive up to half a second apart
+    sensor_node = SimulatedSensorNode(jitter=0.5, seed=1)
+    icosystem = ICOsystem(connection=SimulatedConnection([sensor_node]))
+    windows: list[MeasurementWindow] = []
+    stalls: list[float] = []
+    icosystem.on("sensor_node_measurement_data", windows.append)
+    icosystem.on("sensor_node_measurement_stalled", stalls.append)
+
+    await icosystem.connect_stu()
+    await icosystem.connect_sensor_node_mac(str(sensor_node.mac_address))
+    update_rate = 50
+    runtime = 2
+    await icosystem.start_measurement(
+        StreamingConfiguration(first=True),
+        update_rate=update_rate,
+        runtime=runtime,
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+    await icosystem.disconnect_sensor_node()
+    await icosystem.disconnect_stu()
+
+    # Updates without new data emit the stalled event instead
+    assert windows
+    assert stalls
+    assert all(stall > 0 for stall in stalls)
+    # The timer emits an event for every update, even between bursts
+    assert len(windows) + len(stalls) > update_rate * runtime / 2
+
+
+@mark.anyio
+async def test_measurement_zero_copy(connect_sensor_node):
+    """Test emitting views into the measurement buffer"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    sample_rate = (await icosystem.get_adc_configuration()).sample_rate()
+    samples = round(sample_rate)
+    # Make sure the buffer reuses its memory during the measurement
+    icosystem.measurement.buffer_duration = 0.1
+    windows: list[MeasurementWindow] = []
+    valid: list[bool] = []
+
+    @icosystem.on("sensor_node_measurement_data")
+    def measurement_data_changed(window: MeasurementWindow):
+        windows.append(window)
+        valid.append(window.valid())
+
+    await icosystem.start_measurement(
+        streaming_configuration, samples=samples, zero_copy=True
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    assert sum(window.samples() for window in windows) == samples
+    assert all(valid)
+    assert all(window.buffer is not None for window in windows)
+    assert not windows[0].data.flags.writeable
+    assert not windows[0].valid()
+    assert windows[-1].valid()
+
+    # Copies stay valid after the buffer reused their memory
+    windows.clear()
+    await icosystem.start_measurement(streaming_configuration, samples=samples)
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    assert windows[0].buffer is None
+    assert windows[0].valid()
+
+
+@mark.anyio
+async def test_measurement_windows(connect_sensor_node):
+    """Test pull based access to measurement data"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    sample_rate = (await icosystem.get_adc_configuration()).sample_rate()
+    samples = round(sample_rate)
+
+    async def consume(windows: AsyncIterator[MeasurementWindow]) -> int:
+        collected_samples = 0
+        async for window in windows:
+            collected_samples += window.samples()
+            await sleep(0.05)  # Slower than update rate
+        return collected_samples
+
+    blocking = icosystem.measurement_windows(
+        maxsize=2, policy=OverflowPolicy.BLOCK
+    )
+    dropping = icosystem.measurement_windows(maxsize=2)
+    # Iterators only subscribe to the measurement data when they are used
+    unused = icosystem.measurement_windows(maxsize=1)
+    assert not icosystem.measurement.queues
+    await icosystem.start_measurement(streaming_configuration, samples=samples)
+    blocked_samples, dropped_samples = await gather(
+        consume(blocking), consume(dropping)
+    )
+
+    # Blocking consumers do not lose any data, even if they are slow
+    assert blocked_samples == samples
+    assert dropped_samples <= samples
+    assert icosystem.state == State.SENSOR_NODE_CONNECTED
+    assert unused is not None
+
+
+@mark.anyio
+async def test_measurement_windows_unread(connect_sensor_node):
+    """Test that an iterator that stops reading does not use more memory"""
+
+    icosystem = connect_sensor_node
+    icosystem.measurement.buffer_duration = 0.5
+
+    windows = icosystem.measurement_windows(maxsize=2)
+    await icosystem.start_measurement(StreamingConfiguration(first=True))
+    await anext(windows)
+    [queue] = icosystem.measurement.queues
+    capacity = icosystem.measurement.buffer.capacity
+    await sleep(1.5)  # Three times the buffer duration
+
+    assert icosystem.measurement.buffer.capacity == capacity
+    assert queue.dropped > 0
+    await icosystem.stop_measurement()
+    await windows.aclose()
+
+
+@mark.anyio
+async def test_measurement_update_rates(connect_sensor_node):
+    """Test consumers with different update rates"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    sample_rate = (await icosystem.get_adc_configuration()).sample_rate()
+    samples = round(2 * sample_rate)
+
+    async def consume(
+        windows: AsyncIterator[MeasurementWindow],
+    ) -> tuple[int, int]:
+        number_windows = 0
+        collected_samples = 0
+        async for window in windows:
+            number_windows += 1
+            collected_samples += window.samples()
+        return number_windows, collected_samples
+
+    fast, slow, _ = await gather(
+        consume(icosystem.measurement_windows(update_rate=30)),
+        consume(icosystem.measurement_windows(update_rate=1)),
+        icosystem.start_measurement(streaming_configuration, samples=samples),
+    )
+    fast_windows, fast_samples = fast
+    slow_windows, slow_samples = slow
+
+    # Every consumer receives all data at its own rate
+    assert fast_samples == slow_samples == samples
+    assert fast_windows >= 40
+    assert slow_windows <= 4
+
+
+@mark.anyio
+async def test_measurement_recording(connect_sensor_node, tmp_path):
+    """Test recording measurement data"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True, third=True)
+    filepath = tmp_path / "measurement.hdf5"
+    samples = 5000
+
+    await icosystem.start_measurement(
+        streaming_configuration, samples=samples, recorder=Recorder(filepath)
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    assert icosystem.get_measurement_counters().recorded_samples == samples
+    with Storage(filepath) as storage:
+        assert storage.acceleration.nrows == samples
+        assert storage.streaming_configuration.axes() == ["x", "z"]
+
+
+@mark.anyio
+async def test_measurement_capture(connect_sensor_node, tmp_path):
+    """Test recording measurement data as capture"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True, third=True)
+    path = tmp_path / "measurement.icocap"
+    samples = 5000
+
+    # Measurements only build a pyramid on request
+    await icosystem.start_measurement(streaming_configuration, samples=50)
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+    assert icosystem.measurement.pyramid is None
+
+    await icosystem.start_measurement(
+        streaming_configuration,
+        samples=samples,
+        recorder=Recorder(path),
+        pyramid_factors=FACTORS,
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    attributes = icosystem.sensor_node_attributes
+    with Capture(path) as capture:
+        assert len(capture) == samples
+        assert capture.attributes is not None
+        assert capture.attributes.mac_address == attributes.mac_address
+        assert capture.configuration.axes() == ["x", "z"]
+
+        timestamps = capture.column("timestamps")
+        start = capture.offset(0.2)
+        assert timestamps[start] - timestamps[0] >= 0.2
+        assert timestamps[start - 1] - timestamps[0] < 0.2
+
+        values = capture.channel("third", 0.2, 0.3)
+        assert len(values) == capture.rows_between(0.2, 0.3).stop - start
+        assert values.base is not None  # View into the memory mapped file
+
+    live = icosystem.measurement.pyramid
+    stored = Pyramid.load(pyramid_path(path))
+    for level, stored_level in zip(live.levels, stored.levels):
+        assert len(level) == len(stored_level) == samples // level.factor
+    assert stored.levels[0].minimum[:, 1] == approx(
+        live.levels[0].minimum[:, 1]
+    )
+    assert stored.select(duration=0.5, pixels=100).factor == 16
+
+
+class SlowRecorder(Recorder):
+    """Recorder that needs some time to hand over the remaining data"""
+
+    def _finish(self) -> None:
+        blocking_sleep(0.5)
+        super()._finish()
+
+
+class FailingRecorder(Recorder):
+    """Recorder whose writer thread always fails"""
+
+    def _work(self) -> None:
+        raise OSError("Disk full")
+
+
+@mark.anyio
+async def test_measurement_stop_flush(connect_sensor_node, tmp_path):
+    """Test that stopping a measurement waits for the recorder"""
+
+    icosystem = connect_sensor_node
+    path = tmp_path / "measurement.icocap"
+
+    await icosystem.start_measurement(
+        StreamingConfiguration(first=True), recorder=SlowRecorder(path)
+    )
+    await sleep(0.2)
+    # The timeout only limits the time until the data stream closes
+    await icosystem.stop_measurement(timeout=0.1)
+
+    assert icosystem.state == State.SENSOR_NODE_CONNECTED
+    counters = icosystem.get_measurement_counters()
+    assert counters.samples > 0
+    assert counters.recorded_samples == counters.samples
+    with Capture(path) as capture:
+        assert len(capture) == counters.samples
+
+
+@mark.anyio
+async def test_measurement_stop_error(connect_sensor_node, tmp_path):
+    """Test that stopping a measurement reports errors of the recorder"""
+
+    icosystem = connect_sensor_node
+    counters = []
+    icosystem.on("sensor_node_measurement_counters", counters.append)
+
+    await icosystem.start_measurement(
+        StreamingConfiguration(first=True),
+        recorder=FailingRecorder(tmp_path / "measurement.icocap"),
+    )
+    await sleep(0.2)
+    with raises(OSError, match="Disk full"):
+        await icosystem.stop_measurement()
+
+    assert icosystem.state == State.SENSOR_NODE_CONNECTED
+    # The measurement still emits the final counters
+    assert counters
+    assert counters[-1].recorded_samples == 0
+
+
+@mark.anyio
+async def test_measurement_envelope(connect_sensor_node):
+    """Test emitting the envelope of measurement data"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    sample_rate = channel_sample_rate(
+        adc_configuration, streaming_configuration
+    )
+    envelope_rate = 1000
+    samples = round(sample_rate)
+    envelopes: list[Envelope] = []
+    windows: list[MeasurementWindow] = []
+
+    icosystem.on("sensor_node_measurement_envelope", envelopes.append)
+    icosystem.on("sensor_node_measurement_data", windows.append)
+
+    await icosystem.start_measurement(
+        streaming_configuration, samples=samples, envelope_rate=envelope_rate
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    assert sum(window.samples() for window in windows) == samples
+    size = round(sample_rate / envelope_rate)
+    assert sum(len(envelope) for envelope in envelopes) == samples // size
+
+    values = np.concatenate([window.channel("first") for window in windows])
+    pairs = np.concatenate(
+        [envelope.channel("first") for envelope in envelopes]
+    )
+    buckets = values[: len(pairs) * size].reshape(-1, size)
+    assert pairs[:, 0] == approx(buckets.min(axis=1))
+    assert pairs[:, 1] == approx(buckets.max(axis=1))
+
+
+@mark.anyio
+async def test_measurement_statistics(connect_sensor_node):
+    """Test running statistics of measurement data"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True, second=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    samples = round(
+        2 * channel_sample_rate(adc_configuration, streaming_configuration)
+    )
+    snapshots: list[dict[float, Statistics]] = []
+    windows: list[MeasurementWindow] = []
+
+    icosystem.on("sensor_node_measurement_statistics", snapshots.append)
+
+    # Measurements only calculate statistics on request
+    await icosystem.start_measurement(streaming_configuration, samples=50)
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+    assert not snapshots
+    assert not icosystem.get_measurement_statistics()
+
+    icosystem.on("sensor_node_measurement_data", windows.append)
+    await icosystem.start_measurement(
+        streaming_configuration,
+        samples=samples,
+        statistics_durations=(1.0, inf),
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    assert len(snapshots) >= 2
+    statistics = icosystem.get_measurement_statistics()
+    assert set(statistics) == {1.0, inf}
+
+    values = np.concatenate([window.channel("second") for window in windows])
+    total = statistics[inf].channel("second")
+    assert statistics[inf].count == samples
+    assert total["mean"] == approx(values.mean())
+    assert total["variance"] == approx(values.var())
+    assert total["rms"] == approx(np.sqrt(np.mean(values**2)))
+    assert total["peak"] == np.abs(values).max()
+
+    end = windows[-1].timestamps[-1]
+    recent = np.concatenate([
+        window.channel("second")
+        for window in windows
+        if window.timestamps[-1] > end - 1
+    ])
+    assert statistics[1.0].count == len(recent)
+    assert statistics[1.0].channel("second")["mean"] == approx(recent.mean())
+
+
+@mark.anyio
+async def test_measurement_spectrum(connect_sensor_node):
+    """Test spectral analysis of measurement data"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    sample_rate = channel_sample_rate(
+        adc_configuration, streaming_configuration
+    )
+    samples = round(2 * sample_rate)
+    analyzer = SpectrumAnalyzer(size=4096, bands=[(40, 60), (100, 200)])
+    spectra: list[Spectrum] = []
+
+    icosystem.on("sensor_node_spectrum", spectra.append)
+
+    await icosystem.start_measurement(
+        streaming_configuration, samples=samples, analyzer=analyzer
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    assert len(spectra) == (samples - analyzer.size) // analyzer.hop + 1
+    timestamps = [spectrum.timestamp for spectrum in spectra]
+    assert timestamps == sorted(timestamps)
+    resolution = sample_rate / analyzer.size
+    for spectrum in spectra:
+        # The simulated sensor node measures a sine wave with 50 Hz
+        assert spectrum.dominant_frequency[0] == approx(50, abs=resolution)
+        assert spectrum.band_power[0, 0] > 10 * spectrum.band_power[1, 0]
+
+
+@mark.anyio
+async def test_measurement_trigger(connect_sensor_node, tmp_path):
+    """Test capturing measurement data around trigger events"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    sample_rate = channel_sample_rate(
+        adc_configuration, streaming_configuration
+    )
+    level = 2**15 + 400
+    trigger = TriggeredCapture(
+        [TriggerCondition("first", TriggerKind.RISING, level)],
+        pre_trigger=0.05,
+        post_trigger=0.1,
+        directory=tmp_path,
+    )
+    pre_samples = round(0.05 * sample_rate)
+    post_samples = round(0.1 * sample_rate)
+    captured: list[TriggeredData] = []
+
+    icosystem.on("sensor_node_trigger", captured.append)
+
+    await icosystem.start_measurement(
+        streaming_configuration, samples=round(sample_rate), trigger=trigger
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    # The simulated sensor node measures a sine wave with 50 Hz. The data
+    # before the first trigger and after the last trigger might be
+    # incomplete.
+    assert len(captured) >= 5
+    for data in captured[1:-1]:
+        window = data.window
+        assert window.samples() == pre_samples + post_samples
+        assert np.all(np.diff(window.sample_indices) == 1)
+        values = window.channel("first")
+        assert values[pre_samples - 1] < level <= values[pre_samples]
+        assert window.timestamps[pre_samples] == data.timestamp
+        with Capture(data.path) as capture:
+            assert len(capture) == window.samples()
+
+
+@mark.anyio
+async def test_measurement_conversion(connect_sensor_node):
+    """Test conversion of measurement data into physical units"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True, third=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    reference_voltage = adc_configuration.reference_voltage
+    windows: list[MeasurementWindow] = []
+
+    icosystem.on("sensor_node_measurement_data", windows.append)
+
+    await icosystem.set_sensor_configuration(
+        SensorConfiguration(first=1, second=2, third=3)
+    )
+    icosystem.sensors = {3: SensorCalibration("°C", 100, -50)}
+    conversion = await icosystem.get_conversion()
+    assert conversion.units == ["V", "V", "°C"]
+    assert await icosystem.get_conversion() is conversion
+
+    await icosystem.start_measurement(
+        streaming_configuration, runtime=0.5, convert=True
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    first = np.concatenate([window.channel("first") for window in windows])
+    third = np.concatenate([window.channel("third") for window in windows])
+    # The simulated sensor node measures values around half the ADC range
+    assert first.mean() == approx(reference_voltage / 2, abs=0.05)
+    assert third.mean() == approx(reference_voltage * 50 - 50, abs=5)
+
+    await icosystem.set_sensor_configuration(
+        SensorConfiguration(first=3, second=2, third=1)
+    )
+    assert (await icosystem.get_conversion()).units == ["°C", "V", "V"]
+
+
+@mark.anyio
+async def test_measurement_grid(connect_sensor_node):
+    """Test emitting measurement data on a regular grid"""
+
+    icosystem = connect_sensor_node
+    if isinstance(icosystem.sensor_node, SimulatedSensorNode):
+        icosystem.sensor_node.loss_rate = 0.05
+    streaming_configuration = StreamingConfiguration(first=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    sample_rate = channel_sample_rate(
+        adc_configuration, streaming_configuration
+    )
+    windows: list[MeasurementWindow] = []
+
+    icosystem.on("sensor_node_measurement_data", windows.append)
+
+    await icosystem.start_measurement(
+        streaming_configuration, runtime=0.5, fill=GapFill.NAN
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+
+    sample_indices = np.concatenate(
+        [window.sample_indices for window in windows]
+    )
+    values = np.concatenate([window.channel("first") for window in windows])
+    timestamps = np.concatenate([window.timestamps for window in windows])
+    assert np.all(np.diff(sample_indices) == 1)
+    assert timestamps - timestamps[0] == approx(
+        (sample_indices - sample_indices[0]) / sample_rate, abs=1e-6
+    )
+    gaps = icosystem.measurement.gaps
+    assert np.isnan(values).sum() == gaps.lost()
+    for start, length in gaps.gaps:
+        assert np.all(np.isnan(values[start : start + length]))
+    if isinstance(icosystem.sensor_node, SimulatedSensorNode):
+        assert len(gaps) > 0
+
+
+@mark.anyio
+async def test_measurement_history(connect_sensor_node, tmp_path):
+    """Test storing the history of a measurement with bounded memory"""
+
+    icosystem = connect_sensor_node
+    streaming_configuration = StreamingConfiguration(first=True)
+    adc_configuration = await icosystem.get_adc_configuration()
+    sample_rate = channel_sample_rate(
+        adc_configuration, streaming_configuration
+    )
+    samples = round(sample_rate)
+    memory = 2**16
+    history = History(
+        tmp_path / "history.icocap", memory=memory, block_size=1024
+    )
+    windows: list[MeasurementWindow] = []
+
+    icosystem.on("sensor_node_measurement_data", windows.append)
+
+    await icosystem.start_measurement(
+        streaming_configuration, samples=samples, history=history
+    )
+    while icosystem.state == State.MEASUREMENT:
+        await sleep(0.1)
+        # Queries work while the background thread adds data
+        assert history.window().samples() <= samples
+
+    assert history.thread is None
+    assert len(history) == samples
+    assert history.spilled > 0
+    assert history.used <= memory
+    values = np.concatenate([window.channel("first") for window in windows])
+    window = history.window()
+    assert np.all(window.sample_indices == np.arange(samples))
+    # The capture stores 32 bit floating point values
+    assert window.channel("first") == approx(values)
+    part = history.window(start=0.25, stop=0.5)
+    assert part.timestamps[0] >= window.timestamps[0] + 0.25
+    assert part.timestamps[-1] < window.timestamps[0] + 0.5
+    history.close()
+
+    # The history keeps the capture, which is why the next measurement
+    # requires a new path
+    with raises(ValueError, match="already exists"):
+        await icosystem.start_measurement(
+            streaming_configuration, samples=samples, history=history
+        )
+    assert history.thread is None
+    assert icosystem.state == State.SENSOR_NODE_CONNECTED